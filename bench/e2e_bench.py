@@ -0,0 +1,407 @@
+#!/usr/bin/python2.6
+
+"""
+    STARBURST ACC/FEANTA End-to-End Benchmark
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+
+    Runs ServerDaemon in this process against the device simulators,
+    which run in a child process so that their CPU time is not counted,
+    and against a fake ACC receiving stateframes. Commands are driven
+    against the daemon's command port, and frame rate, inter-frame
+    jitter, command latency per worker, CPU and memory are reported as
+    JSON. Given a trace recorded with FEM-TRACE-START, the workers are fed
+    the recorded device traffic instead of the simulators, at the recorded
+    speed or faster, so that a production session can be rerun against
+    new code. Run with core, gen and sim on PYTHONPATH, i.e. from the top
+    of the repository:
+
+        PYTHONPATH=core:gen:sim python bench/e2e_bench.py -d 60
+        PYTHONPATH=core:gen:sim python bench/e2e_bench.py -t <trace> -s 10
+"""
+
+import getopt
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import bb_worker
+import brick_worker
+import cryostat_worker
+import fault_proxy
+import feanta_server
+import pdu_worker
+import resolver
+import run_sims
+import sf_multicast
+import traffic_trace
+
+USAGE = 'e2e_bench.py [-d <seconds>] [-w <warmup>] [-r <commands/s>] ' \
+        '[-l <device latency>] [-j <device jitter>] ' \
+        '[-t <trace> [-s <speed>]] [-o <report.json>]'
+
+# Commands issued under load, one per worker, chosen so that they can be
+# repeated indefinitely without changing what is measured.
+COMMAND_LOAD = {'PDU-Worker': 'ND-ON',
+                'BB-Worker': 'LNA-ENABLE hh on',
+                'GeoBrick-Worker': 'FRM-ENABLE',
+                'Cryostat-Worker': 'CRYO-LOG-STOP',
+                'Server': 'FEM-STATS'}
+
+# Longest wait in seconds for a command to complete.
+COMMAND_TIMEOUT = 10.0
+
+# Device hostnames pointed at the simulators.
+SIM_HOSTNAMES = [pdu_worker.PDU_HOSTNAME,
+                 bb_worker.BB_HOSTNAME,
+                 brick_worker.BRICK_HOSTNAME,
+                 feanta_server.ACC_HOSTNAME]
+
+
+def free_port():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def run_simulators(latency, jitter, connection):
+    devices, servers, addresses = run_sims.start_all(latency, jitter)
+    connection.send(addresses)
+    # Serve until the benchmark closes its end of the pipe.
+    try:
+        connection.recv()
+    except EOFError:
+        pass
+
+
+# region Class Description
+"""
+Class: FakeACC
+    Description:
+        Receives stateframes as the ACC does, one per connection, and
+        records the time each frame completed and its size.
+"""
+# endregion
+class FakeACC(object):
+    def __init__(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.frames = []
+        self.recording = False
+
+    def __run(self):
+        while True:
+            connection, address = self.listener.accept()
+            frame = ''
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                frame += chunk
+            connection.close()
+            if self.recording:
+                self.frames.append((time.time(), len(frame)))
+
+    def start(self):
+        thread = threading.Thread(target=self.__run)
+        thread.daemon = True
+        thread.start()
+
+
+# region Class Description
+"""
+Class: FakeSubscriber
+    Description:
+        Receives the stateframes the daemon fans out, as a GUI or logger
+        subscribed to MULTICAST_GROUP would.
+"""
+# endregion
+class FakeSubscriber(object):
+    def __init__(self):
+        self.receiver = sf_multicast.StateframeReceiver('127.0.0.1', 0)
+        self.port = self.receiver.receiver.getsockname()[1]
+
+    def __run(self):
+        while True:
+            self.receiver.receive()
+
+    def start(self):
+        thread = threading.Thread(target=self.__run)
+        thread.daemon = True
+        thread.start()
+
+
+# region Class Description
+"""
+Class: CommandLoad
+    Description:
+        Issues the commands in COMMAND_LOAD to the daemon in random order
+        at a given total rate, one connection per command as the ACC does,
+        and records the latency of each complete reply per worker.
+    Arguments:
+        port: the daemon's command port.
+        rate: commands per second.
+"""
+# endregion
+class CommandLoad(object):
+    def __init__(self, port, rate):
+        self.port = port
+        self.rate = rate
+        self.latencies = dict((name, []) for name in COMMAND_LOAD.keys())
+        self.failures = dict((name, 0) for name in COMMAND_LOAD.keys())
+        self.recording = False
+        self.running = False
+
+    def __issue(self, name):
+        start = time.time()
+        try:
+            connection = socket.create_connection(('127.0.0.1', self.port),
+                                                  COMMAND_TIMEOUT)
+            try:
+                connection.sendall(COMMAND_LOAD[name])
+                while connection.recv(4096):
+                    pass
+            finally:
+                connection.close()
+        except socket.error:
+            if self.recording:
+                self.failures[name] += 1
+            return
+        if self.recording:
+            self.latencies[name].append((time.time() - start) * 1000)
+
+    def __run(self):
+        names = COMMAND_LOAD.keys()
+        while self.running:
+            start = time.time()
+            self.__issue(random.choice(names))
+            time.sleep(max(0, start + 1.0 / self.rate - time.time()))
+
+    def start(self):
+        if self.rate > 0:
+            self.running = True
+            thread = threading.Thread(target=self.__run)
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        self.running = False
+
+
+# region Method Description
+"""
+Method: run
+    Description:
+        Runs the benchmark.
+    Arguments:
+        duration: seconds measured.
+        warmup: seconds run before measuring, so that every worker has
+            connected and sampled.
+        rate: commands per second driven against the daemon.
+        latency: mean reply latency of the simulated devices in seconds.
+        jitter: spread of the simulated reply latency in seconds.
+        trace: optional path of a trace replayed instead of running the
+            simulators.
+        speed: factor by which the replayed latencies are shortened.
+    Returns:
+        report: dictionary of results.
+"""
+# endregion
+def run(duration, warmup, rate, latency, jitter, trace=None, speed=1.0):
+    # Start the simulators in a child process, unless replaying.
+    replayer = None
+    simulators = None
+    if trace is None:
+        parent, child = multiprocessing.Pipe()
+        simulators = multiprocessing.Process(target=run_simulators,
+                                             args=(latency, jitter, child))
+        simulators.daemon = True
+        simulators.start()
+        addresses = parent.recv()
+    else:
+        replayer = traffic_trace.TraceReplayer(
+            traffic_trace.read_trace(trace), speed)
+
+    # Point the daemon and its workers at the simulators and fake ACC.
+    acc = FakeACC()
+    acc.start()
+    for hostname in SIM_HOSTNAMES:
+        resolver.RESOLVER.addresses[hostname] = ('127.0.0.1', time.time())
+    if simulators is not None:
+        pdu_worker.PDU_PORT = addresses['pdu'][1]
+        bb_worker.BB_PORT = addresses['bb'][1]
+        brick_worker.BRICK_PORT = addresses['brick'][1]
+        cryostat_worker.CRYO_PORT = addresses['lakeshore']
+        cryostat_worker.CRYO_BYTESIZE = 8
+        cryostat_worker.CRYO_PARITY = 'N'
+    feanta_server.ACC_PORT = acc.port
+    feanta_server.HOST_PORT = free_port()
+    feanta_server.EVENT_PORT = free_port()
+    feanta_server.METRICS_PORT = free_port()
+    feanta_server.ARCHIVE_DIR = tempfile.mkdtemp(prefix='e2e_bench_')
+    feanta_server.SHM_PATH = os.path.join(feanta_server.ARCHIVE_DIR,
+                                          'fem_stateframe')
+    subscriber = FakeSubscriber()
+    subscriber.start()
+    feanta_server.MULTICAST_GROUP = '127.0.0.1'
+    feanta_server.MULTICAST_PORT = subscriber.port
+
+    log_file = '/tmp/e2e_bench_%d.log' % os.getpid()
+    server = feanta_server.ServerDaemon('/tmp/e2e_bench.pid')
+    server.set_log_file(log_file)
+    for worker in [pdu_worker.PDUWorker(), brick_worker.BrickWorker(),
+                   bb_worker.BBWorker(), cryostat_worker.CryoWorker()]:
+        server.link_worker(worker)
+    server.set_tracer(replayer)
+    daemon_thread = threading.Thread(target=server.run)
+    daemon_thread.daemon = True
+    daemon_thread.start()
+
+    load = CommandLoad(feanta_server.HOST_PORT, rate)
+    load.start()
+    time.sleep(warmup)
+
+    # Measure.
+    acc.recording = True
+    load.recording = True
+    start_usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.time()
+    time.sleep(duration)
+    elapsed = time.time() - start
+    end_usage = resource.getrusage(resource.RUSAGE_SELF)
+    acc.recording = False
+    load.recording = False
+    load.stop()
+    # The daemon is left running, so the exit skips multiprocessing's
+    # cleanup; stop the simulators here.
+    if simulators is not None:
+        parent.close()
+        simulators.terminate()
+        simulators.join()
+    archive = server.archive.status()
+    server.archive.stop()
+    published = server.shm.published
+    server.shm.close()
+    fanout = {'sent': server.fanout.sent,
+              'dropped': server.fanout.dropped,
+              'received': subscriber.receiver.received,
+              'missed': subscriber.receiver.missed}
+    shutil.rmtree(feanta_server.ARCHIVE_DIR, True)
+
+    frames = list(acc.frames)
+    times = [frame[0] for frame in frames]
+    intervals = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+    expected = feanta_server.FRAME_INTERVAL * 1000
+    user = end_usage.ru_utime - start_usage.ru_utime
+    system = end_usage.ru_stime - start_usage.ru_stime
+    with open('/proc/self/statm') as statm:
+        rss = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    commands = {}
+    for name in COMMAND_LOAD.keys():
+        commands[name] = fault_proxy.summarize(load.latencies[name])
+        commands[name]['command'] = COMMAND_LOAD[name]
+        commands[name]['failures'] = load.failures[name]
+
+    report = {'version': feanta_server.VERSION,
+              'config': {'duration_s': duration,
+                         'warmup_s': warmup,
+                         'command_rate': rate,
+                         'device_latency_s': latency,
+                         'device_jitter_s': jitter,
+                         'frame_interval_s': feanta_server.FRAME_INTERVAL},
+              'frames': {'count': len(frames),
+                         'rate_hz': len(frames) / elapsed,
+                         'expected_rate_hz': 1000.0 / expected,
+                         'bytes': frames[-1][1] if frames else 0,
+                         'interval_ms': fault_proxy.summarize(intervals),
+                         'jitter_ms': fault_proxy.summarize(
+                             [abs(interval - expected)
+                              for interval in intervals])},
+              'commands': commands,
+              'cpu': {'user_s': user,
+                      'system_s': system,
+                      'percent': 100.0 * (user + system) / elapsed},
+              'memory': {'rss_bytes': rss,
+                         'max_rss_kb': end_usage.ru_maxrss},
+              'threads': threading.active_count(),
+              'archive': archive,
+              'shm': {'published': published},
+              'fanout': fanout}
+    if replayer is not None:
+        report['config']['trace'] = trace
+        report['config']['replay_speed'] = speed
+        report['replay'] = {'exchanges': replayer.replayed,
+                            'misses': replayer.misses}
+    return report
+
+
+def main(argv):
+    duration = 30.0
+    warmup = 5.0
+    rate = 2.0
+    latency = 0.002
+    jitter = 0.001
+    trace = None
+    speed = 1.0
+    output_file = None
+    try:
+        opts, args = getopt.getopt(argv, 'hd:w:r:l:j:t:s:o:',
+                                   ['duration=', 'warmup=', 'rate=',
+                                    'latency=', 'jitter=', 'trace=',
+                                    'speed=', 'output='])
+        for opt, arg in opts:
+            if opt == '-h':
+                print USAGE
+                sys.exit()
+            elif opt in ['-d', '--duration']:
+                duration = float(arg)
+            elif opt in ['-w', '--warmup']:
+                warmup = float(arg)
+            elif opt in ['-r', '--rate']:
+                rate = float(arg)
+            elif opt in ['-l', '--latency']:
+                latency = float(arg)
+            elif opt in ['-j', '--jitter']:
+                jitter = float(arg)
+            elif opt in ['-t', '--trace']:
+                trace = arg
+            elif opt in ['-s', '--speed']:
+                speed = float(arg)
+            elif opt in ['-o', '--output']:
+                output_file = arg
+    except (getopt.GetoptError, ValueError):
+        print USAGE
+        sys.exit(2)
+
+    # The daemon prints its log; keep it out of the report.
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        report = run(duration, warmup, rate, latency, jitter, trace, speed)
+    finally:
+        sys.stdout = stdout
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output_file is None:
+        print text
+    else:
+        with open(output_file, 'w') as output:
+            output.write(text + '\n')
+    # The daemon's threads never exit on their own.
+    sys.stdout.flush()
+    os._exit(0)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,282 @@
+#!/usr/bin/python2.6
+
+"""
+    STARBURST ACC/FEANTA Microbenchmarks
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+
+    Times each CPU-bound step between a device reply and a packed
+    stateframe on its own, over payloads recorded from the device
+    simulators, so that a change to any one of them can be measured in
+    isolation. Each benchmark reports operations per second, taken from the
+    fastest of several runs, and the GC-tracked objects left allocated per
+    operation. Python 2 exposes no allocation counter without a debug
+    build, so the latter counts what each operation leaves to the cyclic
+    collector, i.e. reference cycles, cache growth and leaks, not
+    temporaries freed straight away. Run with core, gen and sim on
+    PYTHONPATH, i.e. from the top of the repository:
+
+        PYTHONPATH=core:gen:sim python bench/micro_bench.py
+"""
+
+import gc
+import getopt
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import bb_sim
+import bb_worker
+import brick_sim
+import brick_worker
+import cryostat_worker
+import gen_fem_sf
+import lakeshore_sim
+import pdu_sim
+import pdu_worker
+
+USAGE = 'micro_bench.py [-t <seconds per run>] [-r <runs>] ' \
+        '[-b <benchmark>[,<benchmark>...]] [-o <report.json>]'
+
+# Seed for the simulated readings, so that payloads are the same each run.
+PAYLOAD_SEED = 1
+
+# Command encoded by the brick_command benchmark.
+BRICK_COMMAND = 'P1000=3 P1001=45'
+
+
+# region Class Description
+"""
+Class: RecordedBrick
+    Description:
+        Stands in for the BrickClient of a BrickWorker, answering LIST
+        GATHER with a recorded reply so that stateframe_query decodes
+        without touching the network.
+    Arguments:
+        reply: recorded reply to LIST GATHER.
+"""
+# endregion
+class RecordedBrick(object):
+    def __init__(self, reply):
+        self.reply = reply
+
+    def getresponse(self, command):
+        return self.reply
+
+
+# region Method Description
+"""
+Method: record_payloads
+    Description:
+        Records one reply of each kind from the device simulators, with
+        the noise diode on and an axis moving so that no field is trivial.
+    Returns:
+        payloads: dictionary of replies keyed by device.
+"""
+# endregion
+def record_payloads():
+    random.seed(PAYLOAD_SEED)
+    pdu = pdu_sim.PDUSim()
+    pdu.outlets[-1] = 1
+    brick = brick_sim.BrickSim()
+    brick.command(BRICK_COMMAND)
+    time.sleep(0.01)
+    return {'pdu': pdu.index_page(),
+            'bb': bb_sim.BBSim().read_block(),
+            'brick': brick.gather(),
+            'lakeshore': lakeshore_sim.LakeshoreSim().query('krdg? 0')}
+
+
+# region Method Description
+"""
+Method: make_benchmarks
+    Description:
+        Builds the benchmarked operations over recorded payloads. Private
+        worker methods are called through their mangled names.
+    Arguments:
+        payloads: dictionary returned by record_payloads.
+        xml_dir: directory gen_fem_sf writes its XML under when asked to.
+    Returns:
+        benchmarks: list of (name, operation) in the order they are run.
+"""
+# endregion
+def make_benchmarks(payloads, xml_dir):
+    pdu = pdu_worker.PDUWorker()
+    bb = bb_worker.BBWorker()
+    brick = brick_worker.BrickWorker()
+    brick.client = RecordedBrick(payloads['brick'])
+    cryo = cryostat_worker.CryoWorker()
+
+    parse_pdu = pdu._PDUWorker__parse_status_page
+    parse_bb = bb._BBWorker__parse_lna_block
+    parse_gather = brick._BrickWorker__parse_gather
+    str2float = brick._BrickWorker__str2float
+    make_command = brick._BrickWorker__make_brick_command
+    parse_cryo = cryo._CryoWorker__parse_temperatures
+
+    # A complete stateframe as make_stateframe_dict assembles it.
+    statuses, volts, current = parse_pdu(payloads['pdu'])
+    valid = {'VALID': 1, 'AGE': 100}
+    powerstrip = {'STATUS': statuses, 'VOLTS': volts, 'CURRENT': current}
+    thermal = {'CRYOSTAT': parse_cryo(payloads['lakeshore']),
+               'FOCUSBOX': 0}
+    receiver = {'LNAS': parse_bb(payloads['bb']),
+                'LOFREQSTATUS': 0,
+                'HIFREQSTATUS': 0,
+                'NOISESTATUS': 0}
+    servo = brick.stateframe_query()
+    for cluster in [powerstrip, thermal, receiver, servo]:
+        cluster.update(valid)
+    sf_dict = {'FEM': {'POWERSTRIP': powerstrip,
+                       'THERMAL': thermal,
+                       'RECEIVER': receiver,
+                       'SERVO': servo,
+                       'VERSION': gen_fem_sf.VERSION,
+                       'SEQUENCE': 1,
+                       'TIMESTAMP': time.time() + 2082844800}}
+
+    word = payloads['brick'].split('\r')[3]
+
+    def pack():
+        gen_fem_sf.gen_fem_sf(sf_dict)
+
+    def pack_xml():
+        # gen_fem_sf writes its XML relative to the working directory and
+        # prints the frame size.
+        cwd = os.getcwd()
+        stdout = sys.stdout
+        os.chdir(xml_dir)
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            gen_fem_sf.gen_fem_sf(sf_dict, True)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(cwd)
+
+    return [('gen_fem_sf', pack),
+            ('gen_fem_sf_xml', pack_xml),
+            ('pdu_status_page', lambda: parse_pdu(payloads['pdu'])),
+            ('bb_lna_block', lambda: parse_bb(payloads['bb'])),
+            ('brick_str2float', lambda: str2float(word)),
+            ('brick_gather', lambda: parse_gather(payloads['brick'])),
+            ('brick_stateframe', brick.stateframe_query),
+            ('brick_command',
+             lambda: make_command('download', 'getresponse', 0, 0,
+                                  [BRICK_COMMAND])),
+            ('cryo_temperatures',
+             lambda: parse_cryo(payloads['lakeshore']))]
+
+
+# region Method Description
+"""
+Method: measure
+    Description:
+        Times an operation. The number of operations per run is doubled
+        until a run takes at least run_time, then the fastest of the runs
+        is kept. Objects left to the collector are counted with it
+        disabled over one further run.
+    Arguments:
+        operation: function taking no arguments.
+        run_time: shortest time in seconds of a timed run.
+        runs: number of timed runs.
+    Returns:
+        result: dictionary of operations per second, microseconds per
+            operation, objects left per operation and the number of
+            operations per run.
+"""
+# endregion
+def measure(operation, run_time, runs):
+    operation()
+
+    def timed(count):
+        start = time.time()
+        for i in xrange(count):
+            operation()
+        return time.time() - start
+
+    count = 1
+    while timed(count) < run_time:
+        count *= 2
+    best = min(timed(count) for run in range(runs))
+
+    gc.collect()
+    gc.disable()
+    try:
+        before = gc.get_count()[0]
+        for i in xrange(count):
+            operation()
+        retained = gc.get_count()[0] - before
+    finally:
+        gc.enable()
+
+    return {'ops_per_s': count / best,
+            'us_per_op': best / count * 1e6,
+            'objects_per_op': float(retained) / count,
+            'ops_per_run': count}
+
+
+# region Method Description
+"""
+Method: run
+    Description:
+        Runs the benchmarks.
+    Arguments:
+        run_time: shortest time in seconds of a timed run.
+        runs: number of timed runs per benchmark.
+        names: names of the benchmarks to run, None for all of them.
+    Returns:
+        report: dictionary of results keyed by benchmark.
+"""
+# endregion
+def run(run_time, runs, names=None):
+    xml_dir = tempfile.mkdtemp(prefix='micro_bench_')
+    os.mkdir(os.path.join(xml_dir, 'tmp'))
+    os.mkdir(os.path.join(xml_dir, 'starburst'))
+    try:
+        report = {}
+        for name, operation in make_benchmarks(record_payloads(), xml_dir):
+            if names is None or name in names:
+                report[name] = measure(operation, run_time, runs)
+        return report
+    finally:
+        shutil.rmtree(xml_dir, True)
+
+
+def main(argv):
+    run_time = 0.2
+    runs = 5
+    names = None
+    output_file = None
+    try:
+        opts, args = getopt.getopt(argv, 'ht:r:b:o:',
+                                   ['time=', 'runs=', 'benchmarks=',
+                                    'output='])
+        for opt, arg in opts:
+            if opt == '-h':
+                print USAGE
+                sys.exit()
+            elif opt in ['-t', '--time']:
+                run_time = float(arg)
+            elif opt in ['-r', '--runs']:
+                runs = int(arg)
+            elif opt in ['-b', '--benchmarks']:
+                names = arg.split(',')
+            elif opt in ['-o', '--output']:
+                output_file = arg
+    except (getopt.GetoptError, ValueError):
+        print USAGE
+        sys.exit(2)
+
+    text = json.dumps(run(run_time, runs, names), indent=2, sort_keys=True)
+    if output_file is None:
+        print text
+    else:
+        with open(output_file, 'w') as output:
+            output.write(text + '\n')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
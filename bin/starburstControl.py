@@ -13,32 +13,39 @@ import server_runner
 def main(argv):
     pid_file = '/tmp/server.pid'
     log_file = '/tmp/log.txt'
+    archive_dir = None
 
     # Process command arguments and execute.
     try:
-        opts, args = getopt.getopt(argv, 'hp:l:',
+        opts, args = getopt.getopt(argv, 'hp:l:a:',
                                    ['logfile=',
                                     'pidfile=',
+                                    'archive=',
                                     'start',
                                     'stop'])
     except getopt.GetoptError:
-        print 'starburstControl -p <pidfile> -l <logfile> <command>'
+        print 'starburstControl -p <pidfile> -l <logfile> ' \
+              '[-a <archive>] <command>'
         sys.exit(2)
     if len(args) != 1:
-        print 'starburstControl -p <pidfile> -l <logfile> <command>'
+        print 'starburstControl -p <pidfile> -l <logfile> ' \
+              '[-a <archive>] <command>'
         sys.exit(2)
 
     for opt, arg in opts:
         if opt == '-h':
-            print 'starburstControl -p <pidfile> -l <logfile> <command>'
+            print 'starburstControl -p <pidfile> -l <logfile> ' \
+                  '[-a <archive>] <command>'
             sys.exit()
         elif opt in ['-l', '--logfile']:
             log_file = arg
         elif opt in ['-p', '--pipdfile']:
             pid_file = arg
+        elif opt in ['-a', '--archive']:
+            archive_dir = arg
 
     if args[0] == 'start':
-        server_runner.start(pid_file, log_file)
+        server_runner.start(pid_file, log_file, archive_dir)
     else:
         server_runner.stop(pid_file)
 
@@ -5,13 +5,21 @@
 """
 
 import i_worker
-import numpy as np
+import resolver
+import rtt_estimator
 import socket
+import time
+
+# Device drivers, imported on first use by __load_drivers.
+np = None
 
 # Description of the BeagleBone device. Currently hard-coded.
 BB_HOSTNAME = 'lna14.solar.pvt'
 BB_PORT = 50002
 BB_TIMEOUT = 0.3
+BB_TIMEOUT_MIN = 0.02
+BB_TIMEOUT_MAX = 1.0
+BB_POLL_INTERVAL = 0.5
 
 # Scale Factors
 DRAIN_FACTOR = 0.300
@@ -40,9 +48,27 @@ class BBWorker(i_worker.IWorker):
                          'LNA-DRAIN',
                          'LNA-ENABLE']
         self.name = 'BB-Worker'
-        self.bb_socket = None
-        self.bb_ip = socket.gethostbyname(BB_HOSTNAME)
-        self.dt = np.dtype('float32').newbyteorder('>')
+        self.poll_interval = BB_POLL_INTERVAL
+        self.dt = None
+        self.rtt = rtt_estimator.RTTEstimator(BB_TIMEOUT, BB_TIMEOUT_MIN,
+                                              BB_TIMEOUT_MAX)
+        resolver.RESOLVER.register(BB_HOSTNAME)
+
+    # region Method Description
+    """
+    Method: __load_drivers
+        Description:
+            Imports numpy the first time it is needed so that it is not
+            loaded when the server starts.
+    """
+    # endregion
+    def __load_drivers(self):
+        global np
+        if np is None:
+            import numpy
+            np = numpy
+        if self.dt is None:
+            self.dt = np.dtype('float32').newbyteorder('>')
 
     # ---------------------------------------------------------------
     # COMMAND ROUTINES
@@ -210,14 +236,59 @@ class BBWorker(i_worker.IWorker):
     # STATEFRAME HELPERS
     # ---------------------------------------------------------------
     def __lna_query(self):
+        self.__load_drivers()
         query_cmd = 'read\r\n'
-        query_socket = socket.socket(socket.AF_INET,
-                                     socket.SOCK_STREAM)
-        query_socket.settimeout(BB_TIMEOUT)
-        query_socket.connect((self.bb_ip, BB_PORT))
-        query_socket.sendall(query_cmd)
-        read_buf = query_socket.recv(96)
-        query_socket.close()
+        read_buf = self.trace('bb', query_cmd,
+                              lambda: self.__send(query_cmd, 96))
+        return self.__parse_lna_block(read_buf)
+
+    # region Method Description
+    """
+    Method: __send
+        Description:
+            Sends a command to the BeagleBone over a new connection and
+            reads its reply, if one is expected.
+        Arguments:
+            command: command including its line terminator.
+            reply_length: number of bytes to read back, 0 for none.
+        Returns:
+            reply: bytes read from the BeagleBone.
+    """
+    # endregion
+    def __send(self, command, reply_length=0):
+        bb_ip = resolver.RESOLVER.resolve(BB_HOSTNAME)
+        bb_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        bb_socket.settimeout(self.rtt.timeout())
+        reply = ''
+        try:
+            start = time.time()
+            bb_socket.connect((bb_ip, BB_PORT))
+            bb_socket.sendall(command)
+            if reply_length > 0:
+                reply = bb_socket.recv(reply_length)
+                self.rtt.sample(time.time() - start)
+        except socket.timeout:
+            self.rtt.backoff()
+            raise
+        finally:
+            bb_socket.close()
+        return reply
+
+    # region Method Description
+    """
+    Method: __parse_lna_block
+        Description:
+            Decodes the block of big-endian floats read from the
+            BeagleBone into the readings of each amplifier.
+        Arguments:
+            read_buf: bytes read from the BeagleBone.
+        Returns:
+            amps: list of four dictionaries of readings keyed as in
+                QUERY_DICT, one per amplifier.
+    """
+    # endregion
+    def __parse_lna_block(self, read_buf):
+        self.__load_drivers()
         data = np.fromstring(read_buf, self.dt)
 
         amp0 = {}
@@ -265,17 +336,11 @@ class BBWorker(i_worker.IWorker):
         command_strings = self.function_map[acc_command[0]](self, acc_command)
         if command_strings is not None:
             for command_string in command_strings:
-                self.bb_socket = socket.socket(socket.AF_INET,
-                                               socket.SOCK_STREAM)
-                self.bb_socket.settimeout(BB_TIMEOUT)
-                self.bb_socket.connect((self.bb_ip, BB_PORT))
                 self.logger('The following command was issued: ' +
                             command_string)
-
                 command_string += '\r\n'
-                self.bb_socket.sendall(command_string)
-                self.bb_socket.close()
-                self.bb_socket = None
+                self.trace('bb', command_string,
+                           lambda: self.__send(command_string))
 
     # region Method Description
     """
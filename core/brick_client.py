@@ -0,0 +1,358 @@
+"""
+    STARBURST ACC/FEANTA GeoBrick Ethernet Client
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import resolver
+import socket
+import struct
+import threading
+import time
+
+# Dictionaries for ethernet packets to the Brick.
+RQ_TYPE = {'upload': '\xc0',
+           'download': '\x40'}
+RQ = {'sendline': '\xb0',
+      'getline': '\xb1',
+      'flush': '\xb3',
+      'getmem': '\xb4',
+      'setmem': '\xb5',
+      'setbit': '\xba',
+      'setbits': '\xbb',
+      'port': '\xbe',
+      'getresponse': '\xbf',
+      'readready': '\xc2',
+      'response': '\xc4',
+      'getbuffer': '\xc5',
+      'writebuffer': '\xc6',
+      'writeerror': '\xc7',
+      'fwdownload': '\xcb',
+      'ipaddress': '\xe0'}
+
+# Control characters used by the Brick to frame its replies.
+ACK = '\x06'
+BELL = '\x07'
+CR = '\r'
+
+# Largest data block the Brick accepts or returns in a single packet, and
+# a guard on the total size of a reassembled response.
+MAX_PACKET_DATA = 1400
+MAX_RESPONSE = 65536
+
+
+# region Class Description
+"""
+Class: BrickError
+    Description:
+        Raised when the Brick answers a request with an error reply,
+        i.e. <BELL>ERRxxx<CR>, or when a reply cannot be framed.
+"""
+# endregion
+class BrickError(Exception):
+    pass
+
+
+# region Method Description
+"""
+Method: make_packet
+    Description:
+        Packages a request to the Brick into an ethernet packet recognized
+        by the Brick system. The header is the request type, request,
+        value and index followed by the data length in network order.
+    Arguments:
+        rq_type: type of request, either 'upload' or 'download'.
+        rq: nature of request, lookup dictionary defined in RQ.
+        val: value associated with the request.
+        index: index associated with the request.
+        data: string to be sent with the request, or None.
+        terminate: whether a null terminator is appended to data, as
+            required for text commands.
+    Returns:
+        buf: the packet as a string.
+"""
+# endregion
+def make_packet(rq_type, rq, val, index, data=None, terminate=True):
+    if data is None:
+        data = ''
+    elif terminate:
+        data += '\x00'
+    buf = RQ_TYPE[rq_type] + RQ[rq]
+    buf += struct.pack('<HH', val, index)
+    buf += struct.pack('>H', len(data))
+    buf += data
+    return buf
+
+
+# region Class Description
+"""
+Class: BrickClient
+    Description:
+        Client for the GeoBrick ethernet protocol over a single persistent
+        TCP connection. Every request is framed by the length of the reply
+        it expects, or for text replies by the terminating <ACK> or error
+        sequence, so replies spanning several TCP segments are reassembled
+        and short reads are never misparsed. Requests are serialized so
+        the client may be shared between threads. On any socket or
+        framing error the connection is dropped and reopened on the next
+        request. Connect and read timeouts are taken from a round-trip
+        time estimator that every exchange reports to.
+    Arguments:
+        hostname: hostname of the Brick, resolved through the shared
+            resolver each time the connection is opened.
+        port: port of the Brick's ethernet interface.
+        rtt: RTTEstimator providing the connect and read timeout.
+        trace: optional method every exchange is made through, taking the
+            device name, the packet and a method carrying out the
+            exchange, i.e. IWorker.trace.
+"""
+# endregion
+class BrickClient(object):
+    def __init__(self, hostname, port, rtt, trace=None):
+        self.hostname = hostname
+        self.port = port
+        self.rtt = rtt
+        self.trace = trace
+        self.brick_socket = None
+        self.lock = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # CONNECTION ROUTINES
+    # ---------------------------------------------------------------
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Closes the connection to the Brick if one is open.
+    """
+    # endregion
+    def close(self):
+        if self.brick_socket is not None:
+            try:
+                self.brick_socket.close()
+            except socket.error:
+                pass
+            self.brick_socket = None
+
+    def __connect(self):
+        if self.brick_socket is None:
+            brick_ip = resolver.RESOLVER.resolve(self.hostname)
+            brick_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            brick_socket.settimeout(self.rtt.timeout())
+            brick_socket.connect((brick_ip, self.port))
+            self.brick_socket = brick_socket
+        else:
+            self.brick_socket.settimeout(self.rtt.timeout())
+        return self.brick_socket
+
+    def __recv_exact(self, length):
+        buf = ''
+        while len(buf) < length:
+            chunk = self.brick_socket.recv(length - len(buf))
+            if not chunk:
+                raise BrickError('Connection closed by Brick.')
+            buf += chunk
+        return buf
+
+    def __recv_response(self):
+        buf = ''
+        while True:
+            chunk = self.brick_socket.recv(MAX_PACKET_DATA)
+            if not chunk:
+                raise BrickError('Connection closed by Brick.')
+            buf += chunk
+            # An error replaces the response, so only a reply starting
+            # with <BELL> is an error. Errors buffered from earlier
+            # commands are part of the text of a getbuffer or getline
+            # reply and end with its <ACK> like any other text.
+            if buf.startswith(BELL):
+                if CR in buf:
+                    raise BrickError(buf[1:buf.find(CR)])
+            elif buf.endswith(ACK):
+                return buf[:-1]
+            if len(buf) > MAX_RESPONSE:
+                raise BrickError('Response from Brick exceeds ' +
+                                 str(MAX_RESPONSE) + ' bytes.')
+
+    # region Method Description
+    """
+    Method: __exchange
+        Description:
+            Sends a packet and reads its reply, reconnecting first if
+            needed and dropping the connection if the exchange fails. The
+            exchange is made through the trace method, if one was given.
+        Arguments:
+            packet: packet built by make_packet.
+            reply_length: number of bytes in the reply, or None if the
+                reply is a text response terminated by <ACK>.
+        Returns:
+            reply: the reply with any terminating <ACK> removed.
+    """
+    # endregion
+    def __exchange(self, packet, reply_length=None):
+        if self.trace is None:
+            return self.__transfer(packet, reply_length)
+        return self.trace('brick', packet,
+                          lambda: self.__transfer(packet, reply_length))
+
+    def __transfer(self, packet, reply_length):
+        with self.lock:
+            try:
+                brick_socket = self.__connect()
+                start = time.time()
+                brick_socket.sendall(packet)
+                if reply_length is None:
+                    reply = self.__recv_response()
+                else:
+                    reply = self.__recv_exact(reply_length)
+                self.rtt.sample(time.time() - start)
+                return reply
+            except socket.timeout:
+                self.rtt.backoff()
+                self.close()
+                raise
+            except (socket.error, BrickError):
+                self.close()
+                raise
+
+    # ---------------------------------------------------------------
+    # REQUEST ROUTINES
+    # ---------------------------------------------------------------
+
+    # region Method Description
+    """
+    Method: request
+        Description:
+            Sends a prebuilt getresponse packet, such as those built by
+            BrickWorker, and returns the reassembled text response.
+        Arguments:
+            packet: packet built by make_packet.
+        Returns:
+            response: text response from the Brick without the <ACK>.
+    """
+    # endregion
+    def request(self, packet):
+        return self.__exchange(packet)
+
+    # region Method Description
+    """
+    Method: getresponse
+        Description:
+            Sends a command line to the Brick and returns its complete
+            response, which may be several lines separated by <CR>.
+        Arguments:
+            command: command string, i.e. 'LIST GATHER'.
+        Returns:
+            response: text response from the Brick without the <ACK>.
+    """
+    # endregion
+    def getresponse(self, command):
+        return self.__exchange(make_packet('download', 'getresponse',
+                                           0, 0, command))
+
+    # region Method Description
+    """
+    Method: sendline
+        Description:
+            Sends a command line to the Brick without waiting for its
+            response. The response can be read later with getline or
+            getbuffer.
+        Arguments:
+            command: command string.
+    """
+    # endregion
+    def sendline(self, command):
+        self.__exchange(make_packet('download', 'sendline', 0, 0, command),
+                        1)
+
+    # region Method Description
+    """
+    Method: getline
+        Description:
+            Reads the next available line of response from the Brick.
+        Returns:
+            line: text of the line without its terminator.
+    """
+    # endregion
+    def getline(self):
+        line = self.__exchange(make_packet('upload', 'getline', 0, 0))
+        return line.rstrip(CR)
+
+    # region Method Description
+    """
+    Method: flush
+        Description:
+            Discards any pending response in the Brick's buffers.
+    """
+    # endregion
+    def flush(self):
+        self.__exchange(make_packet('download', 'flush', 0, 0), 1)
+
+    # region Method Description
+    """
+    Method: readready
+        Description:
+            Checks whether the Brick has response data waiting to be read.
+        Returns:
+            True if data is available, False otherwise.
+    """
+    # endregion
+    def readready(self):
+        reply = self.__exchange(make_packet('upload', 'readready', 0, 0), 2)
+        return reply[0] != '\x00'
+
+    # region Method Description
+    """
+    Method: getbuffer
+        Description:
+            Reads the whole of the Brick's pending response buffer, issuing
+            as many getbuffer requests as needed while readready reports
+            that more data is waiting.
+        Returns:
+            response: concatenated text of the buffer.
+    """
+    # endregion
+    def getbuffer(self):
+        response = ''
+        while True:
+            response += self.__exchange(make_packet('upload', 'getbuffer',
+                                                    0, 0))
+            if len(response) > MAX_RESPONSE or not self.readready():
+                return response
+
+    # region Method Description
+    """
+    Method: writebuffer
+        Description:
+            Downloads several command lines to the Brick, packing as many
+            null terminated lines into each packet as fit. The Brick
+            replies to each packet with four bytes, the last of which has
+            its high bit set if a line was rejected.
+        Arguments:
+            lines: list of command strings.
+    """
+    # endregion
+    def writebuffer(self, lines):
+        packets = []
+        data = ''
+        for line in lines:
+            line += '\x00'
+            if len(line) > MAX_PACKET_DATA:
+                raise BrickError('Line longer than ' +
+                                 str(MAX_PACKET_DATA) + ' bytes.')
+            if len(data) + len(line) > MAX_PACKET_DATA:
+                packets.append(data)
+                data = ''
+            data += line
+        if data:
+            packets.append(data)
+
+        for data in packets:
+            reply = self.__exchange(make_packet('download', 'writebuffer',
+                                                0, 0, data, False), 4)
+            if ord(reply[3]) & 0x80:
+                raise BrickError('Brick rejected line ' +
+                                 str(struct.unpack('<I', reply[:3] +
+                                                   '\x00')[0]) +
+                                 ' of buffer.')
@@ -0,0 +1,221 @@
+"""
+    STARBURST GeoBrick Ethernet Client Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import socket
+import struct
+import threading
+import time
+import unittest
+import brick_client
+import resolver
+import rtt_estimator
+
+# Hostname the client is pointed at, resolved to the fake Brick.
+HOSTNAME = 'fake-brick'
+
+# Bounds of the client's timeout, short so that tests of unanswered
+# requests end quickly.
+TIMEOUT = 0.2
+TIMEOUT_MIN = 0.05
+TIMEOUT_MAX = 0.5
+
+# Pause between the pieces of a reply, so that each reaches the client in
+# its own read.
+CHUNK_PAUSE = 0.02
+
+
+# region Class Description
+"""
+Class: FakeBrick
+    Description:
+        Scripted stand-in for the Brick's ethernet interface. Each packet
+        received is recorded and answered with the next reply of the
+        script, sent as the listed pieces with a pause between them. A
+        reply of None closes the connection instead of answering, and a
+        reply of [] leaves the packet unanswered.
+    Arguments:
+        replies: list of replies, each a list of strings or None.
+"""
+# endregion
+class FakeBrick(object):
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.packets = []
+        self.connections = 0
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        thread = threading.Thread(target=self.__serve)
+        thread.daemon = True
+        thread.start()
+
+    def __serve(self):
+        while True:
+            try:
+                connection, address = self.listener.accept()
+            except socket.error:
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            while self.__answer(connection):
+                pass
+            connection.close()
+
+    def __answer(self, connection):
+        header = self.__read(connection, 8)
+        if header is None:
+            return False
+        data = self.__read(connection, struct.unpack('>H', header[6:])[0])
+        if data is None:
+            return False
+        self.packets.append(header + data)
+        reply = self.replies.pop(0)
+        if reply is None:
+            return False
+        for chunk in reply:
+            connection.sendall(chunk)
+            time.sleep(CHUNK_PAUSE)
+        return True
+
+    def __read(self, connection, length):
+        buf = ''
+        while len(buf) < length:
+            try:
+                chunk = connection.recv(length - len(buf))
+            except socket.error:
+                return None
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+    def close(self):
+        self.listener.close()
+
+
+"""
+TestBrickClient Test Group Description:
+    This group of tests makes sure that brick_client.py frames the
+    Brick's replies however they are split across reads, tells error
+    replies from buffered text holding errors, reads the whole pending
+    buffer, and reconnects after the connection is dropped.
+
+    Test Count: 6
+"""
+class TestBrickClient(unittest.TestCase):
+    def setUp(self):
+        resolver.RESOLVER.addresses[HOSTNAME] = ('127.0.0.1', time.time())
+        self.brick = None
+        self.client = None
+
+    def tearDown(self):
+        if self.client is not None:
+            self.client.close()
+        if self.brick is not None:
+            self.brick.close()
+
+    def __start(self, replies):
+        self.brick = FakeBrick(replies)
+        self.rtt = rtt_estimator.RTTEstimator(TIMEOUT, TIMEOUT_MIN,
+                                              TIMEOUT_MAX)
+        self.client = brick_client.BrickClient(HOSTNAME, self.brick.port,
+                                               self.rtt)
+
+    """
+    Test - test_repliesSplitAcrossReadsAreReassembled:
+        Given a text response and fixed length replies each split into
+        several pieces, the <ACK> arriving on its own,
+        Then every reply is reassembled whole over one connection.
+    """
+    def test_repliesSplitAcrossReadsAreReassembled(self):
+        self.__start([['1.5\r', '2.', '5\r', brick_client.ACK],
+                      ['\x01', '\x00'],
+                      ['\x00\x00', '\x00', '\x00']])
+        self.assertEqual(self.client.getresponse('P1 P2'), '1.5\r2.5\r')
+        self.assertTrue(self.client.readready())
+        self.client.writebuffer(['P1=1', 'P2=2'])
+        self.assertEqual(self.brick.connections, 1)
+        self.assertEqual(self.brick.packets[0],
+                         brick_client.make_packet('download', 'getresponse',
+                                                  0, 0, 'P1 P2'))
+
+    """
+    Test - test_errorReplyIsRaisedAndConnectionReopened:
+        Given a reply of <BELL>ERRxxx<CR> split across reads between
+        replies ending in <ACK>,
+        Then the error is raised as a BrickError, and the next request
+        is answered over a new connection.
+    """
+    def test_errorReplyIsRaisedAndConnectionReopened(self):
+        self.__start([['OK', brick_client.ACK],
+                      [brick_client.BELL + 'ERR', '003' + brick_client.CR],
+                      ['DONE' + brick_client.ACK]])
+        self.assertEqual(self.client.getresponse('A'), 'OK')
+        try:
+            self.client.getresponse('B')
+            self.fail('Error reply was not raised.')
+        except brick_client.BrickError, e:
+            self.assertEqual(str(e), 'ERR003')
+        self.assertEqual(self.client.getresponse('C'), 'DONE')
+        self.assertEqual(self.brick.connections, 2)
+
+    """
+    Test - test_bufferedErrorsAreText:
+        Given a pending buffer holding the error of an earlier command,
+        read with the <ACK> arriving in a later read,
+        Then the buffer is returned as text rather than raised.
+    """
+    def test_bufferedErrorsAreText(self):
+        text = '1\r' + brick_client.BELL + 'ERR003' + brick_client.CR
+        self.__start([[text, brick_client.ACK],
+                      ['\x00\x00']])
+        self.assertEqual(self.client.getbuffer(), text)
+
+    """
+    Test - test_bufferIsReadUntilEmpty:
+        Given a pending buffer that takes two getbuffer requests to read,
+        Then getbuffer asks readready after each and returns the whole
+        buffer.
+    """
+    def test_bufferIsReadUntilEmpty(self):
+        self.__start([['LINE1\r', brick_client.ACK],
+                      ['\x01\x00'],
+                      ['LINE2\r' + brick_client.ACK],
+                      ['\x00', '\x00']])
+        self.assertEqual(self.client.getbuffer(), 'LINE1\rLINE2\r')
+        requests = [packet[1] for packet in self.brick.packets]
+        self.assertEqual(requests, [brick_client.RQ['getbuffer'],
+                                    brick_client.RQ['readready']] * 2)
+
+    """
+    Test - test_droppedConnectionIsReopened:
+        Given the Brick closing the connection instead of replying,
+        Then the request raises a BrickError and the next request is
+        answered over a new connection.
+    """
+    def test_droppedConnectionIsReopened(self):
+        self.__start([None, ['OK' + brick_client.ACK]])
+        self.assertRaises(brick_client.BrickError,
+                          self.client.getresponse, 'A')
+        self.assertEqual(self.client.brick_socket, None)
+        self.assertEqual(self.client.getresponse('A'), 'OK')
+        self.assertEqual(self.brick.connections, 2)
+
+    """
+    Test - test_unansweredRequestTimesOut:
+        Given a request the Brick never answers,
+        Then it times out, the timeout is backed off, and the next
+        request is answered over a new connection rather than receiving
+        the late reply.
+    """
+    def test_unansweredRequestTimesOut(self):
+        self.__start([[], ['OK' + brick_client.ACK]])
+        self.assertRaises(socket.timeout, self.client.getresponse, 'A')
+        self.assertEqual(self.rtt.timeout(), min(TIMEOUT * 2, TIMEOUT_MAX))
+        self.assertEqual(self.client.brick_socket, None)
+        self.assertEqual(self.client.getresponse('B'), 'OK')
@@ -4,14 +4,33 @@
     Email: lkkung@caltech.edu
 """
 
+import brick_client
 import i_worker
+import resolver
+import rtt_estimator
 import socket
-import struct
+import threading
+import time
 
 # Description of the GeoBrick device. Currently hard-coded.
 BRICK_HOSTNAME = 'geobrickanta.solar.pvt'
 BRICK_PORT = 1025
 BRICK_TIMEOUT = 0.5
+BRICK_TIMEOUT_MIN = 0.02
+BRICK_TIMEOUT_MAX = 2.0
+BRICK_POLL_INTERVAL = 1.0
+
+# Adaptive polling. While any axis is moving, or for MOTION_HOLD_TIME after
+# a move was commanded or last seen, the Brick is polled every
+# BRICK_MOTION_POLL_INTERVAL instead of BRICK_POLL_INTERVAL. An axis is
+# seen to be moving when its position error or motor current exceeds the
+# thresholds below, which must sit above the noise and holding current.
+BRICK_MOTION_POLL_INTERVAL = 0.05
+MOTION_HOLD_TIME = 2.0
+MOTION_PERR_THRESHOLD = {1: 0.01,
+                         3: 0.1,
+                         4: 0.01}
+MOTION_CURRENT_THRESHOLD = 0.1
 
 # Program spaces that can be used in the GeoBrick.
 COMMAND_REGIS = 'P1000='
@@ -30,24 +49,8 @@ COMMAND_DICT = {'Home': 1,
                 'SetZ': 9}
 
 # Dictionaries for ethernet packets to the Brick.
-RQ_TYPE = {'upload': '\xc0',
-           'download': '\x40'}
-RQ = {'sendline': '\xb0',
-      'getline': '\xb1',
-      'flush': '\xb3',
-      'getmem': '\xb4',
-      'setmem': '\xb5',
-      'setbit': '\xba',
-      'setbits': '\xbb',
-      'port': '\xbe',
-      'getresponse': '\xbf',
-      'readready': '\xc2',
-      'response': '\xc4',
-      'getbuffer': '\xc5',
-      'writebuffer': '\xc6',
-      'writeerror': '\xc7',
-      'fwdownload': '\xcb',
-      'ipaddress': '\xe0'}
+RQ_TYPE = brick_client.RQ_TYPE
+RQ = brick_client.RQ
 COORDINATE = {1: 'Z',
               3: 'A',
               4: 'X'}
@@ -56,6 +59,27 @@ AXIS_SCALING = {1: 42.5636 * 96 * 32,
                 4: 3973.477 * 96 * 32}
 MPADDRESSSTART = 900
 
+# Scan parameters. Each scan axis maps to the Brick axis number that
+# reports its position and the Brick command used to move it.
+SCAN_AXES = {'Z': (1, 'SetZ'),
+             'PA': (3, 'SetAngle'),
+             'X': (4, 'SetX')}
+SCAN_TOLERANCE = {1: 0.01,
+                  3: 0.1,
+                  4: 0.01}
+SCAN_POLL_INTERVAL = 0.02
+SCAN_SETTLE_COUNT = 3
+SCAN_MOVE_TIMEOUT = 60.0
+
+# Move commands that are watched for completion. Each maps to the Brick
+# axis that is moved, or None for homing which moves every axis.
+MOTION_COMMANDS = {'FRM-HOME': None,
+                   'FRM-ABS-Z': 1,
+                   'FRM-SET-PA': 3,
+                   'FRM-ABS-X': 4}
+MOTION_START_TIMEOUT = 2.0
+HOME_TIMEOUT = 180.0
+
 class BrickWorker(i_worker.IWorker):
     def __init__(self):
         super(BrickWorker, self).__init__()
@@ -67,10 +91,26 @@ class BrickWorker(i_worker.IWorker):
                          'FRM-Z-OFFSET',
                          'FRM-ABS-X',
                          'FRM-ABS-Z',
-                         'FRM-ENABLE']
-        self.brick_socket = None
-        self.brick_ip = socket.gethostbyname(BRICK_HOSTNAME)
+                         'FRM-ENABLE',
+                         'FRM-SCAN',
+                         'FRM-WAIT']
+        self.motion_id = 0
+        self.motion_event = threading.Event()
+        self.motion_event.set()
+        self.motion_result = 'IDLE'
+        self.motion_cancel = threading.Event()
+        self.scan_lock = threading.Lock()
+        self.scan_thread = None
+        self.scan_cancel = threading.Event()
+        self.last_motion_time = 0
+        self.rtt = rtt_estimator.RTTEstimator(BRICK_TIMEOUT,
+                                              BRICK_TIMEOUT_MIN,
+                                              BRICK_TIMEOUT_MAX)
+        self.client = brick_client.BrickClient(BRICK_HOSTNAME, BRICK_PORT,
+                                               self.rtt, self.trace)
+        resolver.RESOLVER.register(BRICK_HOSTNAME)
         self.name = 'GeoBrick-Worker'
+        self.poll_interval = BRICK_POLL_INTERVAL
 
     # ---------------------------------------------------------------
     # COMMAND PACKAGING ROUTINES SPECIFIC TO GEOBRICK
@@ -93,13 +133,8 @@ class BrickWorker(i_worker.IWorker):
     def __make_brick_command(self, rq_type, rq, val, index, command_packets):
         packets = []
         for packet in command_packets:
-            buf = RQ_TYPE[rq_type] + RQ[rq]
-            buf += struct.pack('H', val)
-            buf += struct.pack('H', index)
-            buf += struct.pack('H', socket.htons(len(packet) + 1))
-            buf += struct.pack(str(len(packet)) + 's', packet)
-            buf += struct.pack("B", 0)
-            packets.append(buf)
+            packets.append(brick_client.make_packet(rq_type, rq, val, index,
+                                                    packet))
         return packets
 
     # ---------------------------------------------------------------
@@ -362,6 +397,157 @@ class BrickWorker(i_worker.IWorker):
                self.__make_brick_command('download', 'getresponse',
                                         0, 0, command_packets)
 
+    # ---------------------------------------------------------------
+    # PROCEDURE ROUTINES
+    # ---------------------------------------------------------------
+
+    #region Method Description
+    """
+    Method: __frm_scan
+        Description:
+            Starts a focus or position angle scan local to this box and
+            replies straight away, so that the listener stays free for
+            other commands, i.e. FRM-KILL, while the scan runs. The scan
+            itself is run by __run_scan on its own thread and reports its
+            progress as events through the worker's publisher. Only one
+            scan runs at a time.
+        Arguments:
+            acc_command: list of strings sent from the ACC. List format:
+                ['FRM-SCAN', axis, position1, dwell1, position2, dwell2, ...]
+                where axis is one of 'Z', 'X' or 'PA', positions are in
+                physical units and dwells are in seconds.
+        Returns:
+            reply: 'SCAN-STARTED <axis> <targets>', or 'SCAN-BUSY' if a
+                scan is already running.
+    """
+    #endregion
+    def __frm_scan(self, acc_command):
+        # Error check that the command given is formatted correctly.
+        if len(acc_command) < 4 or len(acc_command) % 2 != 0:
+            self.logger('Invalid call to FRM-SCAN.')
+            return None
+        axis_name = acc_command[1].upper()
+        if axis_name not in SCAN_AXES:
+            self.logger('Invalid call to FRM-SCAN.')
+            return None
+        axis, move = SCAN_AXES[axis_name]
+        targets = []
+        try:
+            for i in range(2, len(acc_command), 2):
+                position = float(acc_command[i])
+                dwell = float(acc_command[i + 1])
+                if dwell < 0:
+                    raise ValueError('Invalid dwell time.')
+                if axis == 3:
+                    position = int(position)
+                    if position > 90 or position < -90:
+                        raise ValueError('Invalid position angle selection.')
+                targets.append((position, dwell))
+        except ValueError:
+            self.logger('Invalid call to FRM-SCAN.')
+            return None
+
+        with self.scan_lock:
+            if self.scan_thread is not None and self.scan_thread.is_alive():
+                return 'SCAN-BUSY\n'
+            self.scan_cancel.clear()
+            self.scan_thread = threading.Thread(target=self.__run_scan,
+                                                args=(axis_name, axis, move,
+                                                      targets))
+            self.scan_thread.daemon = True
+            self.scan_thread.start()
+        return 'SCAN-STARTED %s %d\n' % (axis_name, len(targets))
+
+    #region Method Description
+    """
+    Method: __run_scan
+        Description:
+            Runs a scan started by FRM-SCAN. Each target is commanded in
+            turn, the Brick is polled directly at SCAN_POLL_INTERVAL until
+            the axis settles on the target, and the axis then dwells for
+            the requested time before the next target is commanded. Each
+            target reached is published as
+            'SCAN-TARGET <index> <target> <reached time> <elapsed>
+            <position>', where reached time is in seconds since the epoch.
+            The scan ends by publishing one of:
+                'SCAN-COMPLETE <targets>' once every target was reached,
+                'SCAN-ABORTED <index> <target> SEND-FAILED' if the move
+                    could not be commanded,
+                'SCAN-ABORTED <index> <target> TIMEOUT <elapsed>
+                    <position>' if the target was not reached within
+                    SCAN_MOVE_TIMEOUT,
+                'SCAN-CANCELLED <index>' if FRM-KILL was issued.
+        Arguments:
+            axis_name: scan axis, one of SCAN_AXES.
+            axis: Brick axis number moved.
+            move: Brick command moving the axis.
+            targets: list of (position, dwell) pairs.
+    """
+    #endregion
+    def __run_scan(self, axis_name, axis, move, targets):
+        self.logger('Starting ' + axis_name + ' scan over ' +
+                    str(len(targets)) + ' targets.')
+        for index, (position, dwell) in enumerate(targets):
+            if self.scan_cancel.is_set():
+                self.__end_scan('SCAN-CANCELLED %d' % index)
+                return
+            self.__note_motion()
+            command = COMMAND_REGIS + str(COMMAND_DICT[move]) + \
+                      ARG1_REGIS + str(position)
+            packets = self.__make_brick_command('download', 'getresponse',
+                                                0, 0, [command])
+            if len(self.__send_packets(packets)) < len(packets):
+                self.__end_scan('SCAN-ABORTED %d %s SEND-FAILED' %
+                                (index, str(position)))
+                return
+            start = time.time()
+            reached, final_position = self.__wait_for_position(
+                axis, position, self.scan_cancel)
+            if self.scan_cancel.is_set():
+                self.__end_scan('SCAN-CANCELLED %d' % index)
+                return
+            if reached is None:
+                self.__end_scan('SCAN-ABORTED %d %s TIMEOUT %.3f %.4f' %
+                                (index, str(position), time.time() - start,
+                                 final_position))
+                return
+            self.publisher('SCAN-TARGET %d %s %.3f %.3f %.4f' %
+                           (index, str(position), reached, reached - start,
+                            final_position))
+            self.scan_cancel.wait(dwell)
+        self.__end_scan('SCAN-COMPLETE %d' % len(targets))
+
+    def __end_scan(self, event):
+        self.logger('FRM-SCAN ended: ' + event)
+        self.publisher(event)
+
+    #region Method Description
+    """
+    Method: __frm_wait
+        Description:
+            Reports the state of the most recent move issued with
+            FRM-HOME, FRM-ABS-X, FRM-ABS-Z or FRM-SET-PA without waiting,
+            so that the listener is never held by a move. Replies with
+            the move's completion event once it has completed,
+            MOTION-PENDING while it is still being watched, or IDLE if no
+            move has been issued since startup. To be told of completion
+            rather than poll for it, subscribe to the event channel.
+        Arguments:
+            acc_command: list of strings sent from the ACC. List format:
+                ['FRM-WAIT']
+        Returns:
+            reply: the state of the most recent move.
+    """
+    #endregion
+    def __frm_wait(self, acc_command):
+        # Error check that the command given is formatted correctly.
+        if len(acc_command) != 1:
+            self.logger('Invalid call to FRM-WAIT.')
+            return None
+        if not self.motion_event.is_set():
+            return 'MOTION-PENDING\n'
+        return self.motion_result + '\n'
+
     # ---------------------------------------------------------------
     # FUNCTION MAP
     # ---------------------------------------------------------------
@@ -375,21 +561,27 @@ class BrickWorker(i_worker.IWorker):
                     'FRM-ABS-Z': __frm_abs_z,
                     'FRM-ENABLE': __frm_enable}
 
+    procedure_map = {'FRM-SCAN': __frm_scan,
+                     'FRM-WAIT': __frm_wait}
+
     # ---------------------------------------------------------------
     # STATEFRAME HELPERS
     # ---------------------------------------------------------------
     def __brickmonitor_query(self):
-        command = 'LIST GATHER'
-        query_socket = socket.socket(socket.AF_INET,
-                                     socket.SOCK_STREAM)
-        query_socket.settimeout(BRICK_TIMEOUT)
-        query_socket.connect((self.brick_ip, BRICK_PORT))
-        cmd_string = [command]
-        cmd = self.__make_brick_command('download', 'getresponse',
-                                        0, 0, cmd_string)
-        query_socket.sendall(cmd[0])
-        response = query_socket.recv(1024)
-        query_socket.close()
+        return self.__parse_gather(self.client.getresponse('LIST GATHER'))
+
+    #region Method Description
+    """
+    Method: __parse_gather
+        Description:
+            Decodes the words listed by LIST GATHER.
+        Arguments:
+            response: reply to LIST GATHER, words separated by <CR>.
+        Returns:
+            parsed_response: list of the decoded values.
+    """
+    #endregion
+    def __parse_gather(self, response):
         response = response.replace('\r', ' ')
         response = response.split(' ')
         parsed_response = []
@@ -404,7 +596,212 @@ class BrickWorker(i_worker.IWorker):
             num = int(str_val, 16)
         except Exception:
             num = 0
-        return (num >> 12) * 2**((num & 0xFFF) - 2082)
+        # The mantissa is 36 bit two's complement.
+        mantissa = num >> 12
+        if mantissa & (1 << 35):
+            mantissa -= 1 << 36
+        return mantissa * 2**((num & 0xFFF) - 2082)
+
+    #region Method Description
+    """
+    Method: __note_motion
+        Description:
+            Records that an axis is moving, switching stateframe polling to
+            the fast rate and asking for a poll straight away.
+    """
+    #endregion
+    def __note_motion(self):
+        idle = not self.__is_moving()
+        self.last_motion_time = time.time()
+        if idle:
+            self.poll_now()
+
+    def __is_moving(self):
+        return time.time() - self.last_motion_time < MOTION_HOLD_TIME
+
+    #region Method Description
+    """
+    Method: __wait_for
+        Description:
+            Polls the Brick directly at SCAN_POLL_INTERVAL until the given
+            condition has held for SCAN_SETTLE_COUNT consecutive reads.
+        Arguments:
+            condition: function accepting a stateframe dictionary as
+                returned by stateframe_query and returning True when the
+                Brick is in the desired state.
+            timeout: maximum time to wait in seconds.
+            cancel: optional event that ends the wait early when set.
+        Returns:
+            [0]: time at which the condition first held, or None if it did
+                not settle within the timeout or was cancelled.
+            [1]: last stateframe dictionary read from the Brick, or None if
+                no read succeeded.
+    """
+    #endregion
+    def __wait_for(self, condition, timeout=SCAN_MOVE_TIMEOUT, cancel=None):
+        deadline = time.time() + timeout
+        settled_count = 0
+        settled_time = None
+        frame = None
+        while time.time() < deadline:
+            if cancel is not None and cancel.is_set():
+                break
+            poll_time = time.time()
+            try:
+                frame = self.stateframe_query()
+            except (socket.error, brick_client.BrickError, IndexError):
+                settled_count = 0
+            else:
+                if condition(frame):
+                    if settled_count == 0:
+                        settled_time = poll_time
+                    settled_count += 1
+                    if settled_count >= SCAN_SETTLE_COUNT:
+                        return settled_time, frame
+                else:
+                    settled_count = 0
+            time.sleep(max(0, SCAN_POLL_INTERVAL - (time.time() - poll_time)))
+        return None, frame
+
+    #region Method Description
+    """
+    Method: __wait_for_position
+        Description:
+            Waits until the given axis reports a position within
+            SCAN_TOLERANCE of the target.
+        Arguments:
+            axis: Brick axis number (1, 3 or 4).
+            target: target position in physical units.
+            cancel: optional event that ends the wait early when set.
+        Returns:
+            [0]: time at which the axis first settled on the target, or
+                None if the target was not reached in SCAN_MOVE_TIMEOUT.
+            [1]: last position read from the axis.
+    """
+    #endregion
+    def __wait_for_position(self, axis, target, cancel=None):
+        key = 'AXIS' + str(axis)
+        settled_time, frame = self.__wait_for(
+            lambda frame: abs(frame[key]['P'] - target) <=
+                          SCAN_TOLERANCE[axis], cancel=cancel)
+        position = 0.0
+        if frame is not None:
+            position = frame[key]['P']
+        return settled_time, position
+
+    #region Method Description
+    """
+    Method: __wait_for_home
+        Description:
+            Waits until the Brick reports that homing has finished, i.e.
+            HOMED reads 1 and every axis has a position error within
+            SCAN_TOLERANCE. Because HOMED may still be set from a previous
+            homing, completion is not accepted until HOMED has been seen
+            to clear or MOTION_START_TIMEOUT has elapsed.
+        Arguments:
+            cancel: optional event that ends the wait early when set.
+        Returns:
+            [0]: time at which homing finished, or None if it did not
+                finish within HOME_TIMEOUT.
+            [1]: last stateframe dictionary read from the Brick.
+    """
+    #endregion
+    def __wait_for_home(self, cancel=None):
+        start = time.time()
+        state = {'started': False}
+
+        def homed(frame):
+            if frame['HOMED'] == 0:
+                state['started'] = True
+                return False
+            if not state['started'] and \
+                    time.time() - start < MOTION_START_TIMEOUT:
+                return False
+            for axis in COORDINATE.keys():
+                if abs(frame['AXIS' + str(axis)]['PERR']) > \
+                        SCAN_TOLERANCE[axis]:
+                    return False
+            return True
+
+        return self.__wait_for(homed, HOME_TIMEOUT, cancel)
+
+    #region Method Description
+    """
+    Method: __watch_motion
+        Description:
+            Watches a move issued by execute until it completes and
+            publishes a completion event through the worker's publisher,
+            formatted as 'MOTION-COMPLETE <command> <target> <position>
+            <elapsed>', or 'MOTION-TIMEOUT ...' or 'MOTION-CANCELLED ...'
+            alike if the move did not settle in time or FRM-KILL was
+            issued. For FRM-HOME the target is HOME and the position is
+            the final position of every axis, in axis order, joined by
+            commas. If another move is issued while this one is being
+            watched, this watcher exits without publishing.
+        Arguments:
+            motion_id: id of the move being watched.
+            command: the ACC command that started the move.
+            axis: Brick axis number being moved, or None for FRM-HOME.
+            target: target position of the move, or None for FRM-HOME.
+            cancel: event set when the move is killed or superseded.
+    """
+    #endregion
+    def __watch_motion(self, motion_id, command, axis, target, cancel):
+        start = time.time()
+        if axis is None:
+            settled_time, frame = self.__wait_for_home(cancel)
+            positions = [0.0] * len(COORDINATE)
+            if frame is not None:
+                positions = [frame['AXIS' + str(home_axis)]['P']
+                             for home_axis in sorted(COORDINATE.keys())]
+            position = ','.join('%.4f' % value for value in positions)
+            target = 'HOME'
+        else:
+            settled_time, position = self.__wait_for_position(axis, target,
+                                                              cancel)
+            position = '%.4f' % position
+
+        if motion_id != self.motion_id:
+            return
+        if cancel.is_set():
+            event = 'MOTION-CANCELLED %s %s %s %.3f' % \
+                    (command, str(target), position, time.time() - start)
+        elif settled_time is None:
+            event = 'MOTION-TIMEOUT %s %s %s %.3f' % \
+                    (command, str(target), position, time.time() - start)
+        else:
+            event = 'MOTION-COMPLETE %s %s %s %.3f' % \
+                    (command, str(target), position, settled_time - start)
+        self.motion_result = event
+        self.motion_event.set()
+        self.publisher(event)
+
+    #region Method Description
+    """
+    Method: __send_packets
+        Description:
+            Pushes each of the given packets to the Brick over the
+            client's connection and logs the replies.
+        Arguments:
+            packets: list of TCP/Ethernet packets ready to be sent.
+        Returns:
+            replies: list of the replies received from the Brick.
+    """
+    #endregion
+    def __send_packets(self, packets):
+        replies = []
+        try:
+            for packet in packets:
+                reply = self.client.request(packet)
+                self.logger('Reply from brick: ' + reply)
+                replies.append(reply)
+        except socket.gaierror:
+            self.logger('Brick hostname could not be resolved.')
+        except socket.error:
+            self.logger('Unable to send packet to brick.')
+        except brick_client.BrickError, e:
+            self.logger('Brick rejected command: ' + str(e))
+        return replies
 
     # ---------------------------------------------------------------
     # INTERFACE IMPLEMENTATIONS
@@ -430,6 +827,16 @@ class BrickWorker(i_worker.IWorker):
     """
     # endregion
     def execute(self, acc_command):
+        # A kill also stops any scan running at its next check, and the
+        # watcher of any move.
+        if acc_command[0] == 'FRM-KILL':
+            self.scan_cancel.set()
+            self.motion_cancel.set()
+
+        # Procedures run locally and reply to the ACC directly.
+        if acc_command[0] in self.procedure_map:
+            return self.procedure_map[acc_command[0]](self, acc_command)
+
         # Use the routine functions to get the commands to push.
         packets = self.function_map[acc_command[0]](
                     self, acc_command)
@@ -439,25 +846,53 @@ class BrickWorker(i_worker.IWorker):
             for packet in packets[0]:
                 self.logger(repr(packet))
 
-            # Try pushing message across TCP.
-            # Wait for reply of at most 1024 bytes.
-            try:
-                for packet in packets[1]:
-                    reply = None
-                    self.brick_socket = socket.socket(socket.AF_INET,
-                                              socket.SOCK_STREAM)
-                    self.brick_socket.connect((self.brick_ip, BRICK_PORT))
-                    self.brick_socket.sendall(packet)
-                    self.brick_socket.settimeout(BRICK_TIMEOUT)
-                    reply = self.brick_socket.recv(1024)
-
-                    self.logger('Reply from brick: ' + reply)
-                    self.brick_socket.close()
-                    self.brick_socket = None
-            except socket.gaierror:
-                self.logger('Brick hostname could not be resolved.')
-            except socket.error:
-                self.logger('Unable to send packet to brick.')
+            replies = self.__send_packets(packets[1])
+
+            # Watch moves for completion in the background, superseding
+            # the watcher of any earlier move. A move that could not be
+            # commanded is reported straight away instead.
+            if acc_command[0] in MOTION_COMMANDS:
+                axis = MOTION_COMMANDS[acc_command[0]]
+                target = None
+                if axis == 3:
+                    target = int(acc_command[1])
+                elif axis is not None:
+                    target = float(acc_command[1])
+                self.motion_cancel.set()
+                self.motion_cancel = threading.Event()
+                self.motion_id += 1
+                if len(replies) < len(packets[1]):
+                    event = 'MOTION-ABORTED %s %s SEND-FAILED' % \
+                            (acc_command[0],
+                             'HOME' if axis is None else str(target))
+                    self.logger('Move failed: ' + event)
+                    self.motion_result = event
+                    self.motion_event.set()
+                    self.publisher(event)
+                    return
+                self.__note_motion()
+                self.motion_event.clear()
+                watcher = threading.Thread(target=self.__watch_motion,
+                                           args=(self.motion_id,
+                                                 acc_command[0],
+                                                 axis, target,
+                                                 self.motion_cancel))
+                watcher.daemon = True
+                watcher.start()
+
+    # region Method Description
+    """
+    Method: get_poll_interval
+        Description:
+            Returns BRICK_MOTION_POLL_INTERVAL while the servo cluster is
+            moving and BRICK_POLL_INTERVAL otherwise. Refer to abstract
+            class IWorker located in i_worker.py for full description.
+    """
+    # endregion
+    def get_poll_interval(self):
+        if self.__is_moving():
+            return BRICK_MOTION_POLL_INTERVAL
+        return BRICK_POLL_INTERVAL
 
     # region Method Description
     """
@@ -523,4 +958,11 @@ class BrickWorker(i_worker.IWorker):
         stateframe_data['AXIS4']['AMPFAULT'] = \
             int(fetched_data[23])
 
+        # Keep polling fast for as long as any axis is seen moving.
+        for axis in COORDINATE.keys():
+            axis_data = stateframe_data['AXIS' + str(axis)]
+            if abs(axis_data['PERR']) > MOTION_PERR_THRESHOLD[axis] or \
+                    abs(axis_data['I']) > MOTION_CURRENT_THRESHOLD:
+                self.last_motion_time = time.time()
+
         return stateframe_data
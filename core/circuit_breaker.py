@@ -0,0 +1,109 @@
+"""
+    STARBURST ACC/FEANTA Worker Circuit Breaker
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import threading
+import time
+
+# Circuit states.
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+# Number of consecutive failures after which the circuit opens, and the
+# bounds of the exponential backoff between probes while it is open.
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_INITIAL_BACKOFF = 1.0
+BREAKER_MAX_BACKOFF = 30.0
+
+
+# region Class Description
+"""
+Class: CircuitBreaker
+    Description:
+        Health state machine for a single worker. While the circuit is
+        CLOSED every call is allowed. After BREAKER_FAILURE_THRESHOLD
+        consecutive failures the circuit OPENs and calls are refused
+        without touching the device. Once the backoff has elapsed a single
+        probe call is allowed (HALF_OPEN); if it succeeds the circuit
+        closes, otherwise it reopens with the backoff doubled, up to
+        BREAKER_MAX_BACKOFF. Only state changes and the first failure of
+        a run of failures are logged.
+    Arguments:
+        name: name of the worker guarded by this breaker.
+        logger: method accepting one argument, a string to be logged.
+"""
+# endregion
+class CircuitBreaker(object):
+    def __init__(self, name, logger):
+        self.name = name
+        self.logger = logger
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = BREAKER_INITIAL_BACKOFF
+        self.retry_time = 0
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: allow
+        Description:
+            Checks whether a call to the worker should be made.
+        Returns:
+            True if the call should be made, False if it should be skipped
+            and defaults used instead.
+    """
+    # endregion
+    def allow(self):
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() >= self.retry_time:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    # region Method Description
+    """
+    Method: success
+        Description:
+            Records a successful call, closing the circuit.
+    """
+    # endregion
+    def success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                self.logger('Circuit for ' + self.name + ' closed after ' +
+                            str(self.failures) + ' failures.')
+            self.state = CLOSED
+            self.failures = 0
+            self.backoff = BREAKER_INITIAL_BACKOFF
+
+    # region Method Description
+    """
+    Method: failure
+        Description:
+            Records a failed call, opening the circuit if the threshold is
+            reached or if a probe failed.
+        Arguments:
+            message: description of the failure, logged only if this is
+                the first failure since the last success.
+    """
+    # endregion
+    def failure(self, message):
+        with self.lock:
+            self.failures += 1
+            if self.failures == 1:
+                self.logger(message)
+            if self.state == HALF_OPEN:
+                self.backoff = min(self.backoff * 2, BREAKER_MAX_BACKOFF)
+            elif self.state != CLOSED or \
+                    self.failures < BREAKER_FAILURE_THRESHOLD:
+                return
+            self.state = OPEN
+            self.retry_time = time.time() + self.backoff
+            self.logger('Circuit for ' + self.name + ' open after ' +
+                        str(self.failures) + ' failures, next probe in ' +
+                        str(self.backoff) + ' s.')
@@ -0,0 +1,120 @@
+"""
+    STARBURST Worker Circuit Breaker Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import time
+import unittest
+import circuit_breaker as cb
+
+
+# Stands in for the time module so that backoffs pass without waiting.
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+"""
+TestCircuitBreaker Test Group Description:
+    This group of tests makes sure that circuit_breaker.py opens after
+    BREAKER_FAILURE_THRESHOLD consecutive failures, allows a single probe
+    once the backoff has passed, and doubles the backoff up to
+    BREAKER_MAX_BACKOFF while probes fail.
+
+    Test Count: 4
+"""
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        cb.time = self.clock
+        self.messages = []
+        self.breaker = cb.CircuitBreaker('test', self.messages.append)
+
+    def tearDown(self):
+        cb.time = time
+
+    def __open(self):
+        for i in range(cb.BREAKER_FAILURE_THRESHOLD):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.failure('failed')
+
+    """
+    Test - test_circuitOpensAtThreshold:
+        Given consecutive failures,
+        Then the circuit stays CLOSED below the threshold, OPENs at it,
+        refuses calls until the backoff has passed and logs only the
+        first failure and the change of state.
+    """
+    def test_circuitOpensAtThreshold(self):
+        for i in range(cb.BREAKER_FAILURE_THRESHOLD - 1):
+            self.breaker.failure('failed')
+            self.assertEqual(self.breaker.state, cb.CLOSED)
+            self.assertTrue(self.breaker.allow())
+        self.breaker.failure('failed')
+        self.assertEqual(self.breaker.state, cb.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_time,
+                         self.clock.now + cb.BREAKER_INITIAL_BACKOFF)
+        self.assertEqual(len(self.messages), 2)
+
+    """
+    Test - test_successResetsFailures:
+        Given failures below the threshold followed by a success,
+        Then the count starts over and the circuit only opens after a
+        full run of failures.
+    """
+    def test_successResetsFailures(self):
+        for i in range(cb.BREAKER_FAILURE_THRESHOLD - 1):
+            self.breaker.failure('failed')
+        self.breaker.success()
+        self.assertEqual(self.breaker.failures, 0)
+        for i in range(cb.BREAKER_FAILURE_THRESHOLD - 1):
+            self.breaker.failure('failed')
+        self.assertEqual(self.breaker.state, cb.CLOSED)
+
+    """
+    Test - test_probeClosesCircuit:
+        Given an OPEN circuit whose backoff has passed,
+        Then a single probe is allowed HALF_OPEN and its success closes
+        the circuit with the backoff reset.
+    """
+    def test_probeClosesCircuit(self):
+        self.__open()
+        self.clock.now += cb.BREAKER_INITIAL_BACKOFF
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, cb.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, cb.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+        self.assertEqual(self.breaker.backoff, cb.BREAKER_INITIAL_BACKOFF)
+        self.assertTrue(self.breaker.allow())
+
+    """
+    Test - test_failedProbesDoubleBackoffToCap:
+        Given probes that keep failing,
+        Then the circuit reopens after each with the backoff doubled, up
+        to BREAKER_MAX_BACKOFF.
+    """
+    def test_failedProbesDoubleBackoffToCap(self):
+        self.__open()
+        backoff = cb.BREAKER_INITIAL_BACKOFF
+        while backoff < cb.BREAKER_MAX_BACKOFF * 2:
+            self.clock.now += self.breaker.backoff
+            self.assertTrue(self.breaker.allow())
+            self.breaker.failure('failed')
+            backoff = min(backoff * 2, cb.BREAKER_MAX_BACKOFF)
+            self.assertEqual(self.breaker.state, cb.OPEN)
+            self.assertEqual(self.breaker.backoff, backoff)
+            self.assertEqual(self.breaker.retry_time,
+                             self.clock.now + backoff)
+            if backoff == cb.BREAKER_MAX_BACKOFF:
+                break
+        self.clock.now += cb.BREAKER_MAX_BACKOFF
+        self.assertTrue(self.breaker.allow())
+        self.breaker.failure('failed')
+        self.assertEqual(self.breaker.backoff, cb.BREAKER_MAX_BACKOFF)
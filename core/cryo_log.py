@@ -0,0 +1,228 @@
+"""
+    STARBURST ACC/FEANTA Cryostat Temperature Log
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import numpy as np
+import os
+import struct
+
+# Number of temperatures in each Lakeshore reading.
+NSENSORS = 8
+
+# Record layouts. Raw readings and rollups are each appended to their own
+# file as fixed size little-endian records so that either file can be
+# memory-mapped directly as an array of these records.
+RAW_DTYPE = np.dtype([('TIME', '<f8'),
+                      ('TEMPS', '<f4', (NSENSORS,))])
+ROLLUP_DTYPE = np.dtype([('TIME', '<f8'),
+                         ('MIN', '<f4', (NSENSORS,)),
+                         ('MAX', '<f4', (NSENSORS,)),
+                         ('MEAN', '<f4', (NSENSORS,))])
+RAW_FMT = '<d' + str(NSENSORS) + 'f'
+ROLLUP_FMT = '<d' + str(3 * NSENSORS) + 'f'
+RAW_EXTENSION = '.raw'
+ROLLUP_EXTENSION = '.rollup'
+
+# Length of each rollup period in seconds.
+ROLLUP_PERIOD = 60.0
+
+
+# region Class Description
+"""
+Class: CryoLog
+    Description:
+        Time series log of Lakeshore readings. Every reading is appended
+        to a raw file, and the minimum, maximum and mean of each sensor
+        over every ROLLUP_PERIOD are appended to a rollup file. Queries
+        memory-map the files and decimate the requested window so that
+        long cooldowns can be returned in a bounded number of points.
+    Arguments:
+        path: path of the log without extension. The raw and rollup files
+            are path + RAW_EXTENSION and path + ROLLUP_EXTENSION.
+"""
+# endregion
+class CryoLog(object):
+    def __init__(self, path):
+        self.path = path
+        self.raw_file = None
+        self.rollup_file = None
+        self.period_start = None
+        self.period_min = None
+        self.period_max = None
+        self.period_sum = None
+        self.period_count = 0
+
+    # ---------------------------------------------------------------
+    # WRITING ROUTINES
+    # ---------------------------------------------------------------
+
+    # region Method Description
+    """
+    Method: open
+        Description:
+            Opens the log files for appending, creating them if needed.
+    """
+    # endregion
+    def open(self):
+        self.raw_file = open(self.path + RAW_EXTENSION, 'ab')
+        self.rollup_file = open(self.path + ROLLUP_EXTENSION, 'ab')
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Writes the rollup of any partial period and closes the files.
+    """
+    # endregion
+    def close(self):
+        self.__write_rollup()
+        for log_file in [self.raw_file, self.rollup_file]:
+            if log_file is not None:
+                log_file.close()
+        self.raw_file = None
+        self.rollup_file = None
+
+    # region Method Description
+    """
+    Method: append
+        Description:
+            Appends a reading to the raw file and folds it into the rollup
+            of the current period, writing the rollup out once the period
+            has ended.
+        Arguments:
+            timestamp: time of the reading in seconds since the epoch.
+            temperatures: list of NSENSORS temperatures in Kelvin. Missing
+                sensors are logged as 0.
+    """
+    # endregion
+    def append(self, timestamp, temperatures):
+        temps = list(temperatures[:NSENSORS])
+        temps += [0] * (NSENSORS - len(temps))
+
+        if self.period_start is not None and \
+                timestamp - self.period_start >= ROLLUP_PERIOD:
+            self.__write_rollup()
+        if self.period_start is None:
+            self.period_start = timestamp - timestamp % ROLLUP_PERIOD
+            self.period_min = list(temps)
+            self.period_max = list(temps)
+            self.period_sum = list(temps)
+            self.period_count = 1
+        else:
+            for i in range(NSENSORS):
+                self.period_min[i] = min(self.period_min[i], temps[i])
+                self.period_max[i] = max(self.period_max[i], temps[i])
+                self.period_sum[i] += temps[i]
+            self.period_count += 1
+
+        self.raw_file.write(struct.pack(RAW_FMT, timestamp, *temps))
+        self.raw_file.flush()
+
+    def __write_rollup(self):
+        if self.period_start is None or self.rollup_file is None:
+            return
+        mean = [total / self.period_count for total in self.period_sum]
+        self.rollup_file.write(struct.pack(ROLLUP_FMT, self.period_start,
+                                           *(self.period_min +
+                                             self.period_max + mean)))
+        self.rollup_file.flush()
+        self.period_start = None
+
+    # ---------------------------------------------------------------
+    # QUERY ROUTINES
+    # ---------------------------------------------------------------
+
+    def __map(self, extension, dtype):
+        path = self.path + extension
+        if not os.path.exists(path):
+            return np.zeros(0, dtype)
+        count = os.path.getsize(path) // dtype.itemsize
+        if count == 0:
+            return np.zeros(0, dtype)
+        return np.memmap(path, dtype, 'r', shape=(count,))
+
+    # region Method Description
+    """
+    Method: __pending_rollups
+        Description:
+            Rolls up the raw readings that are not yet in the rollup file,
+            i.e. those of the period still being logged, or of periods
+            left unwritten by a writer that did not close the log.
+        Arguments:
+            rollups: records of the rollup file.
+        Returns:
+            rows: array of ROLLUP_DTYPE records, one per period.
+    """
+    # endregion
+    def __pending_rollups(self, rollups):
+        raw = self.__map(RAW_EXTENSION, RAW_DTYPE)
+        if len(rollups) > 0:
+            lo = np.searchsorted(raw['TIME'],
+                                 rollups['TIME'][-1] + ROLLUP_PERIOD)
+            raw = raw[lo:]
+        if len(raw) == 0:
+            return np.zeros(0, ROLLUP_DTYPE)
+        periods = raw['TIME'] - raw['TIME'] % ROLLUP_PERIOD
+        edges = np.unique(periods, return_index=True)[1]
+        temps = raw['TEMPS']
+        return self.__reduce(periods, temps, temps, temps, edges)
+
+    # region Method Description
+    """
+    Method: query
+        Description:
+            Returns the readings between two times, decimated to at most
+            max_points rows. Each row is the start time of its bin and the
+            minimum, maximum and mean of each sensor over the bin. The
+            window is located by binary search on the time column. Windows
+            whose bins span at least ROLLUP_PERIOD are decimated from the
+            rollup file, together with the rollup so far of the period
+            still being logged, shorter ones from the raw readings.
+        Arguments:
+            start: start of the window in seconds since the epoch.
+            end: end of the window in seconds since the epoch.
+            max_points: maximum number of rows to return.
+        Returns:
+            rows: array of ROLLUP_DTYPE records.
+    """
+    # endregion
+    def query(self, start, end, max_points):
+        rollups = self.__map(ROLLUP_EXTENSION, ROLLUP_DTYPE)
+        if max_points > 0 and (end - start) / max_points >= ROLLUP_PERIOD:
+            lo, hi = np.searchsorted(rollups['TIME'], [start, end])
+            pending = self.__pending_rollups(rollups)
+            pending_lo, pending_hi = np.searchsorted(pending['TIME'],
+                                                     [start, end])
+            window = np.concatenate([rollups[lo:hi],
+                                     pending[pending_lo:pending_hi]])
+            if len(window) > 0:
+                return self.__decimate(window['TIME'], window['MIN'],
+                                       window['MAX'], window['MEAN'],
+                                       max_points)
+
+        raw = self.__map(RAW_EXTENSION, RAW_DTYPE)
+        lo, hi = np.searchsorted(raw['TIME'], [start, end])
+        window = raw[lo:hi]
+        temps = window['TEMPS']
+        return self.__decimate(window['TIME'], temps, temps, temps,
+                               max_points)
+
+    def __decimate(self, times, mins, maxs, means, max_points):
+        count = len(times)
+        if count == 0 or max_points <= 0:
+            return np.zeros(0, ROLLUP_DTYPE)
+        bins = min(count, max_points)
+        edges = (np.arange(bins) * count) // bins
+        return self.__reduce(times, mins, maxs, means, edges)
+
+    def __reduce(self, times, mins, maxs, means, edges):
+        widths = np.diff(np.append(edges, len(times))).reshape(len(edges), 1)
+        rows = np.zeros(len(edges), ROLLUP_DTYPE)
+        rows['TIME'] = times[edges]
+        rows['MIN'] = np.minimum.reduceat(mins, edges)
+        rows['MAX'] = np.maximum.reduceat(maxs, edges)
+        rows['MEAN'] = np.add.reduceat(np.asarray(means, np.float64),
+                                       edges) / widths
+        return rows
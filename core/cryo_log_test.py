@@ -0,0 +1,150 @@
+"""
+    STARBURST Cryostat Temperature Log Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import cryo_log
+
+# Start of the first rollup period logged by each test.
+START = 1000 * cryo_log.ROLLUP_PERIOD
+
+
+"""
+TestCryoLog Test Group Description:
+    This group of tests makes sure that cryo_log.py appends every reading
+    to the raw file, rolls the readings of each period up into their
+    minimum, maximum and mean, and answers queries from whichever file
+    suits the window.
+
+    Test Count: 5
+"""
+class TestCryoLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cryo')
+        self.log = cryo_log.CryoLog(self.path)
+        self.log.open()
+
+    def tearDown(self):
+        self.log.close()
+        shutil.rmtree(self.directory)
+
+    """
+    Test - test_readingsAreAppendedRaw:
+        Given readings of fewer and of more than NSENSORS temperatures,
+        Then each is appended as one raw record padded or cut to
+        NSENSORS.
+    """
+    def test_readingsAreAppendedRaw(self):
+        self.log.append(START, [1.0, 2.0])
+        self.log.append(START + 1, range(cryo_log.NSENSORS + 2))
+        raw = np.fromfile(self.path + cryo_log.RAW_EXTENSION,
+                          cryo_log.RAW_DTYPE)
+        self.assertEqual(raw['TIME'].tolist(), [START, START + 1])
+        self.assertEqual(raw['TEMPS'][0].tolist(),
+                         [1.0, 2.0] + [0.0] * (cryo_log.NSENSORS - 2))
+        self.assertEqual(raw['TEMPS'][1].tolist(),
+                         range(cryo_log.NSENSORS))
+
+    """
+    Test - test_periodsAreRolledUp:
+        Given readings spread over two rollup periods,
+        Then the first period is rolled up once the second starts, the
+        second once the log is closed, each with the minimum, maximum and
+        mean of its readings.
+    """
+    def test_periodsAreRolledUp(self):
+        for i, value in enumerate([4.0, 1.0, 7.0]):
+            self.log.append(START + i, [value] * cryo_log.NSENSORS)
+        self.log.append(START + cryo_log.ROLLUP_PERIOD + 5,
+                        [10.0] * cryo_log.NSENSORS)
+        rollup_path = self.path + cryo_log.ROLLUP_EXTENSION
+        rollups = np.fromfile(rollup_path, cryo_log.ROLLUP_DTYPE)
+        self.assertEqual(len(rollups), 1)
+        self.assertEqual(rollups['TIME'].tolist(), [START])
+        self.assertEqual(rollups['MIN'][0].tolist(),
+                         [1.0] * cryo_log.NSENSORS)
+        self.assertEqual(rollups['MAX'][0].tolist(),
+                         [7.0] * cryo_log.NSENSORS)
+        self.assertEqual(rollups['MEAN'][0].tolist(),
+                         [4.0] * cryo_log.NSENSORS)
+
+        self.log.close()
+        rollups = np.fromfile(rollup_path, cryo_log.ROLLUP_DTYPE)
+        self.assertEqual(rollups['TIME'].tolist(),
+                         [START, START + cryo_log.ROLLUP_PERIOD])
+        self.assertEqual(rollups['MEAN'][1].tolist(),
+                         [10.0] * cryo_log.NSENSORS)
+
+    """
+    Test - test_shortWindowsAreDecimatedFromRaw:
+        Given ten raw readings and a query for at most five points,
+        Then the window is located by time and each point holds the
+        minimum, maximum and mean of two readings.
+    """
+    def test_shortWindowsAreDecimatedFromRaw(self):
+        for i in range(10):
+            self.log.append(START + i, [float(i)] * cryo_log.NSENSORS)
+        rows = self.log.query(START, START + 10, 5)
+        self.assertEqual(rows['TIME'].tolist(), range(int(START),
+                                                      int(START) + 10, 2))
+        self.assertEqual(rows['MIN'][:, 0].tolist(), [0, 2, 4, 6, 8])
+        self.assertEqual(rows['MAX'][:, 0].tolist(), [1, 3, 5, 7, 9])
+        self.assertEqual(rows['MEAN'][:, 0].tolist(),
+                         [0.5, 2.5, 4.5, 6.5, 8.5])
+
+        rows = self.log.query(START + 3, START + 5, 100)
+        self.assertEqual(rows['TIME'].tolist(), [START + 3, START + 4])
+        self.assertEqual(len(self.log.query(START + 20, START + 30, 5)), 0)
+        self.assertEqual(len(self.log.query(START, START + 10, 0)), 0)
+
+    """
+    Test - test_longWindowsAreDecimatedFromRollups:
+        Given readings over four rollup periods and a query whose bins
+        span two periods,
+        Then each point is decimated from the rollups of two periods.
+    """
+    def test_longWindowsAreDecimatedFromRollups(self):
+        for period in range(4):
+            for i in range(2):
+                self.log.append(START + period * cryo_log.ROLLUP_PERIOD + i,
+                                [float(period * 2 + i)] * cryo_log.NSENSORS)
+        self.log.close()
+        rows = self.log.query(START, START + 4 * cryo_log.ROLLUP_PERIOD, 2)
+        self.assertEqual(rows['TIME'].tolist(),
+                         [START, START + 2 * cryo_log.ROLLUP_PERIOD])
+        self.assertEqual(rows['MIN'][:, 0].tolist(), [0, 4])
+        self.assertEqual(rows['MAX'][:, 0].tolist(), [3, 7])
+        self.assertEqual(rows['MEAN'][:, 0].tolist(), [1.5, 5.5])
+
+    """
+    Test - test_periodBeingLoggedIsQueried:
+        Given readings over two rollup periods and part of a third that
+        is still being logged, queried from another CryoLog as the
+        worker does,
+        Then a query of the rollups includes the rollup so far of the
+        third period, and leaves it out once it is outside the window.
+    """
+    def test_periodBeingLoggedIsQueried(self):
+        for period in range(3):
+            for i in range(2):
+                self.log.append(START + period * cryo_log.ROLLUP_PERIOD + i,
+                                [float(period * 2 + i)] * cryo_log.NSENSORS)
+        reader = cryo_log.CryoLog(self.path)
+        end = START + 4 * cryo_log.ROLLUP_PERIOD
+        rows = reader.query(START, end, 4)
+        self.assertEqual(rows['TIME'].tolist(),
+                         [START + period * cryo_log.ROLLUP_PERIOD
+                          for period in range(3)])
+        self.assertEqual(rows['MIN'][:, 0].tolist(), [0, 2, 4])
+        self.assertEqual(rows['MAX'][:, 0].tolist(), [1, 3, 5])
+        self.assertEqual(rows['MEAN'][:, 0].tolist(), [0.5, 2.5, 4.5])
+
+        rows = reader.query(START, START + 2 * cryo_log.ROLLUP_PERIOD, 1)
+        self.assertEqual(rows['MAX'][:, 0].tolist(), [3])
@@ -5,7 +5,15 @@
 """
 
 import i_worker
-import serial
+import os
+import rtt_estimator
+import termios
+import threading
+import time
+
+# Device drivers, imported on first use by __load_drivers.
+serial = None
+cryo_log = None
 
 # Description of Lakeshore device. Currently hard-coded.
 CRYO_PORT = '/dev/ttyUSB0'
@@ -14,18 +22,230 @@ CRYO_BYTESIZE = 7
 CRYO_STOPBITS = 1
 CRYO_PARITY = 'O'
 CRYO_TIMEOUT = 0.3
+CRYO_TIMEOUT_MIN = 0.1
+CRYO_TIMEOUT_MAX = 1.0
+
+# The serial port is only reconfigured when the derived timeout has moved
+# by more than this fraction of the timeout currently set.
+CRYO_TIMEOUT_HYSTERESIS = 0.25
+
+# Sampling of the Lakeshore. Readings older than CRYO_STALE_TIME are not
+# reported in the stateframe. For CRYO_STALE_TIME after the sampler starts
+# there may be no reading yet, which is reported as no data rather than as
+# a failure.
+CRYO_SAMPLE_INTERVAL = 0.5
+CRYO_RETRY_INTERVAL = 5.0
+CRYO_STALE_TIME = 5.0
+CRYO_POLL_INTERVAL = 0.5
+
+# Temperature logging. Logs are written to CRYO_LOG_DIR and queries return
+# at most CRYO_LOG_QUERY_POINTS rows unless the ACC asks for fewer.
+CRYO_LOG_DIR = '/tmp'
+CRYO_LOG_PREFIX = 'cryo_'
+CRYO_LOG_QUERY_POINTS = 1000
 
 class CryoWorker(i_worker.IWorker):
     def __init__(self):
         super(CryoWorker, self).__init__()
-        self.commands = []
+        self.commands = ['CRYO-LOG-START',
+                         'CRYO-LOG-STOP',
+                         'CRYO-LOG-QUERY']
         self.name = 'Cryostat-Worker'
+        self.poll_interval = CRYO_POLL_INTERVAL
         self.serial_connection = None
+        self.rtt = rtt_estimator.RTTEstimator(CRYO_TIMEOUT, CRYO_TIMEOUT_MIN,
+                                              CRYO_TIMEOUT_MAX)
+        self.temperatures = []
+        self.sample_time = 0
+        self.query_sample_time = None
+        self.sample_lock = threading.Lock()
+        self.sampler = None
+        self.sampler_start = None
+        self.log = None
+        self.log_path = None
+        self.log_lock = threading.Lock()
+
+    # ---------------------------------------------------------------
+    # COMMAND ROUTINES
+    # ---------------------------------------------------------------
+
+    # region Method Description
+    """
+    Method: __cryo_log_start
+        Description:
+            Routine to start logging every Lakeshore reading, with periodic
+            rollups, to a log in CRYO_LOG_DIR. Any log already running is
+            stopped first.
+        Arguments:
+            acc_command: list of the strings sent from the ACC. List format:
+                ['CRYO-LOG-START'] or ['CRYO-LOG-START', name] where name
+                is the name of the log. Defaults to a name built from the
+                current time.
+        Returns:
+            reply: path of the log that was started.
+    """
+    # endregion
+    def __cryo_log_start(self, acc_command):
+        # Error check that the command given is formatted correctly.
+        if len(acc_command) > 2:
+            self.logger('Invalid call to CRYO-LOG-START.')
+            return None
+        if len(acc_command) == 2:
+            name = os.path.basename(acc_command[1])
+        else:
+            name = time.strftime('%Y%m%d_%H%M%S')
+
+        self.__load_drivers()
+        path = os.path.join(CRYO_LOG_DIR, CRYO_LOG_PREFIX + name)
+        new_log = cryo_log.CryoLog(path)
+        try:
+            new_log.open()
+        except IOError, e:
+            self.logger('Unable to open cryostat log: ' + str(e))
+            return None
+        with self.log_lock:
+            if self.log is not None:
+                self.log.close()
+            self.log = new_log
+            self.log_path = path
+        self.__start_sampler()
+        self.logger('Started cryostat log at ' + path + '.')
+        return path + '\n'
+
+    # region Method Description
+    """
+    Method: __cryo_log_stop
+        Description:
+            Routine to stop the running log. The log can still be queried
+            until another log is started.
+        Arguments:
+            acc_command: list of the strings sent from the ACC. List format:
+                ['CRYO-LOG-STOP']
+    """
+    # endregion
+    def __cryo_log_stop(self, acc_command):
+        # Error check that the command given is formatted correctly.
+        if len(acc_command) != 1:
+            self.logger('Invalid call to CRYO-LOG-STOP.')
+            return None
+        with self.log_lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
+                self.logger('Stopped cryostat log at ' + self.log_path + '.')
+        return None
+
+    # region Method Description
+    """
+    Method: __cryo_log_query
+        Description:
+            Routine to return a window of the current or most recent log,
+            decimated on this box.
+        Arguments:
+            acc_command: list of the strings sent from the ACC. List format:
+                ['CRYO-LOG-QUERY', start, end] or
+                ['CRYO-LOG-QUERY', start, end, max_points] where start and
+                end are in seconds since the epoch, or relative to now if
+                zero or negative.
+        Returns:
+            reply: a line with the number of rows, then one line per row
+                holding the bin start time followed by the minimum, the
+                maximum and the mean of each of the eight sensors.
+    """
+    # endregion
+    def __cryo_log_query(self, acc_command):
+        # Error check that the command given is formatted correctly.
+        if len(acc_command) not in [3, 4]:
+            self.logger('Invalid call to CRYO-LOG-QUERY.')
+            return None
+        max_points = CRYO_LOG_QUERY_POINTS
+        try:
+            start = float(acc_command[1])
+            end = float(acc_command[2])
+            if len(acc_command) == 4:
+                max_points = min(int(acc_command[3]), CRYO_LOG_QUERY_POINTS)
+        except ValueError:
+            self.logger('Invalid call to CRYO-LOG-QUERY.')
+            return None
+        if self.log_path is None:
+            self.logger('No cryostat log to query.')
+            return None
+
+        self.__load_drivers()
+        now = time.time()
+        if start <= 0:
+            start += now
+        if end <= 0:
+            end += now
+        rows = cryo_log.CryoLog(self.log_path).query(start, end, max_points)
+
+        reply = [str(len(rows))]
+        for row in rows:
+            values = ['%.3f' % row['TIME']]
+            for column in ['MIN', 'MAX', 'MEAN']:
+                values += ['%.3f' % value for value in row[column]]
+            reply.append(' '.join(values))
+        return '\n'.join(reply) + '\n'
+
+    # ---------------------------------------------------------------
+    # FUNCTION MAP
+    # ---------------------------------------------------------------
+    function_map = {'CRYO-LOG-START': __cryo_log_start,
+                    'CRYO-LOG-STOP': __cryo_log_stop,
+                    'CRYO-LOG-QUERY': __cryo_log_query}
 
     # ---------------------------------------------------------------
     # STATEFRAME HELPERS
     # ---------------------------------------------------------------
 
+    # region Method Description
+    """
+    Method: __load_drivers
+        Description:
+            Imports pyserial and the temperature log the first time they
+            are needed so that they are not loaded when the server starts.
+    """
+    # endregion
+    def __load_drivers(self):
+        global serial, cryo_log
+        if serial is None:
+            import serial as serial_module
+            serial = serial_module
+        if cryo_log is None:
+            import cryo_log as cryo_log_module
+            cryo_log = cryo_log_module
+
+    # region Method Description
+    """
+    Method: __open_port
+        Description:
+            Opens the serial connection to the Lakeshore if it is not
+            already open. The connection is kept open between queries.
+    """
+    # endregion
+    def __open_port(self):
+        if self.serial_connection is None:
+            self.serial_connection = serial.Serial(
+                port=CRYO_PORT, baudrate=CRYO_BAUD, bytesize=CRYO_BYTESIZE,
+                parity=CRYO_PARITY, stopbits=CRYO_STOPBITS,
+                timeout=self.rtt.timeout())
+
+    # region Method Description
+    """
+    Method: __close_port
+        Description:
+            Closes the serial connection to the Lakeshore so that it is
+            reopened on the next query.
+    """
+    # endregion
+    def __close_port(self):
+        if self.serial_connection is not None:
+            try:
+                self.serial_connection.close()
+            except (serial.SerialException, OSError):
+                pass
+            self.serial_connection = None
+
     # region Method Description
     """
     Method: __temperature_query
@@ -39,11 +259,51 @@ class CryoWorker(i_worker.IWorker):
     # endregion
     def __temperature_query(self):
         query_cmd = 'krdg? 0\x0d\x0a'
-        self.serial_connection = serial.Serial(
-            port=CRYO_PORT, baudrate=CRYO_BAUD, bytesize=CRYO_BYTESIZE,
-            parity=CRYO_PARITY, stopbits=CRYO_STOPBITS, timeout=CRYO_TIMEOUT)
+        returnString = self.trace('cryo', query_cmd,
+                                  lambda: self.__readline(query_cmd))
+        return self.__parse_temperatures(returnString)
+
+    # region Method Description
+    """
+    Method: __readline
+        Description:
+            Writes a query to the Lakeshore over the persistent serial
+            connection, opening it if needed, and reads the reply line.
+        Arguments:
+            query_cmd: query including its line terminator.
+        Returns:
+            returnString: reply line including its terminator.
+    """
+    # endregion
+    def __readline(self, query_cmd):
+        self.__open_port()
+        timeout = self.rtt.timeout()
+        if abs(timeout - self.serial_connection.timeout) > \
+                CRYO_TIMEOUT_HYSTERESIS * self.serial_connection.timeout:
+            self.serial_connection.timeout = timeout
+        start = time.time()
         self.serial_connection.write(query_cmd)
         returnString = self.serial_connection.readline()
+        if not returnString.endswith('\n'):
+            self.rtt.backoff()
+            raise serial.SerialException('No reply from Lakeshore.')
+        self.rtt.sample(time.time() - start)
+        return returnString
+
+    # region Method Description
+    """
+    Method: __parse_temperatures
+        Description:
+            Parses a reply to 'krdg? 0' into temperatures. Readings that
+            cannot be parsed are reported as 0.
+        Arguments:
+            returnString: reply line read from the Lakeshore.
+        Returns:
+            returnVal: array of floats representing the temperatures in
+                degrees Kelvin.
+    """
+    # endregion
+    def __parse_temperatures(self, returnString):
         returnString = returnString.split(',')
         returnVal = []
         for number in returnString:
@@ -51,10 +311,63 @@ class CryoWorker(i_worker.IWorker):
                 returnVal.append(float(number))
             except ValueError:
                 returnVal.append(0)
-        self.serial_connection.close()
-        self.serial_connection = None
         return returnVal
 
+    # region Method Description
+    """
+    Method: __sample
+        Description:
+            Sampler thread routine. Queries the Lakeshore every
+            CRYO_SAMPLE_INTERVAL over the persistent serial connection and
+            publishes the latest temperatures for stateframe_query. On
+            error the port is closed and reopened after CRYO_RETRY_INTERVAL.
+            Errors writing the temperature log are logged without
+            disturbing the port.
+    """
+    # endregion
+    def __sample(self):
+        self.__load_drivers()
+        while True:
+            start = time.time()
+            try:
+                temperatures = self.__temperature_query()
+                with self.sample_lock:
+                    self.temperatures = temperatures
+                    self.sample_time = start
+            except (serial.SerialException, EnvironmentError,
+                    termios.error), e:
+                self.logger('Lakeshore query failed, reopening port: ' +
+                            str(e))
+                self.__close_port()
+                time.sleep(CRYO_RETRY_INTERVAL)
+                continue
+            # A log that cannot be written, i.e. on a full disk, is no
+            # fault of the Lakeshore, so sampling carries on without it.
+            with self.log_lock:
+                if self.log is not None:
+                    try:
+                        self.log.append(start, temperatures)
+                    except EnvironmentError, e:
+                        self.logger('Cryostat log append failed: ' + str(e))
+            time.sleep(max(0, CRYO_SAMPLE_INTERVAL - (time.time() - start)))
+
+    # region Method Description
+    """
+    Method: __start_sampler
+        Description:
+            Starts the sampler thread if it is not already running. This
+            is done on first use rather than on construction so that the
+            thread is started in the daemon process. A sampler that has
+            died is restarted.
+    """
+    # endregion
+    def __start_sampler(self):
+        if self.sampler is None or not self.sampler.is_alive():
+            self.sampler = threading.Thread(target=self.__sample)
+            self.sampler.daemon = True
+            self.sampler_start = time.time()
+            self.sampler.start()
+
     # ---------------------------------------------------------------
     # INTERFACE IMPLEMENTATIONS
     # ---------------------------------------------------------------
@@ -79,16 +392,43 @@ class CryoWorker(i_worker.IWorker):
     """
     # endregion
     def execute(self, acc_command):
-        pass
+        return self.function_map[acc_command[0]](self, acc_command)
 
     # region Method Description
     """
     Method: stateframe_query
         Description:
-            Refer to abstract class IWorker located in i_worker.py
-            for full description.
+            Returns the latest reading of the sampler thread, starting it
+            if needed. Until the sampler's first reading, and for at most
+            CRYO_STALE_TIME after it started, there is no data to return.
+            A reading older than CRYO_STALE_TIME raises an IOError. Refer
+            to abstract class IWorker located in i_worker.py for full
+            description.
     """
     # endregion
     def stateframe_query(self):
-        temperatures = self.__temperature_query()
-        return {'CRYOSTAT': temperatures}
\ No newline at end of file
+        self.__start_sampler()
+        with self.sample_lock:
+            temperatures = self.temperatures
+            sample_time = self.sample_time
+        now = time.time()
+        if sample_time == 0 and now - self.sampler_start <= CRYO_STALE_TIME:
+            self.query_sample_time = None
+            return None
+        if now - sample_time > CRYO_STALE_TIME:
+            raise IOError('No recent reading from Lakeshore.')
+        self.query_sample_time = sample_time
+        return {'CRYOSTAT': temperatures}
+
+    # region Method Description
+    """
+    Method: get_sample_time
+        Description:
+            Returns the time the Lakeshore reading last returned by
+            stateframe_query was taken by the sampler thread. Refer to
+            abstract class IWorker located in i_worker.py for full
+            description.
+    """
+    # endregion
+    def get_sample_time(self):
+        return self.query_sample_time
\ No newline at end of file
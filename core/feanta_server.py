@@ -4,13 +4,28 @@
     Email: lkkung@caltech.edu
 """
 
+import collections
 import datetime
+import errno
+import os
+import profiler
+import Queue
+import signal
 import socket
 import sys
 import time
 import threading
+import circuit_breaker
 import gen_fem_sf
+import metrics
+import metrics_server
+import resolver
+import sf_archive
+import sf_multicast
+import sf_shm
 import traceback
+import traffic_trace
+import worker_sampler
 
 # Logging information.
 TIMESTAMP_FMT = '%Y-%m-%d %H:%M:%S'
@@ -22,7 +37,23 @@ HOST = ''
 HOST_PORT = 5676
 ACC_HOSTNAME = 'acc.solar.pvt'
 ACC_PORT = 5675
-VERSION = 1.2  # Version date: 10/6/2015
+EVENT_PORT = 5677
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 5678
+FRAME_INTERVAL = 0.3
+FRAME_HISTORY = 100
+PROFILE_DIR = '/tmp'
+PROFILE_DURATION = 30
+TRACE_DIR = '/tmp'
+# Frames are archived in ARCHIVE_DIR, which must survive reboots, unlike
+# /tmp. Set with set_archive_dir, i.e. by starburstControl -a.
+ARCHIVE_DIR = '/var/lib/feanta/archive'
+SHM_PATH = '/dev/shm/fem_stateframe'
+# Frames are also sent to MULTICAST_GROUP at MULTICAST_PORT if it is set,
+# i.e. to a group such as '239.255.56.76' or to a single host.
+MULTICAST_GROUP = None
+MULTICAST_PORT = 5679
+VERSION = 1.4  # Version date: 10/19/2026
 
 
 # region Class Description
@@ -48,8 +79,50 @@ class ServerDaemon():
         self.stderr_path = '/dev/null'
         self.workers = {}
         self.function_map = {}
+        self.breakers = {}
+        self.samplers = {}
         self.log_file = LOG_FILE
-        self.acc_ip = socket.gethostbyname(ACC_HOSTNAME)
+        self.log_queue = Queue.Queue()
+        self.log_writer = None
+        self.log_lock = threading.Lock()
+        self.worker_metrics = {}
+        self.subscribers = []
+        self.subscribers_lock = threading.Lock()
+        self.start_time = time.time()
+        self.admin_map = {'FEM-STATS': self.__fem_stats,
+                          'FEM-PROFILE': self.__fem_profile,
+                          'FEM-TRACE-START': self.__fem_trace_start,
+                          'FEM-TRACE-STOP': self.__fem_trace_stop}
+        self.profiler = profiler.SamplingProfiler()
+        self.profile_requested = False
+        self.tracer = None
+        self.recorder = None
+        self.archive = sf_archive.StateframeArchive(ARCHIVE_DIR)
+        self.shm = sf_shm.StateframeWriter(SHM_PATH)
+        self.fanout = sf_multicast.StateframeSender(MULTICAST_GROUP,
+                                                    MULTICAST_PORT)
+        resolver.RESOLVER.register(ACC_HOSTNAME)
+
+        # Uplink accounting. Each frame is given the next sequence number;
+        # the phases of assembling and sending it are timed, and frames
+        # that do not reach the ACC are counted as skipped.
+        self.sequence = 0
+        self.last_delivered = None
+        self.uplink_failing = False
+        self.local_failing = {'shared memory': False, 'fan-out': False}
+        self.frame_times = {'poll': metrics.Histogram(),
+                            'pack': metrics.Histogram(),
+                            'send': metrics.Histogram(),
+                            'total': metrics.Histogram(),
+                            'interval': metrics.Histogram(),
+                            'jitter': metrics.Histogram()}
+        self.frame_failures = {'poll': metrics.Counter(),
+                               'pack': metrics.Counter(),
+                               'send': metrics.Counter()}
+        self.frames_sent = metrics.Counter()
+        self.frames_skipped = metrics.Counter()
+        self.recent_frames = collections.deque(maxlen=FRAME_HISTORY)
+        self.last_frame_start = None
 
     # ---------------------------------------------------------------
     # BASIC ROUTINES:
@@ -60,12 +133,78 @@ class ServerDaemon():
         timestamp = timestamp.strftime(TIMESTAMP_FMT)
         return timestamp
 
+    # region Method Description
+    """
+    Method: __log
+        Description:
+            Queues a message to be timestamped into the log file by the
+            log writer thread, so that callers on the stateframe and
+            polling paths never wait on the disk.
+        Arguments:
+            message: message to be logged.
+    """
+    # endregion
     def __log(self, message):
         log_message = self.__get_timestamp() + ': ' + str(message) + '\n'
-        f = open(self.log_file, "a")
-        f.write(log_message)
-        f.close()
-        print log_message
+        with self.log_lock:
+            # As with the resolver, a writer started before the daemon
+            # forked does not survive the fork and is restarted.
+            if self.log_writer is None or not self.log_writer.is_alive():
+                self.log_writer = threading.Thread(target=self.__write_log)
+                self.log_writer.daemon = True
+                self.log_writer.start()
+        self.log_queue.put(log_message)
+
+    def __write_log(self):
+        while True:
+            log_message = self.log_queue.get()
+            try:
+                f = open(self.log_file, "a")
+                f.write(log_message)
+                f.close()
+                print log_message
+            except IOError:
+                pass
+            self.log_queue.task_done()
+
+    # region Method Description
+    """
+    Method: __publish
+        Description:
+            Sends an event line to every connected subscriber. Subscribers
+            that can no longer be written to are dropped.
+        Arguments:
+            event: single line string describing the event.
+    """
+    # endregion
+    def __publish(self, event):
+        self.__log('Event: ' + event)
+        with self.subscribers_lock:
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.sendall(event + '\n')
+                except socket.error:
+                    subscriber.close()
+                    self.subscribers.remove(subscriber)
+
+    # region Method Description
+    """
+    Method: __accept_subscribers
+        Description:
+            Accepts subscriber connections at EVENT_PORT. Subscribers only
+            receive events; anything they send is ignored.
+        Arguments:
+            event_listener: bound and listening socket for subscribers.
+    """
+    # endregion
+    def __accept_subscribers(self, event_listener):
+        while True:
+            subscriber, address = self.__uninterrupted(event_listener.accept)
+            self.__log('Event subscriber from ' + address[0] +
+                       ':' + str(address[1]))
+            subscriber.settimeout(0.3)
+            with self.subscribers_lock:
+                self.subscribers.append(subscriber)
 
     # ---------------------------------------------------------------
     # CORE ROUTINES
@@ -84,9 +223,36 @@ class ServerDaemon():
     # endregion
     def link_worker(self, worker):
         self.workers[worker.name] = worker
+        self.breakers[worker.name] = circuit_breaker.CircuitBreaker(
+            worker.name, self.__log)
+        self.worker_metrics[worker.name] = metrics.WorkerMetrics()
+        self.samplers[worker.name] = worker_sampler.WorkerSampler(
+            worker, self.breakers[worker.name],
+            self.worker_metrics[worker.name])
+        worker.set_poll_trigger(self.samplers[worker.name].trigger)
         for command in worker.get_command_list():
             self.function_map[command] = worker
         worker.set_logger(self.__log)
+        worker.set_publisher(self.__publish)
+        worker.set_tracer(self.tracer)
+
+    # region Method Description
+    """
+    Method: set_tracer
+        Description:
+            Sets the tracer every linked worker's device traffic goes
+            through, i.e. a TraceReplayer to run the server against a
+            recorded session. Workers linked later are given the same
+            tracer.
+        Arguments:
+            tracer: tracer from traffic_trace.py, or None to talk to the
+                devices directly.
+    """
+    # endregion
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+        for worker in self.workers.values():
+            worker.set_tracer(tracer)
 
     # region Method Description
     """
@@ -112,6 +278,17 @@ class ServerDaemon():
     def set_log_file(self, log_file_destination):
         self.log_file = log_file_destination
 
+    # region Method Description
+    """
+    Method: set_archive_dir
+        Description:
+            Sets the directory stateframes are archived in. Defaulted to
+            ARCHIVE_DIR. Must be called before the server is run.
+    """
+    # endregion
+    def set_archive_dir(self, archive_directory):
+        self.archive = sf_archive.StateframeArchive(archive_directory)
+
     # region Method Description
     """
     Method: list_commands
@@ -120,67 +297,118 @@ class ServerDaemon():
     """
     # endregion
     def list_commands(self):
-        return self.function_map.keys()
+        return self.function_map.keys() + self.admin_map.keys()
+
+    # region Method Description
+    """
+    Method: __query_worker
+        Description:
+            Reads a worker's stateframe data from the last-value cache
+            kept by its sampler. Data that has gone stale, i.e. because
+            the worker's circuit is open or its polls are failing, is not
+            reported.
+        Arguments:
+            name: name of the worker.
+            default: value returned if the worker is not linked or has no
+                fresh data.
+        Returns:
+            The data last returned by the worker's stateframe_query, or
+            default.
+    """
+    # endregion
+    def __query_worker(self, name, default):
+        sampler = self.samplers.get(name, None)
+        if sampler is None:
+            return default
+        data, sample_time = sampler.fresh(default)
+        return data
+
+    # region Method Description
+    """
+    Method: __query_cluster
+        Description:
+            Reads a worker's stateframe cluster from its sampler's cache as
+            __query_worker does, and adds the cluster's validity flag and
+            sample age so that the ACC can tell fresh readings from
+            defaults.
+        Arguments:
+            name: name of the worker.
+        Returns:
+            A copy of the cluster dictionary with 'VALID' set to 1 if the
+            data is fresh and 0 otherwise, and 'AGE' set to the age of the
+            last successful sample in milliseconds, or
+            gen_fem_sf.AGE_UNKNOWN if there has not been one.
+    """
+    # endregion
+    def __query_cluster(self, name):
+        sampler = self.samplers.get(name, None)
+        if sampler is None:
+            return {'VALID': 0, 'AGE': gen_fem_sf.AGE_UNKNOWN}
+        data, sample_time = sampler.fresh(None)
+        cluster = dict(data or {})
+        cluster['VALID'] = int(data is not None)
+        if sample_time is None:
+            cluster['AGE'] = gen_fem_sf.AGE_UNKNOWN
+        else:
+            cluster['AGE'] = int(max(0, time.time() - sample_time) * 1000)
+        return cluster
+
+    # region Method Description
+    """
+    Method: __execute_worker
+        Description:
+            Executes a command with a worker and records the outcome with
+            the worker's circuit breaker. Commands are always attempted,
+            even while the circuit is open, so that a device that has just
+            been powered on can be used straight away; a successful
+            command closes the circuit.
+        Arguments:
+            worker: the worker responsible for the command.
+            acc_command: array of command and parameters from the ACC.
+        Returns:
+            The reply returned by the worker's execute, or None if the
+            command failed.
+    """
+    # endregion
+    def __execute_worker(self, worker, acc_command):
+        breaker = self.breakers[worker.name]
+        worker_metrics = self.worker_metrics[worker.name]
+        start = time.time()
+        try:
+            reply = worker.execute(acc_command)
+        except Exception, e:
+            worker_metrics.execute_times.observe((time.time() - start) * 1000)
+            worker_metrics.execute_errors.increment()
+            if metrics.is_timeout(e):
+                worker_metrics.execute_timeouts.increment()
+            breaker.failure(traceback.format_exc())
+            self.__log('Command ' + acc_command[0] + ' failed on ' +
+                       worker.name + '.')
+            return None
+        worker_metrics.execute_times.observe((time.time() - start) * 1000)
+        breaker.success()
+        return reply
 
     def make_stateframe_dict(self):
         fem_dict = {}
 
         # Handle powerstrip cluster.
-        worker = self.workers.get('PDU-Worker', None)
-        if worker is not None:
-            try:
-                fem_dict['POWERSTRIP'] = worker.stateframe_query()
-            except Exception, e:
-                fem_dict['POWERSTRIP'] = {}
-                self.__log(traceback.format_exc())
-        else:
-            fem_dict['POWERSTRIP'] = {}
+        fem_dict['POWERSTRIP'] = self.__query_cluster('PDU-Worker')
 
         # Handle thermal cluster.
-        worker = self.workers.get('Cryostat-Worker', None)
-        working_dict = {}
-        if worker is not None:
-            try:
-                working_dict = worker.stateframe_query()
-            except Exception, s:
-                self.__log(traceback.format_exc())
-
-        worker = self.workers.get('Temp-Worker', None)
-        if worker is not None:
-            try:
-                working_dict['FOCUSBOX'] = worker.stateframe_query()
-            except Exception, e:
-                working_dict['FOCUSBOX'] = 0
-                self.__log(traceback.format_exc())
-        else:
-            working_dict['FOCUSBOX'] = 0
-
+        working_dict = self.__query_cluster('Cryostat-Worker')
+        working_dict['FOCUSBOX'] = self.__query_worker('Temp-Worker', 0)
         fem_dict['THERMAL'] = working_dict
 
         # Handle receiver cluster.
-        worker = self.workers.get('BB-Worker', None)
-        working_dict = {}
-        if worker is not None:
-            try:
-                working_dict = worker.stateframe_query()
-            except Exception, e:
-                pass
-
+        working_dict = self.__query_cluster('BB-Worker')
         working_dict['LOFREQSTATUS'] = 0
         working_dict['HIFREQSTATUS'] = 0
         working_dict['NOISESTATUS'] = 0
         fem_dict['RECEIVER'] = working_dict
 
         # Handle servo cluster.
-        worker = self.workers.get('GeoBrick-Worker', None)
-        if worker is not None:
-            try:
-                fem_dict['SERVO'] = worker.stateframe_query()
-            except Exception, e:
-                fem_dict['SERVO'] = {}
-                self.__log(traceback.format_exc())
-        else:
-            fem_dict['SERVO'] = {}
+        fem_dict['SERVO'] = self.__query_cluster('GeoBrick-Worker')
 
         # Handle version.
         fem_dict['VERSION'] = VERSION
@@ -190,20 +418,405 @@ class ServerDaemon():
 
         return {'FEM': fem_dict}
 
+    # region Method Description
+    """
+    Method: send_stateframe_dict
+        Description:
+            Assembles, packs and sends one stateframe to the ACC, then
+            schedules the next one FRAME_INTERVAL after this one started.
+            The frame is stamped with the next sequence number and the
+            time spent in each phase is recorded. A frame that fails is
+            counted against the phase it failed in and its sequence number
+            is counted as skipped; only the first failure of a run of
+            failures and the recovery are logged. Once the send to the ACC
+            is over, whether or not it succeeded, every frame packed is
+            queued to the local archive, published to local readers in
+            shared memory and sent to MULTICAST_GROUP if set, so that
+            none of them delays the ACC or fails its uplink.
+    """
+    # endregion
     def send_stateframe_dict(self):
+        start = time.time()
+        if self.last_frame_start is not None:
+            interval = (start - self.last_frame_start) * 1000
+            self.frame_times['interval'].observe(interval)
+            self.frame_times['jitter'].observe(
+                abs(interval - FRAME_INTERVAL * 1000))
+        self.last_frame_start = start
+        sequence = self.sequence
+        self.sequence += 1
+        phase = 'poll'
+        delivered = False
+        buf = None
         try:
             fem_dict = self.make_stateframe_dict()
+            fem_dict['FEM']['SEQUENCE'] = sequence
+            polled = time.time()
+            phase = 'pack'
             fmt, buf, xml = gen_fem_sf.gen_fem_sf(fem_dict)
+            packed = time.time()
+            phase = 'send'
+            acc_ip = resolver.RESOLVER.resolve(ACC_HOSTNAME)
             packet_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            packet_socket.settimeout(0.3)
-            packet_socket.connect((self.acc_ip, ACC_PORT))
-            packet_socket.sendall(buf)
-            packet_socket.close()
-            # persec = open('/tmp/persec.txt', 'a')
-            # persec.write(buf + '\n')
-            # persec.close()
+            try:
+                packet_socket.settimeout(0.3)
+                packet_socket.connect((acc_ip, ACC_PORT))
+                packet_socket.sendall(buf)
+            finally:
+                packet_socket.close()
+            end = time.time()
+            delivered = True
+            self.frame_times['poll'].observe((polled - start) * 1000)
+            self.frame_times['pack'].observe((packed - polled) * 1000)
+            self.frame_times['send'].observe((end - packed) * 1000)
+            self.frame_times['total'].observe((end - start) * 1000)
+            self.frames_sent.increment()
+            self.last_delivered = sequence
+            if self.uplink_failing:
+                self.uplink_failing = False
+                self.__log('Stateframe uplink recovered at frame ' +
+                           str(sequence) + '.')
+        except Exception:
+            end = time.time()
+            self.frame_failures[phase].increment()
+            self.frames_skipped.increment()
+            if not self.uplink_failing:
+                self.uplink_failing = True
+                self.__log('Stateframe ' + str(sequence) + ' failed in ' +
+                           phase + ' phase:\n' + traceback.format_exc())
         finally:
-            threading.Timer(0.3, self.send_stateframe_dict).start()
+            # Archive and publish every frame packed, whether or not the
+            # ACC got it.
+            if buf is not None:
+                self.archive.append(start, sequence, buf)
+                self.__publish_locally('shared memory', self.shm.publish,
+                                       start, sequence, buf)
+                self.__publish_locally('fan-out', self.fanout.send,
+                                       start, sequence, buf)
+            self.recent_frames.append((sequence, start, end, delivered))
+            delay = max(0, start + FRAME_INTERVAL - time.time())
+            threading.Timer(delay, self.send_stateframe_dict).start()
+
+    # region Method Description
+    """
+    Method: __publish_locally
+        Description:
+            Hands a frame to a local consumer of the stateframe, i.e. the
+            shared memory region or the fan-out. A failure is logged only
+            if the consumer's last frame went through, as is its recovery.
+        Arguments:
+            name: name of the consumer in the log.
+            publish: the consumer's method taking the frame time, sequence
+                number and packed frame.
+            start: time the frame was started.
+            sequence: sequence number of the frame.
+            buf: the packed frame.
+    """
+    # endregion
+    def __publish_locally(self, name, publish, start, sequence, buf):
+        try:
+            publish(start, sequence, buf)
+        except Exception:
+            if not self.local_failing[name]:
+                self.local_failing[name] = True
+                self.__log('Stateframe ' + str(sequence) + ' failed in ' +
+                           name + ':\n' + traceback.format_exc())
+            return
+        if self.local_failing[name]:
+            self.local_failing[name] = False
+            self.__log('Stateframe ' + name + ' recovered at frame ' +
+                       str(sequence) + '.')
+
+    # region Method Description
+    """
+    Method: __fem_stats
+        Description:
+            Routine to report uplink accounting, issued by the ACC as
+            FEM-STATS.
+        Arguments:
+            acc_command: list of strings sent from the ACC. Unused.
+        Returns:
+            stats: multi-line report of frame counts, failures by phase,
+                phase times in milliseconds and recently skipped sequence
+                numbers.
+    """
+    # endregion
+    def __fem_stats(self, acc_command):
+        frames = list(self.recent_frames)
+        skipped = [str(frame[0]) for frame in frames if not frame[3]]
+        stats = 'frames: next=' + str(self.sequence) + \
+                ' sent=' + str(self.frames_sent.get()) + \
+                ' skipped=' + str(self.frames_skipped.get()) + \
+                ' last_delivered=' + str(self.last_delivered) + '\n'
+        stats += 'failures:'
+        for phase in ['poll', 'pack', 'send']:
+            stats += ' ' + phase + '=' + \
+                     str(self.frame_failures[phase].get())
+        stats += '\n'
+        for phase in ['poll', 'pack', 'send', 'total']:
+            stats += phase + '_ms: ' + \
+                     self.frame_times[phase].summary() + '\n'
+        stats += 'recently_skipped: ' + ' '.join(skipped) + '\n'
+        return stats
+
+    # region Method Description
+    """
+    Method: __fem_profile
+        Description:
+            Routine to profile the running daemon, issued by the ACC as
+            FEM-PROFILE, or by sending the daemon SIGUSR2. Every thread is
+            sampled for the given number of seconds and the collapsed
+            stacks are written to a timestamped file in PROFILE_DIR.
+        Arguments:
+            acc_command: list of strings sent from the ACC.
+                acc_command[0]: FEM-PROFILE
+                acc_command[1]: optional duration in seconds, defaults to
+                    PROFILE_DURATION.
+        Returns:
+            reply: path of the profile being written, or the reason no
+                profile was started.
+    """
+    # endregion
+    def __fem_profile(self, acc_command):
+        duration = PROFILE_DURATION
+        if len(acc_command) > 1:
+            try:
+                duration = float(acc_command[1])
+            except ValueError:
+                return 'Invalid profile duration: ' + acc_command[1] + '\n'
+        path = os.path.join(PROFILE_DIR, 'fem_profile_' +
+                            time.strftime('%Y%m%d_%H%M%S') + '.folded')
+        if not self.profiler.start(duration, path):
+            return 'A profile is already running.\n'
+        self.__log('Profiling for ' + str(duration) + ' s into ' + path)
+        return path + '\n'
+
+    # region Method Description
+    """
+    Method: __fem_trace_start
+        Description:
+            Routine to record every exchange between the workers and their
+            devices, issued by the ACC as FEM-TRACE-START. The trace is
+            written to TRACE_DIR and can be replayed with
+            traffic_trace.TraceReplayer. Any trace already being recorded
+            is stopped first.
+        Arguments:
+            acc_command: list of strings sent from the ACC.
+                acc_command[0]: FEM-TRACE-START
+                acc_command[1]: optional name of the trace, defaults to a
+                    name built from the current time.
+        Returns:
+            reply: path of the trace being recorded.
+    """
+    # endregion
+    def __fem_trace_start(self, acc_command):
+        if len(acc_command) > 1:
+            name = os.path.basename(acc_command[1])
+        else:
+            name = 'fem_trace_' + time.strftime('%Y%m%d_%H%M%S') + '.trace'
+        self.__fem_trace_stop(['FEM-TRACE-STOP'])
+        try:
+            self.recorder = traffic_trace.TraceRecorder(
+                os.path.join(TRACE_DIR, name))
+        except IOError, e:
+            return 'Unable to record trace: ' + str(e) + '\n'
+        self.set_tracer(self.recorder)
+        self.__log('Recording device traffic into ' + self.recorder.path)
+        return self.recorder.path + '\n'
+
+    # region Method Description
+    """
+    Method: __fem_trace_stop
+        Description:
+            Routine to stop recording device traffic, issued by the ACC as
+            FEM-TRACE-STOP.
+        Arguments:
+            acc_command: list of strings sent from the ACC. Unused.
+        Returns:
+            reply: path and number of exchanges of the trace that was
+                stopped, or an empty string if none was being recorded.
+    """
+    # endregion
+    def __fem_trace_stop(self, acc_command):
+        recorder = self.recorder
+        if recorder is None:
+            return ''
+        self.recorder = None
+        self.set_tracer(None)
+        recorder.close()
+        self.__log('Recorded ' + str(recorder.records) +
+                   ' exchanges into ' + recorder.path)
+        return recorder.path + ' ' + str(recorder.records) + '\n'
+
+    # region Method Description
+    """
+    Method: __profile_signal
+        Description:
+            SIGUSR2 handler. The handler can interrupt the main thread
+            while it holds any lock, i.e. the log lock, so it only flags
+            the profile, which is started by __uninterrupted once the
+            interrupted call returns to it.
+    """
+    # endregion
+    def __profile_signal(self, signum, frame):
+        self.profile_requested = True
+
+    # region Method Description
+    """
+    Method: __uninterrupted
+        Description:
+            Makes a blocking socket call, making it again if it was
+            interrupted by a signal, as Python 2 raises EINTR rather than
+            retrying. A profile requested by SIGUSR2 is started before
+            each attempt.
+        Arguments:
+            call: the socket method to be called.
+            args: arguments of the call.
+        Returns:
+            The result of the call.
+    """
+    # endregion
+    def __uninterrupted(self, call, *args):
+        while True:
+            if self.profile_requested:
+                self.profile_requested = False
+                self.__fem_profile(['FEM-PROFILE'])
+            try:
+                return call(*args)
+            except socket.error, e:
+                if e.errno != errno.EINTR:
+                    raise
+
+    # region Method Description
+    """
+    Method: __collect_metrics
+        Description:
+            Renders the server's metrics in Prometheus text format for the
+            metrics server. Only called when a scrape arrives.
+        Returns:
+            text: the metrics.
+    """
+    # endregion
+    def __collect_metrics(self):
+        text = ''
+        names = sorted(self.worker_metrics.keys())
+
+        # Per-worker poll and command metrics.
+        for attr, name, description in [
+                ('query_times', 'fem_worker_query_milliseconds',
+                 'Duration of stateframe_query calls.'),
+                ('execute_times', 'fem_worker_execute_milliseconds',
+                 'Duration of execute calls.')]:
+            text += metrics.format_header(name, 'histogram', description)
+            for worker_name in names:
+                text += metrics.format_histogram(
+                    name, getattr(self.worker_metrics[worker_name], attr),
+                    {'worker': worker_name})
+        for attr, name, description in [
+                ('query_errors', 'fem_worker_query_errors_total',
+                 'Failed stateframe_query calls.'),
+                ('query_timeouts', 'fem_worker_query_timeouts_total',
+                 'stateframe_query calls that timed out.'),
+                ('execute_errors', 'fem_worker_execute_errors_total',
+                 'Failed execute calls.'),
+                ('execute_timeouts', 'fem_worker_execute_timeouts_total',
+                 'execute calls that timed out.')]:
+            text += metrics.format_header(name, 'counter', description)
+            for worker_name in names:
+                text += metrics.format_sample(
+                    name,
+                    getattr(self.worker_metrics[worker_name], attr).get(),
+                    {'worker': worker_name})
+        name = 'fem_worker_circuit_state'
+        text += metrics.format_header(
+            name, 'gauge', 'Circuit breaker state, 1 for the current state.')
+        for worker_name in names:
+            current = self.breakers[worker_name].state
+            for state in [circuit_breaker.CLOSED, circuit_breaker.OPEN,
+                          circuit_breaker.HALF_OPEN]:
+                text += metrics.format_sample(
+                    name, int(state == current),
+                    {'worker': worker_name, 'state': state})
+
+        # Stateframe uplink metrics.
+        name = 'fem_frame_phase_milliseconds'
+        text += metrics.format_header(
+            name, 'histogram', 'Duration of each phase of a stateframe.')
+        for phase in ['poll', 'pack', 'send', 'total']:
+            text += metrics.format_histogram(name, self.frame_times[phase],
+                                             {'phase': phase})
+        name = 'fem_frame_interval_milliseconds'
+        text += metrics.format_header(
+            name, 'histogram', 'Time between the starts of frames.')
+        text += metrics.format_histogram(name, self.frame_times['interval'])
+        name = 'fem_frame_jitter_milliseconds'
+        text += metrics.format_header(
+            name, 'histogram',
+            'Deviation of the frame interval from FRAME_INTERVAL.')
+        text += metrics.format_histogram(name, self.frame_times['jitter'])
+        name = 'fem_frames_sent_total'
+        text += metrics.format_header(name, 'counter',
+                                      'Frames delivered to the ACC.')
+        text += metrics.format_sample(name, self.frames_sent.get())
+        name = 'fem_frames_skipped_total'
+        text += metrics.format_header(name, 'counter',
+                                      'Frames not delivered to the ACC.')
+        text += metrics.format_sample(name, self.frames_skipped.get())
+        name = 'fem_frame_failures_total'
+        text += metrics.format_header(name, 'counter',
+                                      'Failed frames by phase.')
+        for phase in ['poll', 'pack', 'send']:
+            text += metrics.format_sample(
+                name, self.frame_failures[phase].get(), {'phase': phase})
+
+        # Stateframe archive metrics.
+        archive = self.archive.status()
+        for key, name, metric_type, description in [
+                ('written', 'fem_archive_frames_written_total', 'counter',
+                 'Frames written to the archive.'),
+                ('dropped', 'fem_archive_frames_dropped_total', 'counter',
+                 'Frames the archive could not keep up with or write.'),
+                ('frames', 'fem_archive_frames', 'gauge',
+                 'Frames held in the archive.'),
+                ('bytes', 'fem_archive_bytes', 'gauge',
+                 'Size of the archive segments.')]:
+            text += metrics.format_header(name, metric_type, description)
+            text += metrics.format_sample(name, archive[key])
+
+        # Shared memory metrics.
+        name = 'fem_shm_frames_published_total'
+        text += metrics.format_header(name, 'counter',
+                                      'Frames published in shared memory.')
+        text += metrics.format_sample(name, self.shm.published)
+
+        # Fan-out metrics.
+        name = 'fem_multicast_frames_sent_total'
+        text += metrics.format_header(name, 'counter',
+                                      'Frames sent to MULTICAST_GROUP.')
+        text += metrics.format_sample(name, self.fanout.sent)
+        name = 'fem_multicast_frames_dropped_total'
+        text += metrics.format_header(name, 'counter',
+                                      'Frames not sent to MULTICAST_GROUP.')
+        text += metrics.format_sample(name, self.fanout.dropped)
+
+        # Process metrics.
+        name = 'fem_log_queue_depth'
+        text += metrics.format_header(name, 'gauge',
+                                      'Messages waiting to be logged.')
+        text += metrics.format_sample(name, self.log_queue.qsize())
+        name = 'fem_threads'
+        text += metrics.format_header(name, 'gauge', 'Live threads.')
+        text += metrics.format_sample(name, threading.active_count())
+        name = 'fem_resident_memory_bytes'
+        text += metrics.format_header(name, 'gauge', 'Resident set size.')
+        try:
+            with open('/proc/self/statm') as statm:
+                pages = int(statm.read().split()[1])
+            text += metrics.format_sample(
+                name, pages * os.sysconf('SC_PAGE_SIZE'))
+        except (IOError, ValueError, IndexError):
+            pass
+        return text
 
 
     # region Method Description
@@ -223,21 +836,82 @@ class ServerDaemon():
             self.__log('Unable to listen at port ' + str(HOST_PORT) +
                        '. Error Code: ' + str(msg[0]) + '. Message: ' +
                        str(msg[1]))
+            self.log_queue.join()
             sys.exit()
         acc_listener.listen(1)
-        self.__log('Successfully setup listener')
+        self.__log('Successfully setup listener in %.1f ms' %
+                   ((time.time() - self.start_time) * 1000))
+
+        # Setup subscription channel for asynchronous events at EVENT_PORT.
+        event_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            event_listener.bind((HOST, EVENT_PORT))
+            event_listener.listen(5)
+            event_thread = threading.Thread(target=self.__accept_subscribers,
+                                            args=(event_listener,))
+            event_thread.daemon = True
+            event_thread.start()
+        except socket.error, msg:
+            self.__log('Unable to listen for subscribers at port ' +
+                       str(EVENT_PORT) + '. Error Code: ' + str(msg[0]) +
+                       '. Message: ' + str(msg[1]))
+
+        # Profile on demand when signalled. Handlers can only be installed
+        # from the main thread, which is not the case when the server is
+        # run in-process, i.e. by the benchmarks.
+        try:
+            signal.signal(signal.SIGUSR2, self.__profile_signal)
+        except ValueError:
+            self.__log('Not running in the main thread, SIGUSR2 profiling '
+                       'is unavailable.')
+
+        # Serve metrics to local scrapers at METRICS_PORT.
+        try:
+            metrics_server.MetricsServer(METRICS_HOST, METRICS_PORT,
+                                         self.__collect_metrics).start()
+        except socket.error, msg:
+            self.__log('Unable to serve metrics at port ' +
+                       str(METRICS_PORT) + '. Error Code: ' + str(msg[0]) +
+                       '. Message: ' + str(msg[1]))
+
+        # Archive frames locally.
+        try:
+            self.archive.start()
+        except (IOError, OSError), e:
+            self.__log('Unable to archive stateframes in ' +
+                       self.archive.directory + ': ' + str(e))
+
+        # Publish frames to local readers at SHM_PATH.
+        try:
+            self.shm.open()
+        except EnvironmentError, e:
+            self.__log('Unable to publish stateframes at ' + SHM_PATH +
+                       ': ' + str(e))
+
+        # Send frames to subscribers at MULTICAST_GROUP, if set.
+        if MULTICAST_GROUP is not None:
+            try:
+                self.fanout.open()
+            except socket.error, e:
+                self.__log('Unable to send stateframes to ' +
+                           MULTICAST_GROUP + ':' + str(MULTICAST_PORT) +
+                           ': ' + str(e))
+
+        # Start polling each worker on its own schedule.
+        for sampler in self.samplers.values():
+            sampler.start()
 
         polling_thread = threading.Thread(target=self.send_stateframe_dict)
         polling_thread.start()
 
         while True:
             # Wait for a connection from ACC.
-            connection, address = acc_listener.accept()
+            connection, address = self.__uninterrupted(acc_listener.accept)
             self.__log('Connection from ' + address[0] +
                        ':' + str(address[1]))
 
             # Read packet sent from ACC, currently capped at 1024 bytes.
-            acc_command = connection.recv(1024)
+            acc_command = self.__uninterrupted(connection.recv, 1024)
             self.__log('Command issued from connection: ' + acc_command)
             acc_command = acc_command.split()
 
@@ -247,8 +921,17 @@ class ServerDaemon():
             # Verify that the given command exists and execute it with the
             # correct worker if it does.
             try:
-                worker = self.function_map[acc_command[0]]
-                worker.execute(acc_command)
+                if acc_command[0] in self.admin_map:
+                    reply = self.admin_map[acc_command[0]](acc_command)
+                else:
+                    worker = self.function_map[acc_command[0]]
+                    reply = self.__execute_worker(worker, acc_command)
+                if reply is not None:
+                    connection.sendall(reply)
             except KeyError:
                 self.__log('Unrecognized command received: ' +
                            acc_command[0] + '.')
+            except socket.error:
+                self.__log('Unable to send reply for ' + acc_command[0] +
+                           ' to ACC.')
+            connection.close()
@@ -4,6 +4,9 @@
     Email: lkkung@caltech.edu
 """
 
+# Default time in seconds between stateframe polls of a worker.
+DEFAULT_POLL_INTERVAL = 0.3
+
 # region Class Description
 """
 Class: IWorker
@@ -14,12 +17,27 @@ Class: IWorker
         each concrete implementation of IWorker. When an IWorker is linked
         to a ServerDaemon, its internal logger function is replaced, but by
         default, the logging function is simply a print to standard out.
+        Likewise, the publishing function used to push asynchronous events
+        to subscribers is replaced when linked, and by default discards
+        events. The ServerDaemon polls stateframe_query at the interval
+        returned by get_poll_interval, which defaults to poll_interval and
+        may be set or adapted by each worker to suit its device, and takes
+        the data to have been acquired when it was polled unless
+        get_sample_time says otherwise. A worker
+        can ask for an immediate poll with poll_now once linked. Every
+        exchange a worker makes with its device goes through trace, so
+        that a tracer set with set_tracer can record the traffic or replay
+        it in place of the device.
 """
 # endregion
 class IWorker(object):
     def __init__(self):
         self.logger = self.__print
+        self.publisher = self.__discard
+        self.poll_now = self.__discard_trigger
         self.name = None
+        self.poll_interval = DEFAULT_POLL_INTERVAL
+        self.tracer = None
 
     # region Method Description
     """
@@ -35,6 +53,103 @@ class IWorker(object):
     def set_logger(self, logging_method):
         self.logger = logging_method
 
+    # region Method Description
+    """
+    Method: set_publisher
+        Description:
+            This method allows the ServerDaemon to set the method used by
+            each of its workers to push asynchronous events, such as the
+            completion of a long running command, to its subscribers.
+        Arguments:
+            publishing_method: a pointer to a method that accepts one
+                argument, a single line event string to be published.
+    """
+    # endregion
+    def set_publisher(self, publishing_method):
+        self.publisher = publishing_method
+
+    # region Method Description
+    """
+    Method: set_poll_trigger
+        Description:
+            This method allows the ServerDaemon to set the method each of
+            its workers calls to have its stateframe polled immediately
+            instead of waiting for the rest of the poll interval.
+        Arguments:
+            trigger_method: a pointer to a method that accepts no
+                arguments.
+    """
+    # endregion
+    def set_poll_trigger(self, trigger_method):
+        self.poll_now = trigger_method
+
+    # region Method Description
+    """
+    Method: set_tracer
+        Description:
+            Sets the tracer that this worker's exchanges with its device
+            go through, i.e. a TraceRecorder or TraceReplayer from
+            traffic_trace.py.
+        Arguments:
+            tracer: object with an exchange(device, request, perform)
+                method, or None to talk to the device directly.
+    """
+    # endregion
+    def set_tracer(self, tracer):
+        self.tracer = tracer
+
+    # region Method Description
+    """
+    Method: trace
+        Description:
+            Carries out an exchange with the device through the tracer,
+            if one is set.
+        Arguments:
+            device: name of the device, one of traffic_trace.DEVICES.
+            request: bytes sent to the device.
+            perform: method taking no arguments that carries out the
+                exchange and returns the reply.
+        Returns:
+            reply: the reply from the device or the tracer.
+    """
+    # endregion
+    def trace(self, device, request, perform):
+        tracer = self.tracer
+        if tracer is None:
+            return perform()
+        return tracer.exchange(device, request, perform)
+
+    # region Method Description
+    """
+    Method: get_poll_interval
+        Description:
+            Returns the time in seconds until this worker's stateframe
+            should next be polled. Workers whose devices need faster
+            sampling at some times than others may override this.
+        Returns:
+            The poll interval in seconds, poll_interval by default.
+    """
+    # endregion
+    def get_poll_interval(self):
+        return self.poll_interval
+
+    # region Method Description
+    """
+    Method: get_sample_time
+        Description:
+            Returns the time at which the data last returned by
+            stateframe_query was acquired from the device. Workers that
+            answer stateframe_query from readings of their own, taken
+            before the query, must override this so that the age of the
+            data is not understated.
+        Returns:
+            Time in seconds since the epoch, or None if the data was
+            acquired by the query itself.
+    """
+    # endregion
+    def get_sample_time(self):
+        return None
+
     # region Method Description
     """
     Method: __print
@@ -46,6 +161,28 @@ class IWorker(object):
     def __print(self, statement):
         print statement
 
+    # region Method Description
+    """
+    Method: __discard
+        Description:
+            Default publishing method that drops the event, used until the
+            worker is linked to a ServerDaemon.
+    """
+    # endregion
+    def __discard(self, event):
+        pass
+
+    # region Method Description
+    """
+    Method: __discard_trigger
+        Description:
+            Default poll trigger that does nothing, used until the worker
+            is linked to a ServerDaemon.
+    """
+    # endregion
+    def __discard_trigger(self):
+        pass
+
     # region Method Description
     """
     Method: get_command_list
@@ -72,6 +209,10 @@ class IWorker(object):
             command from get_command_list.
         Arguments:
             acc_command: array of command and parameters from the ACC.
+        Returns:
+            Optionally a string reply that the ServerDaemon sends back to
+            the ACC over the connection the command was received on.
+            Commands that do not reply return None.
     """
     # endregion
     def execute(self, acc_command):
@@ -85,7 +226,9 @@ class IWorker(object):
             of the workers. Depending on the worker, the return format
             may be different.
         Returns:
-            Generally should return a dictionary with the polled data.
+            Generally should return a dictionary with the polled data, or
+            None if the worker has no data yet, which the server reports
+            as invalid without counting it as a failure.
     """
     def stateframe_query(self):
         raise NotImplementedError
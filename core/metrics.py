@@ -0,0 +1,268 @@
+"""
+    STARBURST ACC/FEANTA Runtime Metrics
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import bisect
+import socket
+import threading
+
+# Upper bounds in milliseconds of the histogram buckets used for latencies.
+# A final bucket catches everything above the last bound.
+LATENCY_BOUNDS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500,
+                     1000, 2000, 5000)
+
+
+# region Class Description
+"""
+Class: Counter
+    Description:
+        Thread-safe monotonically increasing count.
+"""
+# endregion
+class Counter(object):
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: increment
+        Description:
+            Adds to the count.
+        Arguments:
+            amount: amount to add, defaults to 1.
+    """
+    # endregion
+    def increment(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    # region Method Description
+    """
+    Method: get
+        Description:
+            Returns the current count.
+    """
+    # endregion
+    def get(self):
+        return self.value
+
+
+# region Class Description
+"""
+Class: Histogram
+    Description:
+        Thread-safe histogram of observed values over fixed buckets. The
+        bucket counts are allocated once, so observing a value costs a
+        binary search and a few additions and never allocates.
+    Arguments:
+        bounds: increasing upper bounds of the buckets, defaults to
+            LATENCY_BOUNDS_MS.
+"""
+# endregion
+class Histogram(object):
+    def __init__(self, bounds=LATENCY_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: observe
+        Description:
+            Records a value.
+        Arguments:
+            value: observed value, in the units of the bounds.
+    """
+    # endregion
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+
+    # region Method Description
+    """
+    Method: snapshot
+        Description:
+            Returns a consistent copy of the histogram.
+        Returns:
+            [0]: list of bucket counts, one more than the number of bounds.
+            [1]: number of observed values.
+            [2]: sum of observed values.
+            [3]: smallest observed value, or None.
+            [4]: largest observed value, or None.
+    """
+    # endregion
+    def snapshot(self):
+        with self.lock:
+            return (list(self.counts), self.count, self.total,
+                    self.minimum, self.maximum)
+
+    # region Method Description
+    """
+    Method: percentile
+        Description:
+            Estimates a percentile of the observed values as the upper
+            bound of the bucket containing it, or the largest observed
+            value if it falls in the last bucket.
+        Arguments:
+            fraction: percentile as a fraction, i.e. 0.99.
+        Returns:
+            The estimate, or None if no values have been observed.
+    """
+    # endregion
+    def percentile(self, fraction):
+        counts, count, total, minimum, maximum = self.snapshot()
+        if count == 0:
+            return None
+        rank = fraction * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count > 0:
+                if index == len(self.bounds):
+                    return maximum
+                return min(self.bounds[index], maximum)
+        return maximum
+
+    # region Method Description
+    """
+    Method: summary
+        Description:
+            Formats the count, mean, p50, p99 and maximum on one line.
+        Returns:
+            summary: the formatted line.
+    """
+    # endregion
+    def summary(self):
+        counts, count, total, minimum, maximum = self.snapshot()
+        if count == 0:
+            return 'count=0'
+        return ('count=%d mean=%.2f p50=%.2f p99=%.2f max=%.2f' %
+                (count, total / count, self.percentile(0.5),
+                 self.percentile(0.99), maximum))
+
+
+# region Class Description
+"""
+Class: WorkerMetrics
+    Description:
+        Latency histograms and error counts for a single worker, shared by
+        its sampler, which records polls, and the server, which records
+        commands.
+"""
+# endregion
+class WorkerMetrics(object):
+    def __init__(self):
+        self.query_times = Histogram()
+        self.query_errors = Counter()
+        self.query_timeouts = Counter()
+        self.execute_times = Histogram()
+        self.execute_errors = Counter()
+        self.execute_timeouts = Counter()
+
+
+# region Method Description
+"""
+Method: is_timeout
+    Description:
+        Checks whether an exception raised by a worker was caused by a
+        device timing out, either directly or wrapped in the reason of a
+        urllib2.URLError as raised by mechanize.
+    Arguments:
+        error: the exception.
+    Returns:
+        True if the exception is a timeout, False otherwise.
+"""
+# endregion
+def is_timeout(error):
+    return isinstance(error, socket.timeout) or \
+        isinstance(getattr(error, 'reason', None), socket.timeout)
+
+
+# ---------------------------------------------------------------
+# PROMETHEUS TEXT FORMAT
+# ---------------------------------------------------------------
+
+def __labels(labels):
+    if not labels:
+        return ''
+    pairs = ['%s="%s"' % (key, value)
+             for key, value in sorted(labels.items())]
+    return '{' + ','.join(pairs) + '}'
+
+
+# region Method Description
+"""
+Method: format_header
+    Description:
+        Formats the HELP and TYPE lines of a metric.
+    Arguments:
+        name: name of the metric.
+        metric_type: 'counter', 'gauge' or 'histogram'.
+        description: one line description of the metric.
+    Returns:
+        text: the two lines, newline terminated.
+"""
+# endregion
+def format_header(name, metric_type, description):
+    return ('# HELP ' + name + ' ' + description + '\n' +
+            '# TYPE ' + name + ' ' + metric_type + '\n')
+
+
+# region Method Description
+"""
+Method: format_sample
+    Description:
+        Formats a single counter or gauge sample.
+    Arguments:
+        name: name of the metric.
+        value: numeric value of the sample.
+        labels: dictionary of label names to values, or None.
+    Returns:
+        text: the sample line, newline terminated.
+"""
+# endregion
+def format_sample(name, value, labels=None):
+    return name + __labels(labels) + ' ' + repr(float(value)) + '\n'
+
+
+# region Method Description
+"""
+Method: format_histogram
+    Description:
+        Formats the cumulative buckets, sum and count of a histogram.
+    Arguments:
+        name: name of the metric.
+        histogram: the Histogram to be formatted.
+        labels: dictionary of label names to values, or None.
+    Returns:
+        text: the sample lines, newline terminated.
+"""
+# endregion
+def format_histogram(name, histogram, labels=None):
+    counts, count, total, minimum, maximum = histogram.snapshot()
+    labels = dict(labels or {})
+    text = ''
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.bounds + ('+Inf',), counts):
+        cumulative += bucket_count
+        labels['le'] = str(bound)
+        text += name + '_bucket' + __labels(labels) + ' ' + \
+            str(cumulative) + '\n'
+    del labels['le']
+    text += format_sample(name + '_sum', total, labels)
+    text += format_sample(name + '_count', count, labels)
+    return text
@@ -0,0 +1,63 @@
+"""
+    STARBURST ACC/FEANTA Metrics Server
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import BaseHTTPServer
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+# region Class Description
+"""
+Class: MetricsServer
+    Description:
+        Minimal HTTP server answering GET /metrics with the Prometheus text
+        format produced by a collect method. The text is only built when
+        a scrape arrives, so the metrics themselves cost nothing but their
+        preallocated counters between scrapes. Serves from a single
+        daemon thread.
+    Arguments:
+        host: address to bind, normally '127.0.0.1'.
+        port: port to bind.
+        collect: method taking no arguments and returning the metrics as
+            a string in Prometheus text format.
+"""
+# endregion
+class MetricsServer(object):
+    def __init__(self, host, port, collect):
+        collect_method = collect
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ['/', '/metrics']:
+                    self.send_error(404)
+                    return
+                body = collect_method()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # Scrapes are not logged.
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = BaseHTTPServer.HTTPServer((host, port), Handler)
+        self.thread = None
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Starts serving on a daemon thread.
+    """
+    # endregion
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.httpd.serve_forever)
+            self.thread.daemon = True
+            self.thread.start()
@@ -4,14 +4,21 @@
     Email: lkkung@caltech.edu
 """
 
-from bs4 import BeautifulSoup as Soup
-import mechanize
 import urllib
 import i_worker
+import resolver
+import rtt_estimator
+import socket
 import threading
+import time
+
+# Device drivers, imported on first use by __load_drivers.
+Soup = None
+mechanize = None
 
 # Description of the PDU device. Currently hard-coded.
-PDU_HOSTNAME = 'http://pduanta.solar.pvt'
+PDU_HOSTNAME = 'pduanta.solar.pvt'
+PDU_PORT = 80
 PDU_USERNAME = 'admin'
 PDU_PASSWORD = 'pwr4me'
 
@@ -24,6 +31,9 @@ LOGIN_DATA = {'Username': PDU_USERNAME,
               'Password': PDU_PASSWORD}
 
 PDU_TIMEOUT = 0.3
+PDU_TIMEOUT_MIN = 0.05
+PDU_TIMEOUT_MAX = 2.0
+PDU_POLL_INTERVAL = 2.0
 
 
 class PDUWorker(i_worker.IWorker):
@@ -34,12 +44,51 @@ class PDUWorker(i_worker.IWorker):
                          'ND-OFF']
         self.browser = None
         self.name = 'PDU-Worker'
+        self.poll_interval = PDU_POLL_INTERVAL
         self.lock = threading.Lock()
+        self.rtt = rtt_estimator.RTTEstimator(PDU_TIMEOUT, PDU_TIMEOUT_MIN,
+                                              PDU_TIMEOUT_MAX)
+        resolver.RESOLVER.register(PDU_HOSTNAME)
 
     # ---------------------------------------------------------------
     # LOGIN ROUTINES SPECIFIC TO PDU
     # ---------------------------------------------------------------
 
+    # region Method Description
+    """
+    Method: __load_drivers
+        Description:
+            Imports BeautifulSoup and mechanize the first time they are
+            needed so that they are not loaded when the server starts.
+    """
+    # endregion
+    def __load_drivers(self):
+        global Soup, mechanize
+        if mechanize is None:
+            from bs4 import BeautifulSoup
+            import mechanize as mechanize_module
+            Soup = BeautifulSoup
+            mechanize = mechanize_module
+
+    # region Method Description
+    """
+    Method: __url
+        Description:
+            Builds the url of a page on the PDU from the address cached by
+            the shared resolver, so that requests to the PDU do not wait
+            on a hostname lookup.
+        Arguments:
+            path: path of the page, i.e. '/index.htm'.
+        Returns:
+            url: full url of the page.
+    """
+    # endregion
+    def __url(self, path):
+        address = resolver.RESOLVER.resolve(PDU_HOSTNAME)
+        if PDU_PORT != 80:
+            address += ':' + str(PDU_PORT)
+        return 'http://' + address + path
+
     # region Method Description
     """
     Method: __login
@@ -49,9 +98,19 @@ class PDUWorker(i_worker.IWorker):
     """
     # endregion
     def __login(self):
+        self.__load_drivers()
+        index_url = self.__url('/index.htm')
         try:
-            self.browser.open(PDU_HOSTNAME + '/index.htm', timeout=PDU_TIMEOUT)
-            if self.browser.geturl() == PDU_HOSTNAME + '/index.htm':
+            start = time.time()
+            try:
+                self.browser.open(index_url, timeout=self.rtt.timeout())
+            except Exception, e:
+                if isinstance(e, socket.timeout) or \
+                        isinstance(getattr(e, 'reason', None), socket.timeout):
+                    self.rtt.backoff()
+                raise
+            self.rtt.sample(time.time() - start)
+            if self.browser.geturl() == index_url:
                 return True
             else:
                 raise Exception()
@@ -61,10 +120,10 @@ class PDUWorker(i_worker.IWorker):
             self.browser.set_handle_refresh(False)
 
             encoded_data = urllib.urlencode(LOGIN_DATA)
-            self.browser.open(PDU_HOSTNAME + '/login.tgi',
-                              encoded_data, timeout=PDU_TIMEOUT)
-            self.browser.open(PDU_HOSTNAME + '/index.htm', timeout=PDU_TIMEOUT)
-            if self.browser.geturl() == PDU_HOSTNAME + '/index.htm':
+            self.browser.open(self.__url('/login.tgi'),
+                              encoded_data, timeout=self.rtt.timeout())
+            self.browser.open(index_url, timeout=self.rtt.timeout())
+            if self.browser.geturl() == index_url:
                 self.logger('Successfully logged into PDU.')
                 return True
         return False
@@ -78,7 +137,7 @@ class PDUWorker(i_worker.IWorker):
     """
     # endregion
     def __logout(self):
-        self.browser.open(PDU_HOSTNAME + '/logout')
+        self.browser.open(self.__url('/logout'))
         self.browser.close()
         self.browser = None
         self.logger('Successfully logged out.')
@@ -97,7 +156,7 @@ class PDUWorker(i_worker.IWorker):
             acc_command: list of the strings sent from the ACC. List format:
                 ['OUTLET', outlet_number, 'on' or 'off']
         Returns:
-            command: url designated to complete task.
+            command: path of the url designated to complete task.
     """
     # endregion
     def __outlet(self, acc_command):
@@ -119,8 +178,7 @@ class PDUWorker(i_worker.IWorker):
 
         # Given that the parameters are all correct, we return the
         # link string to be processed later.
-        command = PDU_HOSTNAME + '/outlet?' + str(outlet_num) + '=' + \
-                  on_off.upper()
+        command = '/outlet?' + str(outlet_num) + '=' + on_off.upper()
         return command
 
     # region Method Description
@@ -133,7 +191,7 @@ class PDUWorker(i_worker.IWorker):
             acc_command: list of the strings sent from the ACC. List format:
                 ['ND-ON']
         Returns:
-            command: url designated to complete task.
+            command: path of the url designated to complete task.
     """
     # endregion
     def __nd_on(self, acc_command):
@@ -143,7 +201,7 @@ class PDUWorker(i_worker.IWorker):
             return None
         # Given that the parameters are all correct, we return the
         # link string to be processed later.
-        command = PDU_HOSTNAME + '/outlet?' + str(8) + '=ON'
+        command = '/outlet?' + str(8) + '=ON'
         return command
 
     # region Method Description
@@ -156,7 +214,7 @@ class PDUWorker(i_worker.IWorker):
             acc_command: list of the strings sent from the ACC. List format:
                 ['ND-OFF']
         Returns:
-            command: url designated to complete task.
+            command: path of the url designated to complete task.
     """
     # endregion
     def __nd_off(self, acc_command):
@@ -166,7 +224,7 @@ class PDUWorker(i_worker.IWorker):
             return None
         # Given that the parameters are all correct, we return the
         # link string to be processed later.
-        command = PDU_HOSTNAME + '/outlet?' + str(8) + '=OFF'
+        command = '/outlet?' + str(8) + '=OFF'
         return command
 
     # ---------------------------------------------------------------
@@ -179,36 +237,81 @@ class PDUWorker(i_worker.IWorker):
     # ---------------------------------------------------------------
     # STATEFRAME HELPERS
     # ---------------------------------------------------------------
+
+    # region Method Description
+    """
+    Method: __statusandpower_query
+        Description:
+            Reads the outlet statuses and the voltage and current of the
+            power strip from the PDU. A failed login raises rather than
+            returning empty lists, so that the poll is counted as failed
+            and the circuit breaker sees it.
+        Returns:
+            See __parse_status_page.
+    """
+    # endregion
     def __statusandpower_query(self):
+        xml_data = self.trace('pdu', 'GET /index.htm',
+                              self.__read_status_page)
+        if not xml_data:
+            raise IOError('Unable to login to PDU.')
+        return self.__parse_status_page(xml_data)
+
+    # region Method Description
+    """
+    Method: __read_status_page
+        Description:
+            Logs in to the PDU, which leaves the browser on the index
+            page, and reads the page.
+        Returns:
+            xml_data: html of the index page, or an empty string if the
+                login failed.
+    """
+    # endregion
+    def __read_status_page(self):
+        if not self.__login():
+            return ''
+        return self.browser.response().read()
+
+    # region Method Description
+    """
+    Method: __parse_status_page
+        Description:
+            Parses the outlet statuses and the voltage and current of the
+            power strip out of the PDU's index page.
+        Arguments:
+            xml_data: html of the index page.
+        Returns:
+            [0]: list of outlet statuses, 1 for on and 0 for off.
+            [1]: list of voltages.
+            [2]: list of currents.
+    """
+    # endregion
+    def __parse_status_page(self, xml_data):
+        self.__load_drivers()
         statuses = []
         volts = []
         current = []
-        is_logged_in = self.__login()
-        if not is_logged_in:
-            self.logger('Unable to login to PDU.')
 
-        else:
-            # Get statuses of the 8 devices.
-            html_response = self.browser.response()
-            xml_data = html_response.read()
-            xml_soup = Soup(xml_data, 'html.parser')
-            read_statuses = xml_soup('table')[5]('font')
-            for status in read_statuses:
-                statuses.append(ON_OFF_MAP[status.text])
-
-            # Get voltage and current of the power strip
-            read_power = xml_soup('table')[5]('th', {'colspan': '3'})
-            for power_reading in read_power:
-                readings = power_reading.text.split()
-                v = 0
-                i = 0
-                try:
-                    v = float(readings[0].replace('V', ''))
-                    i = float(readings[1].replace('A', ''))
-                except ValueError:
-                    pass
-                volts.append(v)
-                current.append(i)
+        # Get statuses of the 8 devices.
+        xml_soup = Soup(xml_data, 'html.parser')
+        read_statuses = xml_soup('table')[5]('font')
+        for status in read_statuses:
+            statuses.append(ON_OFF_MAP[status.text])
+
+        # Get voltage and current of the power strip
+        read_power = xml_soup('table')[5]('th', {'colspan': '3'})
+        for power_reading in read_power:
+            readings = power_reading.text.split()
+            v = 0
+            i = 0
+            try:
+                v = float(readings[0].replace('V', ''))
+                i = float(readings[1].replace('A', ''))
+            except ValueError:
+                pass
+            volts.append(v)
+            current.append(i)
 
         return statuses, volts, current
 
@@ -236,19 +339,35 @@ class PDUWorker(i_worker.IWorker):
     """
     # endregion
     def execute(self, acc_command):
-        is_logged_in = self.__login()
-        if is_logged_in:
+        # The browser is shared with stateframe polls on another thread.
+        with self.lock:
 
             # Use the routine calls to generate url commands.
             command_string = self.function_map[acc_command[0]]\
                                 (self, acc_command)
             if command_string is not None:
-                self.browser.open(command_string)
-                self.logger(
-                    'The following link was followed for the PDU: ' +
-                    command_string)
-        else:
+                self.trace('pdu', 'GET ' + command_string,
+                           lambda: self.__follow(command_string))
+
+    # region Method Description
+    """
+    Method: __follow
+        Description:
+            Logs in to the PDU and follows a command url.
+        Arguments:
+            command_string: path built by one of the command routines.
+        Returns:
+            An empty string, as the PDU's reply is not used.
+    """
+    # endregion
+    def __follow(self, command_string):
+        if not self.__login():
             self.logger('Unable to login to PDU.')
+            return ''
+        url = self.__url(command_string)
+        self.browser.open(url, timeout=self.rtt.timeout())
+        self.logger('The following link was followed for the PDU: ' + url)
+        return ''
 
     # region Method Description
     """
@@ -259,7 +378,8 @@ class PDUWorker(i_worker.IWorker):
     """
     # endregion
     def stateframe_query(self):
-        statuses, volt, current = self.__statusandpower_query()
+        with self.lock:
+            statuses, volt, current = self.__statusandpower_query()
         return {'STATUS': statuses,
                 'VOLTS': volt,
                 'CURRENT': current}
@@ -0,0 +1,106 @@
+"""
+    STARBURST ACC/FEANTA Sampling Profiler
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+
+# Time in seconds between samples of every thread's stack.
+PROFILE_INTERVAL = 0.005
+
+# Longest profile that can be requested, in seconds.
+PROFILE_MAX_DURATION = 600
+
+# Numbered suffix of the names threading gives unnamed threads, i.e.
+# 'Thread-12'. It is stripped so that every run of a thread started over
+# and over, such as a threading.Timer, is counted under the same root.
+THREAD_NUMBER = re.compile(r'-\d+$')
+
+
+# region Class Description
+"""
+Class: SamplingProfiler
+    Description:
+        Statistical profiler for a running process. While a profile is
+        running, a thread samples the stack of every other thread every
+        PROFILE_INTERVAL seconds through sys._current_frames, and counts
+        each distinct stack. When the profile ends the counts are written
+        in collapsed-stack format, one 'thread;frame;frame count' line per
+        stack, which flamegraph.pl and speedscope read directly. Threads
+        are named without the number threading gives unnamed threads, so
+        that threads started over and over share one root. Unlike
+        cProfile this covers threads that are already running, such as
+        the listener and the samplers, and there is no profiling thread or
+        hook at all while no profile is running.
+"""
+# endregion
+class SamplingProfiler(object):
+    def __init__(self):
+        self.thread = None
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Starts a profile in the background unless one is running.
+        Arguments:
+            duration: length of the profile in seconds, capped at
+                PROFILE_MAX_DURATION.
+            path: file the collapsed stacks are written to.
+        Returns:
+            True if the profile was started, False if one is running.
+    """
+    # endregion
+    def start(self, duration, path):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return False
+            duration = max(0, min(duration, PROFILE_MAX_DURATION))
+            self.thread = threading.Thread(target=self.__profile,
+                                           args=(duration, path))
+            self.thread.daemon = True
+            self.thread.start()
+            return True
+
+    # region Method Description
+    """
+    Method: is_running
+        Description:
+            Checks whether a profile is running.
+    """
+    # endregion
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def __profile(self, duration, path):
+        stacks = {}
+        own_id = threading.current_thread().ident
+        end = time.time() + duration
+        while time.time() < end:
+            names = dict((thread.ident, THREAD_NUMBER.sub('', thread.name))
+                         for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(os.path.basename(code.co_filename) + ':' +
+                                 code.co_name)
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, 'Thread'))
+                stack.reverse()
+                key = ';'.join(stack)
+                stacks[key] = stacks.get(key, 0) + 1
+            time.sleep(PROFILE_INTERVAL)
+
+        with open(path, 'w') as collapsed:
+            for key, count in sorted(stacks.items()):
+                collapsed.write(key.replace(' ', '_') + ' ' + str(count) +
+                                '\n')
@@ -0,0 +1,200 @@
+"""
+    STARBURST ACC/FEANTA Hostname Resolver
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import socket
+import threading
+import time
+
+# Time in seconds that a resolved address is considered current.
+RESOLVE_TTL = 300.0
+
+# Registered hostnames are looked up again in the background once their
+# address is older than this fraction of RESOLVE_TTL, so that a current
+# address is normally available without waiting for expiry.
+RESOLVE_REFRESH_FRACTION = 0.8
+RESOLVE_CHECK_INTERVAL = 10.0
+
+# After a failed lookup the hostname is not looked up again for
+# RESOLVE_RETRY_MIN seconds, doubling with each consecutive failure up to
+# RESOLVE_RETRY_MAX, so that an unresolvable hostname costs at most one
+# lookup per backoff rather than one per poll.
+RESOLVE_RETRY_MIN = 1.0
+RESOLVE_RETRY_MAX = 60.0
+
+
+# region Class Description
+"""
+Class: Resolver
+    Description:
+        Cache of hostname to address lookups. Lookups are always done in a
+        background thread so that an unresolvable or slow hostname never
+        blocks the caller. Until a hostname has been resolved once, resolve
+        raises socket.gaierror. Hostnames registered with register are
+        refreshed by a background thread before their address expires.
+        If a lookup fails or is still running when an address expires,
+        the last known address keeps being returned, so DNS outages and
+        slow lookups never add latency to polls or commands. Failed
+        lookups are remembered, and the hostname is only looked up again
+        once an exponentially growing backoff has passed.
+"""
+# endregion
+class Resolver(object):
+    def __init__(self):
+        self.addresses = {}
+        self.lookups = {}
+        self.failures = {}
+        self.errors = {}
+        self.retry_times = {}
+        self.registered = set()
+        self.refresher = None
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: register
+        Description:
+            Registers a hostname to be kept current by the background
+            refresher and starts its first lookup.
+        Arguments:
+            hostname: hostname to be resolved.
+    """
+    # endregion
+    def register(self, hostname):
+        with self.lock:
+            self.registered.add(hostname)
+        self.prefetch(hostname)
+
+    # region Method Description
+    """
+    Method: prefetch
+        Description:
+            Starts a background lookup of the hostname if there is no
+            current address for it, no lookup already running and no
+            failed lookup within its backoff.
+        Arguments:
+            hostname: hostname to be resolved.
+            max_age: age in seconds after which the address is no longer
+                current. Defaults to RESOLVE_TTL.
+    """
+    # endregion
+    def prefetch(self, hostname, max_age=RESOLVE_TTL):
+        with self.lock:
+            self.__start_refresher()
+            entry = self.addresses.get(hostname, None)
+            if entry is not None and time.time() - entry[1] < max_age:
+                return
+            # Lookups started before the daemon forked do not survive the
+            # fork, so only a lookup that is still alive counts as running.
+            lookup = self.lookups.get(hostname, None)
+            if lookup is not None and lookup.is_alive():
+                return
+            if time.time() < self.retry_times.get(hostname, 0):
+                return
+            lookup = threading.Thread(target=self.__lookup, args=(hostname,))
+            lookup.daemon = True
+            self.lookups[hostname] = lookup
+            lookup.start()
+
+    # region Method Description
+    """
+    Method: resolve
+        Description:
+            Returns the cached address of the hostname without blocking,
+            starting a background lookup if the address is missing or has
+            expired. An expired address is still returned as the last
+            known address of the hostname. A hostname that has never been
+            resolved raises socket.gaierror, with the error of its last
+            failed lookup if there was one.
+        Arguments:
+            hostname: hostname to be resolved.
+        Returns:
+            address: IPv4 address of the hostname as a string.
+    """
+    # endregion
+    def resolve(self, hostname):
+        self.prefetch(hostname)
+        entry = self.addresses.get(hostname, None)
+        if entry is None:
+            error = self.errors.get(hostname, None)
+            if error is not None:
+                raise error
+            raise socket.gaierror(socket.EAI_AGAIN,
+                                  'Hostname ' + hostname +
+                                  ' has not been resolved yet.')
+        return entry[0]
+
+    # region Method Description
+    """
+    Method: status
+        Description:
+            Reports the state of every cached hostname.
+        Returns:
+            status: dictionary mapping each hostname to a tuple of its
+                last known address (or None), the age of that address in
+                seconds (or None) and the number of consecutive failed
+                lookups.
+    """
+    # endregion
+    def status(self):
+        now = time.time()
+        status = {}
+        with self.lock:
+            for hostname in self.registered | set(self.addresses.keys()):
+                address, age = None, None
+                entry = self.addresses.get(hostname, None)
+                if entry is not None:
+                    address, age = entry[0], now - entry[1]
+                status[hostname] = (address, age,
+                                    self.failures.get(hostname, 0))
+        return status
+
+    def __lookup(self, hostname):
+        try:
+            address = socket.gethostbyname(hostname)
+        except socket.error, e:
+            with self.lock:
+                failures = self.failures.get(hostname, 0) + 1
+                self.failures[hostname] = failures
+                self.errors[hostname] = socket.gaierror(
+                    socket.EAI_AGAIN, 'Hostname ' + hostname +
+                    ' could not be resolved: ' + str(e))
+                self.retry_times[hostname] = time.time() + min(
+                    RESOLVE_RETRY_MIN * 2 ** (failures - 1),
+                    RESOLVE_RETRY_MAX)
+            return
+        with self.lock:
+            self.addresses[hostname] = (address, time.time())
+            self.failures[hostname] = 0
+            self.errors.pop(hostname, None)
+            self.retry_times.pop(hostname, None)
+
+    # region Method Description
+    """
+    Method: __start_refresher
+        Description:
+            Starts the refresher thread if it is not running. Must be
+            called with the lock held. As with lookups, a refresher started
+            before the daemon forked is restarted in the daemon.
+    """
+    # endregion
+    def __start_refresher(self):
+        if self.refresher is None or not self.refresher.is_alive():
+            self.refresher = threading.Thread(target=self.__refresh)
+            self.refresher.daemon = True
+            self.refresher.start()
+
+    def __refresh(self):
+        while True:
+            time.sleep(RESOLVE_CHECK_INTERVAL)
+            with self.lock:
+                hostnames = list(self.registered)
+            for hostname in hostnames:
+                self.prefetch(hostname,
+                              RESOLVE_TTL * RESOLVE_REFRESH_FRACTION)
+
+
+# Resolver shared by the server and its workers.
+RESOLVER = Resolver()
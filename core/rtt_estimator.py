@@ -0,0 +1,90 @@
+"""
+    STARBURST ACC/FEANTA Round-Trip Time Estimator
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import threading
+
+# Gains and variance multiplier from TCP's retransmission timer (RFC 6298).
+RTT_ALPHA = 0.125
+RTT_BETA = 0.25
+RTT_K = 4
+
+# Clock granularity in seconds, the smallest margin kept above the
+# smoothed round-trip time.
+RTT_GRANULARITY = 0.005
+
+
+# region Class Description
+"""
+Class: RTTEstimator
+    Description:
+        Tracks a smoothed round-trip time and its variance for a device
+        in the style of TCP's retransmission timeout, and derives the
+        timeout to use for the next exchange from them. A timed out
+        exchange doubles the timeout until a new sample is taken. The
+        timeout is always kept within the given bounds.
+    Arguments:
+        initial: timeout in seconds used before any sample is taken.
+        minimum: lower bound on the timeout in seconds.
+        maximum: upper bound on the timeout in seconds.
+"""
+# endregion
+class RTTEstimator(object):
+    def __init__(self, initial, minimum, maximum):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt = None
+        self.rttvar = None
+        self.rto = self.__clamp(initial)
+        self.lock = threading.Lock()
+
+    def __clamp(self, value):
+        return max(self.minimum, min(self.maximum, value))
+
+    # region Method Description
+    """
+    Method: timeout
+        Description:
+            Returns the timeout to use for the next exchange.
+        Returns:
+            rto: timeout in seconds.
+    """
+    # endregion
+    def timeout(self):
+        return self.rto
+
+    # region Method Description
+    """
+    Method: sample
+        Description:
+            Folds the round-trip time of a successful exchange into the
+            estimate and updates the timeout.
+        Arguments:
+            rtt: measured round-trip time in seconds.
+    """
+    # endregion
+    def sample(self, rtt):
+        with self.lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2.0
+            else:
+                self.rttvar = (1 - RTT_BETA) * self.rttvar + \
+                              RTT_BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+            self.rto = self.__clamp(self.srtt +
+                                    max(RTT_GRANULARITY,
+                                        RTT_K * self.rttvar))
+
+    # region Method Description
+    """
+    Method: backoff
+        Description:
+            Doubles the timeout after an exchange timed out.
+    """
+    # endregion
+    def backoff(self):
+        with self.lock:
+            self.rto = self.__clamp(self.rto * 2)
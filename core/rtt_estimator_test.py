@@ -0,0 +1,89 @@
+"""
+    STARBURST Round-Trip Time Estimator Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import unittest
+import rtt_estimator as rtt
+
+# Bounds of the timeouts of the estimators tested.
+INITIAL = 1.0
+MINIMUM = 0.05
+MAXIMUM = 4.0
+
+
+"""
+TestRTTEstimator Test Group Description:
+    This group of tests makes sure that rtt_estimator.py updates the
+    smoothed round-trip time and its variance as RFC 6298 does, derives
+    the timeout from them within its bounds, and doubles the timeout
+    after a timed out exchange.
+
+    Test Count: 4
+"""
+class TestRTTEstimator(unittest.TestCase):
+    def setUp(self):
+        self.estimator = rtt.RTTEstimator(INITIAL, MINIMUM, MAXIMUM)
+
+    """
+    Test - test_samplesUpdateSmoothedRTT:
+        Given a first and a second sample,
+        Then the first sets srtt and half of it as rttvar, and the second
+        is folded in with gains RTT_ALPHA and RTT_BETA.
+    """
+    def test_samplesUpdateSmoothedRTT(self):
+        self.assertEqual(self.estimator.timeout(), INITIAL)
+        self.estimator.sample(0.2)
+        self.assertAlmostEqual(self.estimator.srtt, 0.2)
+        self.assertAlmostEqual(self.estimator.rttvar, 0.1)
+        self.assertAlmostEqual(self.estimator.timeout(), 0.2 + rtt.RTT_K * 0.1)
+
+        self.estimator.sample(0.6)
+        rttvar = (1 - rtt.RTT_BETA) * 0.1 + rtt.RTT_BETA * 0.4
+        srtt = (1 - rtt.RTT_ALPHA) * 0.2 + rtt.RTT_ALPHA * 0.6
+        self.assertAlmostEqual(self.estimator.rttvar, rttvar)
+        self.assertAlmostEqual(self.estimator.srtt, srtt)
+        self.assertAlmostEqual(self.estimator.timeout(),
+                               srtt + rtt.RTT_K * rttvar)
+
+    """
+    Test - test_timeoutKeepsGranularityMargin:
+        Given samples that no longer vary,
+        Then the timeout stays at least RTT_GRANULARITY above srtt.
+    """
+    def test_timeoutKeepsGranularityMargin(self):
+        for i in range(200):
+            self.estimator.sample(0.1)
+        self.assertAlmostEqual(self.estimator.timeout(),
+                               0.1 + rtt.RTT_GRANULARITY)
+
+    """
+    Test - test_timeoutIsClamped:
+        Given an initial timeout and samples outside the bounds,
+        Then the timeout is clamped to MINIMUM and MAXIMUM.
+    """
+    def test_timeoutIsClamped(self):
+        self.assertEqual(rtt.RTTEstimator(10.0, MINIMUM, MAXIMUM).timeout(),
+                         MAXIMUM)
+        self.estimator.sample(0.001)
+        self.assertEqual(self.estimator.timeout(), MINIMUM)
+        self.estimator.sample(100.0)
+        self.assertEqual(self.estimator.timeout(), MAXIMUM)
+
+    """
+    Test - test_backoffDoublesToMaximum:
+        Given exchanges that time out,
+        Then each doubles the timeout up to MAXIMUM, and the next sample
+        derives the timeout from the estimate again.
+    """
+    def test_backoffDoublesToMaximum(self):
+        self.estimator.sample(0.2)
+        timeout = self.estimator.timeout()
+        self.estimator.backoff()
+        self.assertAlmostEqual(self.estimator.timeout(), timeout * 2)
+        for i in range(10):
+            self.estimator.backoff()
+        self.assertEqual(self.estimator.timeout(), MAXIMUM)
+        self.estimator.sample(0.2)
+        self.assertTrue(self.estimator.timeout() < timeout)
@@ -15,7 +15,7 @@ import bb_worker
 import cryostat_worker
 from daemon import runner
 
-def instantiate(pid_file, log_file):
+def instantiate(pid_file, log_file, archive_dir=None):
     # Instantiate workers.
     pdu = pdu_worker.PDUWorker()
     brick = brick_worker.BrickWorker()
@@ -25,8 +25,10 @@ def instantiate(pid_file, log_file):
     # Instantiate server.
     server = feanta_server.ServerDaemon(pid_file)
 
-    # Setup log file.
+    # Setup log file and archive.
     server.set_log_file(log_file)
+    if archive_dir is not None:
+        server.set_archive_dir(archive_dir)
 
     # Link workers.
     server.link_worker(pdu)
@@ -36,8 +38,9 @@ def instantiate(pid_file, log_file):
 
     return server, None
 
-def start(server):
+def start(pid_file, log_file, archive_dir=None):
     # Start server.
+    server, unused = instantiate(pid_file, log_file, archive_dir)
     server_runner = runner.DaemonRunner(server)
     server_runner.do_action()
 
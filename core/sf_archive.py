@@ -0,0 +1,787 @@
+"""
+    STARBURST ACC/FEANTA Stateframe Archive
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import bisect
+import os
+import Queue
+import sf_codec
+import struct
+import threading
+import time
+
+# Imported on first query by __load_numpy, so that the daemon does not load
+# numpy only to write frames.
+np = None
+
+# Segment file layout. A segment starts with a SEGMENT_HEADER of
+# SEGMENT_MAGIC, the format version, the frame size and the capacity in
+# frames, padded to HEADER_SIZE. It is preallocated to hold its capacity
+# of fixed-size records: the time the frame was started as a double, its
+# sequence number and the frame itself. Records that have not been written
+# yet read as zeros, which is how the end of a segment is found when it is
+# reopened. The space is allocated on disk when the segment is created,
+# with posix_fallocate where os has it and otherwise by writing zeros
+# SEGMENT_FILL_CHUNK bytes at a time, so that a full disk is found then
+# rather than part way through the segment, and the archive's size is the
+# space it takes.
+SEGMENT_MAGIC = 'FSFA'
+SEGMENT_VERSION = 1
+SEGMENT_HEADER = struct.Struct('<4sHII')
+HEADER_SIZE = 64
+RECORD_PREFIX = struct.Struct('<dI')
+SEGMENT_PREFIX = 'fem_'
+SEGMENT_SUFFIX = '.seg'
+SEGMENT_FILL_CHUNK = 1024 ** 2
+
+# Packed segment file layout. Once a segment is full it is rewritten as a
+# packed segment of blocks encoded by sf_codec: a PACKED_HEADER of
+# PACKED_MAGIC, the format version and the frame size, padded to
+# HEADER_SIZE, then for each block a BLOCK_ENTRY of the times of its first
+# and last frames, its number of frames and its encoded length, followed by
+# the encoded block.
+PACKED_MAGIC = 'FSFZ'
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<4sHI')
+PACKED_SUFFIX = '.sfz'
+BLOCK_ENTRY = struct.Struct('<ddII')
+
+# Frames per segment, about an hour at the frame interval.
+SEGMENT_FRAMES = 12000
+
+# One timestamp in every INDEX_STRIDE records is kept in memory, so that a
+# time is found by bisecting the sparse index and then searching at most
+# INDEX_STRIDE records of the segment.
+INDEX_STRIDE = 64
+
+# Writing. Frames are queued by the uplink and written on the archive's own
+# thread through a buffer of ARCHIVE_BUFFER bytes, flushed at least every
+# ARCHIVE_FLUSH_INTERVAL seconds. Frames arriving while ARCHIVE_QUEUE
+# frames are waiting are dropped rather than delaying the uplink.
+ARCHIVE_BUFFER = 65536
+ARCHIVE_FLUSH_INTERVAL = 1.0
+ARCHIVE_QUEUE = 1000
+
+# Expiry. Whole segments are deleted once their newest frame is older than
+# ARCHIVE_RETENTION seconds, or, oldest first, while the archive holds more
+# than ARCHIVE_MAX_BYTES.
+ARCHIVE_RETENTION = 90 * 24 * 3600
+ARCHIVE_MAX_BYTES = 2 * 1024 ** 3
+
+
+def __load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+# region Method Description
+"""
+Method: record_dtype
+    Description:
+        Builds the NumPy structured type of a segment's records.
+    Arguments:
+        frame_size: size in bytes of the frames in the segment.
+    Returns:
+        dtype: type with fields 'time', 'sequence' and 'frame', the last
+            an array of frame_size bytes.
+"""
+# endregion
+def record_dtype(frame_size):
+    __load_numpy()
+    return np.dtype([('time', '<f8'),
+                     ('sequence', '<u4'),
+                     ('frame', 'u1', (frame_size,))])
+
+
+# region Class Description
+"""
+Class: Segment
+    Description:
+        A single segment file holding frames of one size in the order they
+        were started. The number of frames written and the sparse time
+        index are kept in memory and only advanced once frames have been
+        flushed, so that queries never see a partly written record.
+    Arguments:
+        path: path of the segment file.
+        frame_size: size of the frames held.
+        capacity: number of frames the segment is preallocated for.
+"""
+# endregion
+class Segment(object):
+    def __init__(self, path, frame_size, capacity):
+        self.path = path
+        self.frame_size = frame_size
+        self.capacity = capacity
+        self.record_size = RECORD_PREFIX.size + frame_size
+        self.count = 0
+        self.index = []
+        self.last_time = 0
+        self.records = None
+
+    # region Method Description
+    """
+    Method: create
+        Description:
+            Creates a segment file and allocates its full size on disk.
+        Arguments:
+            path: path of the segment file.
+            frame_size: size of the frames to be held.
+            capacity: number of frames to preallocate for.
+        Returns:
+            segment: the new, empty Segment.
+    """
+    # endregion
+    @staticmethod
+    def create(path, frame_size, capacity):
+        segment = Segment(path, frame_size, capacity)
+        with open(path, 'wb') as segment_file:
+            header = SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION,
+                                         frame_size, capacity)
+            segment_file.write(header.ljust(HEADER_SIZE, '\x00'))
+            Segment.__allocate(segment_file, segment.size())
+        return segment
+
+    @staticmethod
+    def __allocate(segment_file, size):
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(segment_file.fileno(), 0, size)
+                return
+            except OSError:
+                # Not supported by the filesystem, fill it instead.
+                pass
+        segment_file.seek(0, os.SEEK_END)
+        remaining = size - segment_file.tell()
+        zeros = '\x00' * min(SEGMENT_FILL_CHUNK, remaining)
+        while remaining > 0:
+            segment_file.write(zeros[:remaining])
+            remaining -= len(zeros)
+
+    # region Method Description
+    """
+    Method: open
+        Description:
+            Opens an existing segment file, finding the frames written by
+            bisecting for the first empty record and rebuilding the sparse
+            index.
+        Arguments:
+            path: path of the segment file.
+        Returns:
+            segment: the Segment.
+    """
+    # endregion
+    @staticmethod
+    def open(path):
+        with open(path, 'rb') as segment_file:
+            magic, version, frame_size, capacity = SEGMENT_HEADER.unpack(
+                segment_file.read(SEGMENT_HEADER.size))
+            if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+                raise ValueError(path + ' is not a stateframe segment.')
+            segment = Segment(path, frame_size, capacity)
+
+            def read_time(position):
+                segment_file.seek(HEADER_SIZE +
+                                  position * segment.record_size)
+                data = segment_file.read(8)
+                if len(data) < 8:
+                    return 0
+                return struct.unpack('<d', data)[0]
+
+            low = 0
+            high = capacity
+            while low < high:
+                middle = (low + high) // 2
+                if read_time(middle) > 0:
+                    low = middle + 1
+                else:
+                    high = middle
+            segment.count = low
+            segment.index = [read_time(position) for position in
+                             range(0, low, INDEX_STRIDE)]
+            if low > 0:
+                segment.last_time = read_time(low - 1)
+        return segment
+
+    # region Method Description
+    """
+    Method: size
+        Description:
+            Returns the size of the segment file in bytes.
+    """
+    # endregion
+    def size(self):
+        return HEADER_SIZE + self.capacity * self.record_size
+
+    # region Method Description
+    """
+    Method: first_time
+        Description:
+            Returns the time of the first frame, or None if the segment is
+            empty.
+    """
+    # endregion
+    def first_time(self):
+        if self.index:
+            return self.index[0]
+        return None
+
+    # region Method Description
+    """
+    Method: published
+        Description:
+            Makes frames that have been flushed to the file visible to
+            queries.
+        Arguments:
+            times: start times of the frames, in the order written.
+    """
+    # endregion
+    def published(self, times):
+        for frame_time in times:
+            if self.count % INDEX_STRIDE == 0:
+                self.index.append(frame_time)
+            self.count += 1
+        if times:
+            self.last_time = times[-1]
+
+    # region Method Description
+    """
+    Method: find
+        Description:
+            Finds the position of the first frame started at or after a
+            time, bisecting the sparse index and then the records between
+            two of its entries.
+        Arguments:
+            records: memory-mapped records of the segment.
+            count: number of frames written.
+            index: sparse index of the segment.
+            frame_time: time to be found.
+        Returns:
+            position: index of the frame, count if there is none.
+    """
+    # endregion
+    @staticmethod
+    def find(records, count, index, frame_time):
+        block = bisect.bisect_left(index, frame_time)
+        if block == 0:
+            return 0
+        low = (block - 1) * INDEX_STRIDE
+        high = min(count, block * INDEX_STRIDE)
+        return low + int(np.searchsorted(records['time'][low:high],
+                                         frame_time))
+
+    # region Method Description
+    """
+    Method: query
+        Description:
+            Returns the frames started in a time range as a view of the
+            memory-mapped segment. The view stays valid after the segment
+            is expired, until it is released.
+        Arguments:
+            start: earliest start time included.
+            end: latest start time excluded.
+            count: number of frames written, as read with index under the
+                archive's lock.
+            index: sparse index of the segment.
+        Returns:
+            records: structured array of the frames, see record_dtype.
+    """
+    # endregion
+    def query(self, start, end, count, index):
+        if self.records is None:
+            dtype = record_dtype(self.frame_size)
+            self.records = np.memmap(self.path, dtype, 'r', HEADER_SIZE,
+                                     (self.capacity,))
+        first = self.find(self.records, count, index, start)
+        last = self.find(self.records, count, index, end)
+        return self.records[first:last]
+
+
+# region Class Description
+"""
+Class: PackedSegment
+    Description:
+        A full segment rewritten as blocks encoded by sf_codec. Each block
+        starts with a keyframe, so a query only decodes the blocks holding
+        frames in its range. The time of the first frame of every block is
+        kept in memory as the sparse index, along with the position of
+        each block in the file.
+    Arguments:
+        path: path of the packed segment file.
+        frame_size: size of the frames held.
+"""
+# endregion
+class PackedSegment(object):
+    def __init__(self, path, frame_size):
+        self.path = path
+        self.frame_size = frame_size
+        self.blocks = []
+        self.count = 0
+        self.index = []
+        self.last_time = 0
+        self.file_size = HEADER_SIZE
+
+    # region Method Description
+    """
+    Method: write
+        Description:
+            Packs frames into a new packed segment file. The file is
+            written under a temporary name and renamed once complete.
+        Arguments:
+            path: path of the packed segment file.
+            records: structured array of the frames, see record_dtype.
+        Returns:
+            segment: the PackedSegment.
+    """
+    # endregion
+    @staticmethod
+    def write(path, records):
+        frame_size = records.dtype['frame'].shape[0]
+        segment = PackedSegment(path, frame_size)
+        with open(path + '.tmp', 'wb') as packed_file:
+            header = PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION,
+                                        frame_size)
+            packed_file.write(header.ljust(HEADER_SIZE, '\x00'))
+            for first in range(0, len(records), sf_codec.CODEC_BLOCK_FRAMES):
+                block = records[first:first + sf_codec.CODEC_BLOCK_FRAMES]
+                data = sf_codec.encode_block(block)
+                entry = (float(block['time'][0]), float(block['time'][-1]),
+                         len(block), len(data))
+                packed_file.write(BLOCK_ENTRY.pack(*entry) + data)
+                segment.add_block(entry, packed_file.tell() - len(data))
+            os.fsync(packed_file.fileno())
+        os.rename(path + '.tmp', path)
+        return segment
+
+    # region Method Description
+    """
+    Method: open
+        Description:
+            Opens an existing packed segment file, reading the entry of
+            every block.
+        Arguments:
+            path: path of the packed segment file.
+        Returns:
+            segment: the PackedSegment.
+    """
+    # endregion
+    @staticmethod
+    def open(path):
+        with open(path, 'rb') as packed_file:
+            magic, version, frame_size = PACKED_HEADER.unpack(
+                packed_file.read(PACKED_HEADER.size))
+            if magic != PACKED_MAGIC or version != PACKED_VERSION:
+                raise ValueError(path + ' is not a packed segment.')
+            segment = PackedSegment(path, frame_size)
+            packed_file.seek(HEADER_SIZE)
+            while True:
+                entry = packed_file.read(BLOCK_ENTRY.size)
+                if len(entry) < BLOCK_ENTRY.size:
+                    break
+                entry = BLOCK_ENTRY.unpack(entry)
+                segment.add_block(entry, packed_file.tell())
+                packed_file.seek(entry[3], os.SEEK_CUR)
+        return segment
+
+    # region Method Description
+    """
+    Method: add_block
+        Description:
+            Records a block of the segment.
+        Arguments:
+            entry: the block's BLOCK_ENTRY fields.
+            offset: position of the encoded block in the file.
+    """
+    # endregion
+    def add_block(self, entry, offset):
+        first_time, last_time, count, length = entry
+        self.blocks.append((offset, length))
+        self.index.append(first_time)
+        self.count += count
+        self.last_time = last_time
+        self.file_size = offset + length
+
+    # region Method Description
+    """
+    Method: size
+        Description:
+            Returns the size of the packed segment file in bytes.
+    """
+    # endregion
+    def size(self):
+        return self.file_size
+
+    # region Method Description
+    """
+    Method: first_time
+        Description:
+            Returns the time of the first frame, or None if the segment is
+            empty.
+    """
+    # endregion
+    def first_time(self):
+        if self.index:
+            return self.index[0]
+        return None
+
+    # region Method Description
+    """
+    Method: query
+        Description:
+            Decodes the blocks holding frames started in a time range and
+            returns those frames.
+        Arguments:
+            start: earliest start time included.
+            end: latest start time excluded.
+            count: unused, the segment no longer changes.
+            index: sparse index of the segment.
+        Returns:
+            records: structured array of the frames, see record_dtype.
+    """
+    # endregion
+    def query(self, start, end, count, index):
+        dtype = record_dtype(self.frame_size)
+        first = max(0, bisect.bisect_right(index, start) - 1)
+        last = bisect.bisect_left(index, end)
+        decoded = []
+        with open(self.path, 'rb') as packed_file:
+            for offset, length in self.blocks[first:last]:
+                packed_file.seek(offset)
+                decoded.append(sf_codec.decode_block(
+                    packed_file.read(length), dtype))
+        if not decoded:
+            return np.empty(0, dtype)
+        records = np.concatenate(decoded)
+        return records[np.searchsorted(records['time'], start):
+                       np.searchsorted(records['time'], end)]
+
+
+# region Class Description
+"""
+Class: StateframeArchive
+    Description:
+        Append-only archive of the binary stateframes sent to the ACC,
+        kept in a directory of segment files. append only queues a frame,
+        so archiving costs the uplink no I/O; frames are written on the
+        archive's own thread. A new segment is started when the current
+        one is full or the frame size changes, at which point expired
+        segments are deleted and the segments no longer written are packed
+        into blocks of XOR deltas, so that months of frames fit in the
+        space of days. Frames can be queried by time range while the
+        archive is being written.
+    Arguments:
+        directory: directory the segments are kept in. Created if needed.
+        retention: seconds frames are kept for.
+        max_bytes: largest total size of the segments.
+"""
+# endregion
+class StateframeArchive(object):
+    def __init__(self, directory, retention=ARCHIVE_RETENTION,
+                 max_bytes=ARCHIVE_MAX_BYTES):
+        self.directory = directory
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self.segments = []
+        self.current = None
+        self.current_file = None
+        self.queue = Queue.Queue(ARCHIVE_QUEUE)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+
+    # region Method Description
+    """
+    Method: load
+        Description:
+            Opens the segments already in the directory without starting
+            the writer thread, so that an archive written by another
+            process can be queried. Called by start.
+    """
+    # endregion
+    def load(self):
+        names = sorted(os.listdir(self.directory))
+        segments = []
+        for name in names:
+            if not name.startswith(SEGMENT_PREFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            packed = name[:-len(SEGMENT_SUFFIX)] + PACKED_SUFFIX
+            try:
+                if name.endswith(PACKED_SUFFIX):
+                    segments.append(PackedSegment.open(path))
+                elif name.endswith(SEGMENT_SUFFIX) and packed not in names:
+                    segments.append(Segment.open(path))
+            except (ValueError, struct.error, IOError):
+                pass
+        with self.lock:
+            self.segments = [segment for segment in segments
+                             if segment.count]
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Opens the segments already in the directory and starts the
+            writer thread. Frames are appended to the newest segment if it
+            is not packed and has room. Segments left unpacked by an
+            earlier run are packed by the writer thread.
+    """
+    # endregion
+    def start(self):
+        if self.thread is not None:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        names = os.listdir(self.directory)
+        for name in names:
+            if not name.startswith(SEGMENT_PREFIX):
+                continue
+            packed = name[:-len(SEGMENT_SUFFIX)] + PACKED_SUFFIX
+            if name.endswith(PACKED_SUFFIX + '.tmp') or \
+                    (name.endswith(SEGMENT_SUFFIX) and packed in names):
+                # Left by a run stopped while packing.
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        self.load()
+        if self.segments and isinstance(self.segments[-1], Segment) and \
+                self.segments[-1].count < self.segments[-1].capacity:
+            self.__resume(self.segments[-1])
+        self.thread = threading.Thread(target=self.__write)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # region Method Description
+    """
+    Method: append
+        Description:
+            Queues a frame to be archived. Never blocks; the frame is
+            dropped and counted if the writer has fallen behind or has not
+            been started.
+        Arguments:
+            frame_time: time the frame was started.
+            sequence: sequence number of the frame.
+            frame: the packed frame.
+    """
+    # endregion
+    def append(self, frame_time, sequence, frame):
+        if self.thread is None:
+            return
+        try:
+            self.queue.put_nowait((frame_time, sequence, frame))
+        except Queue.Full:
+            self.dropped += 1
+
+    # region Method Description
+    """
+    Method: stop
+        Description:
+            Writes the frames already queued, closes the current segment
+            and stops the writer thread.
+    """
+    # endregion
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    # region Method Description
+    """
+    Method: query
+        Description:
+            Returns the frames started in a time range. Segments are found
+            by bisecting their start times and frames within them through
+            their sparse indices, so a query costs O(log n) in the frames
+            archived plus the frames returned, and for packed segments
+            the decoding of at most one block either side of the range.
+        Arguments:
+            start: earliest start time included.
+            end: latest start time excluded.
+        Returns:
+            views: list of structured arrays, see record_dtype, one per
+                segment holding frames in the range and in time order.
+                Frames from unpacked segments are views of the
+                memory-mapped segment file, those from packed segments
+                are decoded copies.
+    """
+    # endregion
+    def query(self, start, end):
+        with self.lock:
+            segments = [(segment, segment.count, list(segment.index))
+                        for segment in self.segments if segment.count]
+        starts = [index[0] for segment, count, index in segments]
+        first = max(0, bisect.bisect_right(starts, start) - 1)
+        last = bisect.bisect_left(starts, end)
+        views = []
+        for segment, count, index in segments[first:last]:
+            if segment.last_time < start:
+                continue
+            view = segment.query(start, end, count, index)
+            if len(view):
+                views.append(view)
+        return views
+
+    # region Method Description
+    """
+    Method: status
+        Description:
+            Reports the extent of the archive.
+        Returns:
+            status: dictionary of the number of segments, frames and bytes
+                archived, the first and last frame times, and the frames
+                written and dropped since the archive was started. The
+                bytes are the space allocated to the segments, whether or
+                not it has been filled with frames.
+    """
+    # endregion
+    def status(self):
+        with self.lock:
+            segments = list(self.segments)
+        return {'segments': len(segments),
+                'frames': sum(segment.count for segment in segments),
+                'bytes': sum(segment.size() for segment in segments),
+                'first_time': segments[0].first_time() if segments else None,
+                'last_time': segments[-1].last_time if segments else None,
+                'written': self.written,
+                'dropped': self.dropped}
+
+    # ---------------------------------------------------------------
+    # WRITER ROUTINES
+    # ---------------------------------------------------------------
+
+    def __resume(self, segment):
+        self.current = segment
+        self.current_file = open(segment.path, 'r+b', ARCHIVE_BUFFER)
+        self.current_file.seek(HEADER_SIZE + segment.count *
+                               segment.record_size)
+
+    def __close_current(self):
+        if self.current_file is not None:
+            try:
+                self.current_file.close()
+            except IOError:
+                pass
+            self.current_file = None
+            self.current = None
+
+    def __rotate(self, frame_time, frame_size):
+        self.__close_current()
+        path = os.path.join(self.directory, SEGMENT_PREFIX +
+                            '%014d' % int(frame_time * 1000) +
+                            SEGMENT_SUFFIX)
+        segment = Segment.create(path, frame_size, SEGMENT_FRAMES)
+        with self.lock:
+            self.segments.append(segment)
+        self.__resume(segment)
+        self.__expire(frame_time)
+        self.__pack_sealed()
+
+    def __pack_sealed(self):
+        with self.lock:
+            sealed = [segment for segment in self.segments
+                      if isinstance(segment, Segment) and segment.count and
+                      segment is not self.current]
+        for segment in sealed:
+            self.__pack(segment)
+
+    def __pack(self, segment):
+        path = segment.path[:-len(SEGMENT_SUFFIX)] + PACKED_SUFFIX
+        try:
+            dtype = record_dtype(segment.frame_size)
+            records = np.memmap(segment.path, dtype, 'r', HEADER_SIZE,
+                                (segment.count,))
+            packed = PackedSegment.write(path, records)
+            del records
+        except (IOError, OSError, ValueError):
+            # The segment is left unpacked and tried again at the next
+            # rotation.
+            return
+        with self.lock:
+            if segment in self.segments:
+                position = self.segments.index(segment)
+                self.segments[position] = packed
+                expired = False
+            else:
+                expired = True
+        try:
+            os.remove(path if expired else segment.path)
+        except OSError:
+            pass
+
+    def __expire(self, now):
+        with self.lock:
+            expired = []
+            total = sum(segment.size() for segment in self.segments)
+            for segment in self.segments[:-1]:
+                if segment.last_time < now - self.retention or \
+                        total > self.max_bytes:
+                    expired.append(segment)
+                    total -= segment.size()
+            self.segments = [segment for segment in self.segments
+                             if segment not in expired]
+        for segment in expired:
+            try:
+                os.remove(segment.path)
+            except OSError:
+                pass
+
+    def __flush(self, pending):
+        if self.current_file is None:
+            return
+        try:
+            self.current_file.flush()
+        except IOError:
+            # Frames that did not reach the file are lost; start a new
+            # segment rather than leave a gap in this one.
+            self.dropped += len(pending)
+            self.__close_current()
+            return
+        if pending:
+            with self.lock:
+                self.current.published(pending)
+            self.written += len(pending)
+
+    def __write(self):
+        self.__pack_sealed()
+        pending = []
+        last_flush = time.time()
+        while True:
+            try:
+                item = self.queue.get(True, ARCHIVE_FLUSH_INTERVAL)
+            except Queue.Empty:
+                item = False
+            if item is None:
+                self.__flush(pending)
+                self.__close_current()
+                return
+            if item:
+                frame_time, sequence, frame = item
+                if self.current is None or \
+                        self.current.frame_size != len(frame) or \
+                        self.current.count + len(pending) >= \
+                        self.current.capacity:
+                    self.__flush(pending)
+                    pending = []
+                    try:
+                        self.__rotate(frame_time, len(frame))
+                    except (IOError, OSError):
+                        self.dropped += 1
+                        continue
+                try:
+                    self.current_file.write(
+                        RECORD_PREFIX.pack(frame_time, sequence) + frame)
+                    pending.append(frame_time)
+                except IOError:
+                    self.dropped += 1 + len(pending)
+                    pending = []
+                    self.__close_current()
+            if time.time() - last_flush >= ARCHIVE_FLUSH_INTERVAL:
+                self.__flush(pending)
+                pending = []
+                last_flush = time.time()
@@ -0,0 +1,175 @@
+"""
+    STARBURST Stateframe Archive Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import sf_archive
+
+# Frames are FRAME_SIZE bytes, started FRAME_INTERVAL seconds apart from
+# START. Segments hold SEGMENT_FRAMES frames and index every INDEX_STRIDE.
+FRAME_SIZE = 16
+FRAME_INTERVAL = 0.3
+START = 1.7e9
+SEGMENT_FRAMES = 20
+INDEX_STRIDE = 4
+
+
+# Builds the frame of a sequence number, different for every frame.
+def make_frame(sequence):
+    return struct.pack('<4I', sequence, sequence * 3, 7, sequence ^ 0x5a5a)
+
+
+"""
+TestStateframeArchive Test Group Description:
+    This group of tests makes sure that sf_archive.py appends frames to
+    segments that can be queried by time, resumes the newest segment when
+    reopened, and expires segments by age and by total size.
+
+    Test Count: 5
+"""
+class TestStateframeArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.segment_frames = sf_archive.SEGMENT_FRAMES
+        self.index_stride = sf_archive.INDEX_STRIDE
+        sf_archive.SEGMENT_FRAMES = SEGMENT_FRAMES
+        sf_archive.INDEX_STRIDE = INDEX_STRIDE
+
+    def tearDown(self):
+        sf_archive.SEGMENT_FRAMES = self.segment_frames
+        sf_archive.INDEX_STRIDE = self.index_stride
+        shutil.rmtree(self.directory)
+
+    def __write(self, archive, sequences, start=START):
+        archive.start()
+        for sequence in sequences:
+            archive.append(start + sequence * FRAME_INTERVAL, sequence,
+                           make_frame(sequence))
+        archive.stop()
+
+    def __query(self, archive, start=0, end=float('inf')):
+        records = []
+        for view in archive.query(start, end):
+            for record in view:
+                records.append((float(record['time']),
+                                int(record['sequence']),
+                                record['frame'].tostring()))
+        return records
+
+    def __expected(self, sequences, start=START):
+        return [(start + sequence * FRAME_INTERVAL, sequence,
+                 make_frame(sequence)) for sequence in sequences]
+
+    """
+    Test - test_appendedFramesAreQueried:
+        Given frames appended over several segments,
+        Then a query of all time returns every frame in order, with its
+        time and sequence number, the full segments having been packed,
+        and a new segment is allocated on disk in full.
+    """
+    def test_appendedFramesAreQueried(self):
+        archive = sf_archive.StateframeArchive(self.directory)
+        self.__write(archive, range(50))
+        self.assertEqual(self.__query(archive), self.__expected(range(50)))
+        status = archive.status()
+        self.assertEqual(status['segments'], 3)
+        self.assertEqual(status['frames'], 50)
+        self.assertEqual(status['written'], 50)
+        self.assertEqual(status['dropped'], 0)
+        names = sorted(os.listdir(self.directory))
+        self.assertEqual([name[-4:] for name in names],
+                         ['.sfz', '.sfz', '.seg'])
+
+        segment = sf_archive.Segment.create(
+            os.path.join(self.directory, 'fem_large.seg'), FRAME_SIZE, 10000)
+        stat = os.stat(segment.path)
+        self.assertEqual(stat.st_size, segment.size())
+        self.assertTrue(stat.st_blocks * 512 >= segment.size())
+
+    """
+    Test - test_reopenedArchiveResumes:
+        Given an archive stopped with room left in its newest segment,
+        Then reopening it resumes that segment, and reading it with load
+        alone returns the frames of both runs.
+    """
+    def test_reopenedArchiveResumes(self):
+        self.__write(sf_archive.StateframeArchive(self.directory), range(7))
+        archive = sf_archive.StateframeArchive(self.directory)
+        self.__write(archive, range(7, 12))
+        self.assertEqual(archive.status()['segments'], 1)
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        reader = sf_archive.StateframeArchive(self.directory)
+        reader.load()
+        self.assertEqual(self.__query(reader), self.__expected(range(12)))
+
+    """
+    Test - test_rangesAreFoundThroughSparseIndex:
+        Given frames over raw and packed segments,
+        Then a range starting and ending between index entries, ranges
+        on entries and across segments, and ranges outside the archive
+        return exactly the frames started within them.
+    """
+    def test_rangesAreFoundThroughSparseIndex(self):
+        archive = sf_archive.StateframeArchive(self.directory)
+        self.__write(archive, range(50))
+        for first, last in [(5, 11), (4, 8), (0, 1), (18, 43), (41, 50),
+                            (19, 20)]:
+            start = START + first * FRAME_INTERVAL - FRAME_INTERVAL / 2
+            end = START + last * FRAME_INTERVAL - FRAME_INTERVAL / 2
+            self.assertEqual(self.__query(archive, start, end),
+                             self.__expected(range(first, last)))
+        time = START + 8 * FRAME_INTERVAL
+        self.assertEqual(self.__query(archive, time, time + FRAME_INTERVAL),
+                         self.__expected([8]))
+        self.assertEqual(self.__query(archive, 0, START), [])
+        self.assertEqual(self.__query(archive, START + 50 * FRAME_INTERVAL),
+                         [])
+
+    """
+    Test - test_oldSegmentsExpire:
+        Given segments whose newest frames are older than the retention
+        when a new segment is started,
+        Then they are deleted and only the recent frames are returned.
+    """
+    def test_oldSegmentsExpire(self):
+        archive = sf_archive.StateframeArchive(self.directory, retention=60)
+        archive.start()
+        for sequence in range(40):
+            archive.append(START + sequence * FRAME_INTERVAL, sequence,
+                           make_frame(sequence))
+        for sequence in range(40, 45):
+            archive.append(START + 1000 + sequence * FRAME_INTERVAL,
+                           sequence, make_frame(sequence))
+        archive.stop()
+        self.assertEqual(self.__query(archive),
+                         self.__expected(range(40, 45), START + 1000))
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+    """
+    Test - test_archiveIsCappedInBytes:
+        Given more frames than fit in the byte cap,
+        Then the oldest segments are deleted to keep the archive within
+        it, and the newest frames are kept.
+    """
+    def test_archiveIsCappedInBytes(self):
+        segment_size = sf_archive.Segment(
+            '', FRAME_SIZE, SEGMENT_FRAMES).size()
+        archive = sf_archive.StateframeArchive(self.directory,
+                                               max_bytes=2 * segment_size)
+        self.__write(archive, range(200))
+        status = archive.status()
+        self.assertTrue(status['bytes'] <= 2 * segment_size)
+        total = sum(os.path.getsize(os.path.join(self.directory, name))
+                    for name in os.listdir(self.directory))
+        self.assertEqual(total, status['bytes'])
+        records = self.__query(archive)
+        self.assertTrue(0 < len(records) < 200)
+        self.assertEqual(records,
+                         self.__expected(range(200 - len(records), 200)))
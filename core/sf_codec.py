@@ -0,0 +1,96 @@
+"""
+    STARBURST ACC/FEANTA Stateframe Codec
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import struct
+import zlib
+
+# Imported on first use by __load_numpy so that the daemon does not load
+# numpy until frames are first encoded.
+np = None
+
+# Number of frames in a block. Each block starts with a keyframe stored
+# whole, so that any block can be decoded without those before it.
+CODEC_BLOCK_FRAMES = 256
+
+# zlib compression level used for blocks.
+CODEC_LEVEL = 6
+
+# Layout of an encoded block before compression: BLOCK_HEADER holding the
+# number of frames and the frame size, then the start times, the sequence
+# numbers, the keyframe and the XOR of every following frame with the one
+# before it. Fields that do not change between frames XOR to zero, which
+# compresses to almost nothing.
+BLOCK_HEADER = struct.Struct('<II')
+
+
+def __load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+# region Method Description
+"""
+Method: encode_block
+    Description:
+        Encodes consecutive archived frames as a compressed block.
+    Arguments:
+        records: structured array with fields 'time', 'sequence' and
+            'frame', i.e. from sf_archive.record_dtype, holding at least
+            one frame.
+    Returns:
+        data: the compressed block.
+"""
+# endregion
+def encode_block(records):
+    __load_numpy()
+    frames = np.ascontiguousarray(records['frame'])
+    deltas = np.bitwise_xor(frames[1:], frames[:-1])
+    data = BLOCK_HEADER.pack(len(records), frames.shape[1]) + \
+        np.ascontiguousarray(records['time'], '<f8').tostring() + \
+        np.ascontiguousarray(records['sequence'], '<u4').tostring() + \
+        frames[0].tostring() + deltas.tostring()
+    return zlib.compress(data, CODEC_LEVEL)
+
+
+# region Method Description
+"""
+Method: decode_block
+    Description:
+        Decodes a block back into frames. The XOR deltas are undone for
+        every frame at once by accumulating them down each column. A block
+        that is corrupt or truncated, or whose frames are not of the size
+        of dtype, raises ValueError.
+    Arguments:
+        data: block returned by encode_block.
+        dtype: structured type the frames are returned as, i.e. from
+            sf_archive.record_dtype for the block's frame size.
+    Returns:
+        records: structured array of the frames.
+"""
+# endregion
+def decode_block(data, dtype):
+    __load_numpy()
+    try:
+        data = zlib.decompress(data)
+        count, frame_size = BLOCK_HEADER.unpack_from(data)
+    except (zlib.error, struct.error), e:
+        raise ValueError('Corrupt stateframe block: ' + str(e))
+    if frame_size != dtype['frame'].shape[0] or \
+            len(data) != BLOCK_HEADER.size + count * (12 + frame_size):
+        raise ValueError('Corrupt stateframe block of ' + str(count) +
+                         ' frames of ' + str(frame_size) + ' bytes.')
+    offset = BLOCK_HEADER.size
+    records = np.empty(count, dtype)
+    records['time'] = np.frombuffer(data, '<f8', count, offset)
+    offset += 8 * count
+    records['sequence'] = np.frombuffer(data, '<u4', count, offset)
+    offset += 4 * count
+    frames = np.frombuffer(data, np.uint8, count * frame_size, offset)
+    records['frame'] = np.bitwise_xor.accumulate(
+        frames.reshape(count, frame_size), axis=0)
+    return records
@@ -0,0 +1,167 @@
+"""
+    STARBURST Stateframe Codec Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+import numpy as np
+import sf_archive
+import sf_codec
+
+# Frames encoded by each test unless a test needs otherwise.
+FRAME_SIZE = 64
+FRAMES = 100
+START = 1.7e9
+FRAME_INTERVAL = 0.3
+
+
+# Builds records of frames that, like stateframes, mostly repeat the frame
+# before with a few fields changing.
+def make_records(count, frame_size, seed=0):
+    random = np.random.RandomState(seed)
+    records = np.zeros(count, sf_archive.record_dtype(frame_size))
+    records['time'] = START + np.arange(count) * FRAME_INTERVAL
+    records['sequence'] = np.arange(count) + 1000
+    records['frame'] = random.randint(0, 256, frame_size)
+    for i in range(1, count):
+        records['frame'][i] = records['frame'][i - 1]
+        changed = random.randint(0, frame_size, 3)
+        records['frame'][i][changed] = random.randint(0, 256, 3)
+    return records
+
+
+"""
+TestCodec Test Group Description:
+    This group of tests makes sure that sf_codec.py decodes every block it
+    encodes back into the same frames, rejects blocks that are corrupt,
+    and that a packed segment answers queries exactly as the raw segment
+    it was packed from.
+
+    Test Count: 5
+"""
+class TestCodec(unittest.TestCase):
+    def assertRecordsEqual(self, records, expected):
+        self.assertEqual(records.dtype, expected.dtype)
+        self.assertEqual(records['time'].tolist(), expected['time'].tolist())
+        self.assertEqual(records['sequence'].tolist(),
+                         expected['sequence'].tolist())
+        self.assertTrue(np.array_equal(records['frame'], expected['frame']))
+
+    """
+    Test - test_blocksRoundTrip:
+        Given blocks of many frames and of a single frame,
+        Then each decodes to the frames encoded, and the block of many
+        repeating frames is much smaller than the frames.
+    """
+    def test_blocksRoundTrip(self):
+        records = make_records(FRAMES, FRAME_SIZE)
+        data = sf_codec.encode_block(records)
+        self.assertRecordsEqual(sf_codec.decode_block(data, records.dtype),
+                                records)
+        self.assertTrue(len(data) * 4 < records.nbytes)
+
+        single = records[7:8]
+        self.assertRecordsEqual(
+            sf_codec.decode_block(sf_codec.encode_block(single),
+                                  records.dtype), single)
+
+    """
+    Test - test_framesOfAnySizeRoundTrip:
+        Given blocks of frames of one byte, an odd number of bytes and a
+        full stateframe,
+        Then each decodes to the frames encoded.
+    """
+    def test_framesOfAnySizeRoundTrip(self):
+        for frame_size in [1, 7, 4096]:
+            records = make_records(20, frame_size, frame_size)
+            self.assertRecordsEqual(
+                sf_codec.decode_block(sf_codec.encode_block(records),
+                                      records.dtype), records)
+
+    """
+    Test - test_corruptBlocksAreRejected:
+        Given a block that is truncated, has a byte changed, is decoded
+        as frames of another size or holds fewer frames than its header
+        claims,
+        Then decoding raises a ValueError.
+    """
+    def test_corruptBlocksAreRejected(self):
+        records = make_records(FRAMES, FRAME_SIZE)
+        data = sf_codec.encode_block(records)
+        self.assertRaises(ValueError, sf_codec.decode_block,
+                          data[:len(data) // 2], records.dtype)
+        self.assertRaises(ValueError, sf_codec.decode_block, '',
+                          records.dtype)
+        corrupt = data[:20] + chr(ord(data[20]) ^ 0xff) + data[21:]
+        self.assertRaises(ValueError, sf_codec.decode_block, corrupt,
+                          records.dtype)
+        self.assertRaises(ValueError, sf_codec.decode_block, data,
+                          sf_archive.record_dtype(FRAME_SIZE + 1))
+        plain = zlib.decompress(data)
+        short = zlib.compress(plain[:-FRAME_SIZE])
+        self.assertRaises(ValueError, sf_codec.decode_block, short,
+                          records.dtype)
+
+    """
+    Test - test_packedSegmentMatchesRawSegment:
+        Given a raw segment and the packed segment written from it over
+        several blocks,
+        Then queries over whole blocks, parts of blocks, single frames
+        and ranges outside the segment return the same records from
+        both, as does the packed segment once reopened.
+    """
+    def test_packedSegmentMatchesRawSegment(self):
+        directory = tempfile.mkdtemp()
+        block_frames = sf_codec.CODEC_BLOCK_FRAMES
+        sf_codec.CODEC_BLOCK_FRAMES = 16
+        try:
+            records = make_records(FRAMES, FRAME_SIZE)
+            raw = sf_archive.Segment.create(
+                os.path.join(directory, 'fem_0.seg'), FRAME_SIZE, FRAMES)
+            with open(raw.path, 'r+b') as raw_file:
+                raw_file.seek(sf_archive.HEADER_SIZE)
+                raw_file.write(records.tostring())
+            raw.published(records['time'].tolist())
+            packed = sf_archive.PackedSegment.write(
+                os.path.join(directory, 'fem_0.sfz'), records)
+            reopened = sf_archive.PackedSegment.open(packed.path)
+            self.assertEqual(reopened.count, FRAMES)
+            self.assertEqual(reopened.index, packed.index)
+
+            for first, last in [(0, FRAMES), (16, 32), (5, 40), (17, 18),
+                                (90, FRAMES), (-10, 3), (FRAMES, FRAMES + 5)]:
+                start = START + (first - 0.5) * FRAME_INTERVAL
+                end = START + (last - 0.5) * FRAME_INTERVAL
+                expected = raw.query(start, end, raw.count, raw.index)
+                self.assertEqual(len(expected),
+                                 min(last, FRAMES) - max(first, 0))
+                for segment in [packed, reopened]:
+                    self.assertRecordsEqual(
+                        segment.query(start, end, segment.count,
+                                      segment.index), np.array(expected))
+        finally:
+            sf_codec.CODEC_BLOCK_FRAMES = block_frames
+            shutil.rmtree(directory)
+
+    """
+    Test - test_packedSegmentIsSmaller:
+        Given repeating frames packed from a raw segment,
+        Then the packed segment takes a fraction of the raw segment's
+        size.
+    """
+    def test_packedSegmentIsSmaller(self):
+        directory = tempfile.mkdtemp()
+        try:
+            records = make_records(FRAMES * 10, FRAME_SIZE)
+            raw = sf_archive.Segment('', FRAME_SIZE, len(records))
+            packed = sf_archive.PackedSegment.write(
+                os.path.join(directory, 'fem_0.sfz'), records)
+            self.assertEqual(packed.size(), os.path.getsize(packed.path))
+            self.assertTrue(packed.size() * 4 < raw.size())
+        finally:
+            shutil.rmtree(directory)
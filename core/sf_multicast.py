@@ -0,0 +1,242 @@
+"""
+    STARBURST ACC/FEANTA Stateframe Fan-out
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import errno
+import resolver
+import socket
+import struct
+
+# Datagram layout. Each frame is sent in one datagram starting with a
+# DATAGRAM_HEADER of DATAGRAM_MAGIC, the format version, the frame's
+# sequence number, the time the frame was started and the length of the
+# frame, followed by the frame itself.
+DATAGRAM_MAGIC = 'FSFM'
+DATAGRAM_VERSION = 1
+DATAGRAM_HEADER = struct.Struct('<4sHIdI')
+
+# Largest frame that fits in a single UDP datagram with its header.
+DATAGRAM_CAPACITY = 65507 - DATAGRAM_HEADER.size
+
+# Time to live of multicast datagrams, 1 to stay on the local network.
+MULTICAST_TTL = 1
+
+
+# region Method Description
+"""
+Method: is_multicast
+    Description:
+        Checks whether an IPv4 address is a multicast group.
+    Arguments:
+        address: dotted IPv4 address.
+    Returns:
+        True if the address is in 224.0.0.0/4.
+"""
+# endregion
+def is_multicast(address):
+    return 224 <= int(address.split('.')[0]) <= 239
+
+
+# region Method Description
+"""
+Method: is_address
+    Description:
+        Checks whether a host is given as a dotted IPv4 address, which
+        needs no lookup.
+    Arguments:
+        host: hostname or address.
+    Returns:
+        True if the host is a dotted IPv4 address.
+"""
+# endregion
+def is_address(host):
+    if len(host.split('.')) != 4:
+        return False
+    try:
+        socket.inet_aton(host)
+    except socket.error:
+        return False
+    return True
+
+
+# region Class Description
+"""
+Class: StateframeSender
+    Description:
+        Sends every frame in a datagram to a multicast group or a single
+        host, so that any number of subscribers receive the frames packed
+        for the ACC at the cost of one send per frame. The socket does not
+        block; frames the kernel cannot take straight away are dropped and
+        counted rather than delaying the uplink. A group given as a
+        hostname is looked up by the shared resolver, so a slow or failed
+        lookup never blocks the uplink either; frames are dropped and
+        counted until it has been resolved.
+    Arguments:
+        group: multicast group or host address the frames are sent to.
+        port: port the frames are sent to.
+        ttl: time to live of multicast datagrams.
+"""
+# endregion
+class StateframeSender(object):
+    def __init__(self, group, port, ttl=MULTICAST_TTL):
+        self.group = group
+        self.port = port
+        self.ttl = ttl
+        self.destination = None
+        self.sender = None
+        self.sent = 0
+        self.dropped = 0
+
+    # region Method Description
+    """
+    Method: open
+        Description:
+            Opens the socket, and registers a group given as a hostname
+            with the shared resolver.
+    """
+    # endregion
+    def open(self):
+        if self.sender is not None:
+            return
+        if is_address(self.group):
+            self.destination = (self.group, self.port)
+        else:
+            resolver.RESOLVER.register(self.group)
+        sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Only used if the destination turns out to be a multicast group.
+        sender.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL,
+                          self.ttl)
+        sender.setblocking(0)
+        self.sender = sender
+
+    # region Method Description
+    """
+    Method: send
+        Description:
+            Sends a frame to the subscribers. Does nothing if the sender
+            is not open.
+        Arguments:
+            frame_time: time the frame was started.
+            sequence: sequence number of the frame.
+            frame: the packed frame.
+    """
+    # endregion
+    def send(self, frame_time, sequence, frame):
+        sender = self.sender
+        if sender is None:
+            return
+        if len(frame) > DATAGRAM_CAPACITY:
+            self.dropped += 1
+            return
+        destination = self.destination
+        header = DATAGRAM_HEADER.pack(DATAGRAM_MAGIC, DATAGRAM_VERSION,
+                                      sequence, frame_time, len(frame))
+        try:
+            if destination is None:
+                destination = (resolver.RESOLVER.resolve(self.group),
+                               self.port)
+            sender.sendto(header + frame, destination)
+            self.sent += 1
+        except socket.error:
+            self.dropped += 1
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Closes the socket.
+    """
+    # endregion
+    def close(self):
+        sender = self.sender
+        self.sender = None
+        if sender is not None:
+            sender.close()
+
+
+# region Class Description
+"""
+Class: StateframeReceiver
+    Description:
+        Receives the frames sent by a StateframeSender, joining the group
+        if it is a multicast group. Frames missed, i.e. lost on the
+        network or while the subscriber was busy, are counted from gaps in
+        the sequence numbers. A group given as a hostname is looked up by
+        the shared resolver, which raises socket.gaierror until the
+        hostname has been resolved rather than blocking.
+    Arguments:
+        group: multicast group or host address the frames are sent to.
+        port: port the frames are sent to.
+        interface: address of the local interface to receive on, '' for
+            any.
+"""
+# endregion
+class StateframeReceiver(object):
+    def __init__(self, group, port, interface=''):
+        if not is_address(group):
+            group = resolver.RESOLVER.resolve(group)
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if is_multicast(group):
+            self.receiver.bind(('', port))
+            membership = socket.inet_aton(group) + \
+                socket.inet_aton(interface or '0.0.0.0')
+            self.receiver.setsockopt(socket.IPPROTO_IP,
+                                     socket.IP_ADD_MEMBERSHIP, membership)
+        else:
+            self.receiver.bind((interface, port))
+        self.last_sequence = None
+        self.received = 0
+        self.missed = 0
+
+    # region Method Description
+    """
+    Method: receive
+        Description:
+            Waits for the next frame. Datagrams that are not frames are
+            skipped.
+        Arguments:
+            timeout: seconds to wait, None to wait indefinitely.
+        Returns:
+            frame_time: time the frame was started.
+            sequence: sequence number of the frame.
+            frame: the packed frame.
+            None is returned if no frame arrived in time.
+    """
+    # endregion
+    def receive(self, timeout=None):
+        self.receiver.settimeout(timeout)
+        while True:
+            try:
+                datagram = self.receiver.recv(65535)
+            except socket.timeout:
+                return None
+            except socket.error, e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if len(datagram) < DATAGRAM_HEADER.size:
+                continue
+            magic, version, sequence, frame_time, length = \
+                DATAGRAM_HEADER.unpack_from(datagram)
+            if magic != DATAGRAM_MAGIC or version != DATAGRAM_VERSION or \
+                    len(datagram) != DATAGRAM_HEADER.size + length:
+                continue
+            if self.last_sequence is not None and \
+                    sequence > self.last_sequence + 1:
+                self.missed += sequence - self.last_sequence - 1
+            self.last_sequence = sequence
+            self.received += 1
+            return frame_time, sequence, datagram[DATAGRAM_HEADER.size:]
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Closes the socket.
+    """
+    # endregion
+    def close(self):
+        self.receiver.close()
@@ -0,0 +1,154 @@
+"""
+    STARBURST Stateframe Fan-out Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import socket
+import time
+import unittest
+import resolver
+import sf_multicast
+
+# Multicast group the frames are sent to over the loopback interface.
+GROUP = '239.255.42.99'
+LOOPBACK = '127.0.0.1'
+
+# Hostname of the subscriber, resolved only when a test says so.
+HOSTNAME = 'fanout-subscriber'
+
+# Seconds a receiver waits for a frame that should arrive, and longest a
+# send may take without counting as blocking the uplink.
+RECEIVE_TIMEOUT = 1.0
+SEND_TIME_LIMIT = 0.1
+
+
+# Finds a UDP port free on the loopback interface.
+def free_port():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind((LOOPBACK, 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+"""
+TestStateframeSender Test Group Description:
+    This group of tests makes sure that sf_multicast.py delivers every
+    frame sent to a single host or a multicast group, counts the frames
+    missed by a subscriber, and that a sender whose subscriber is given
+    as a hostname drops frames without blocking until the hostname has
+    been resolved.
+
+    Test Count: 4
+"""
+class TestStateframeSender(unittest.TestCase):
+    def setUp(self):
+        self.resolver = resolver.RESOLVER
+        resolver.RESOLVER = resolver.Resolver()
+        self.port = free_port()
+        self.sender = None
+        self.receiver = None
+
+    def tearDown(self):
+        if self.sender is not None:
+            self.sender.close()
+        if self.receiver is not None:
+            self.receiver.close()
+        resolver.RESOLVER = self.resolver
+
+    """
+    Test - test_framesAreSentToHost:
+        Given frames sent to a single host on the loopback interface,
+        Then each is received with its time and sequence number.
+    """
+    def test_framesAreSentToHost(self):
+        self.receiver = sf_multicast.StateframeReceiver(LOOPBACK, self.port)
+        self.sender = sf_multicast.StateframeSender(LOOPBACK, self.port)
+        self.sender.open()
+        for sequence in range(3):
+            self.sender.send(1000.0 + sequence, sequence, 'frame' * sequence)
+        for sequence in range(3):
+            self.assertEqual(self.receiver.receive(RECEIVE_TIMEOUT),
+                             (1000.0 + sequence, sequence,
+                              'frame' * sequence))
+        self.assertEqual(self.sender.sent, 3)
+        self.assertEqual(self.sender.dropped, 0)
+        self.assertEqual(self.receiver.missed, 0)
+
+    """
+    Test - test_framesAreSentToGroup:
+        Given frames sent to a multicast group joined on the loopback
+        interface,
+        Then each is received by the subscriber. The test is skipped if
+        the group cannot be joined.
+    """
+    def test_framesAreSentToGroup(self):
+        try:
+            self.receiver = sf_multicast.StateframeReceiver(GROUP, self.port,
+                                                            LOOPBACK)
+        except socket.error, e:
+            self.skipTest('Multicast is not available: ' + str(e))
+        self.sender = sf_multicast.StateframeSender(GROUP, self.port)
+        self.sender.open()
+        self.sender.sender.setsockopt(socket.IPPROTO_IP,
+                                      socket.IP_MULTICAST_IF,
+                                      socket.inet_aton(LOOPBACK))
+        self.sender.send(1001.0, 1, 'frame')
+        self.sender.send(1002.0, 2, 'frame')
+        self.assertEqual(self.sender.sent, 2)
+        self.assertEqual(self.receiver.receive(RECEIVE_TIMEOUT),
+                         (1001.0, 1, 'frame'))
+        self.assertEqual(self.receiver.receive(RECEIVE_TIMEOUT),
+                         (1002.0, 2, 'frame'))
+
+    """
+    Test - test_missedFramesAreCounted:
+        Given frames whose sequence numbers skip, and frames too large
+        for a datagram,
+        Then the subscriber counts the sequence numbers it missed, and
+        the sender drops the large frames.
+    """
+    def test_missedFramesAreCounted(self):
+        self.receiver = sf_multicast.StateframeReceiver(LOOPBACK, self.port)
+        self.sender = sf_multicast.StateframeSender(LOOPBACK, self.port)
+        self.sender.open()
+        self.sender.send(1001.0, 1, 'frame')
+        self.sender.send(1002.0, 2,
+                         'x' * (sf_multicast.DATAGRAM_CAPACITY + 1))
+        self.sender.send(1005.0, 5, 'frame')
+        self.assertEqual(self.receiver.receive(RECEIVE_TIMEOUT)[1], 1)
+        self.assertEqual(self.receiver.receive(RECEIVE_TIMEOUT)[1], 5)
+        self.assertEqual(self.receiver.missed, 3)
+        self.assertEqual(self.sender.sent, 2)
+        self.assertEqual(self.sender.dropped, 1)
+
+    """
+    Test - test_unresolvedHostnameDropsFrames:
+        Given a subscriber given as a hostname that has not been
+        resolved yet,
+        Then frames are dropped and counted without the send blocking,
+        and are delivered once the hostname has been resolved.
+    """
+    def test_unresolvedHostnameDropsFrames(self):
+        # No lookup is started, so the hostname stays unresolved until
+        # the test resolves it.
+        resolver.RESOLVER.retry_times[HOSTNAME] = float('inf')
+        self.receiver = sf_multicast.StateframeReceiver(LOOPBACK, self.port)
+        self.sender = sf_multicast.StateframeSender(HOSTNAME, self.port)
+        self.sender.open()
+        self.assertTrue(HOSTNAME in resolver.RESOLVER.registered)
+        start = time.time()
+        self.sender.send(1001.0, 1, 'frame')
+        self.sender.send(1002.0, 2, 'frame')
+        self.assertTrue(time.time() - start < SEND_TIME_LIMIT)
+        self.assertEqual(self.sender.sent, 0)
+        self.assertEqual(self.sender.dropped, 2)
+        self.assertEqual(self.receiver.receive(0.05), None)
+
+        resolver.RESOLVER.addresses[HOSTNAME] = (LOOPBACK, time.time())
+        self.sender.send(1003.0, 3, 'frame')
+        self.assertEqual(self.receiver.receive(RECEIVE_TIMEOUT),
+                         (1003.0, 3, 'frame'))
+        self.assertEqual(self.sender.sent, 1)
+        self.assertEqual(self.sender.dropped, 2)
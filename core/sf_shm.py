@@ -0,0 +1,234 @@
+"""
+    STARBURST ACC/FEANTA Shared Memory Stateframe
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import mmap
+import os
+import struct
+
+# Shared region layout. The region starts with a SHM_HEADER of SHM_MAGIC,
+# the format version, the number of slots and the capacity of a slot in
+# bytes, followed at COUNTER_OFFSET by the number of frames published as
+# an unsigned long long, padded to HEADER_SIZE. Then come SHM_SLOTS slots,
+# each the slot's seqlock counter as an unsigned int followed by a
+# SLOT_HEADER of the length of the frame, the time the frame was started
+# and its sequence number, padded to SLOT_HEADER_SIZE, then SHM_CAPACITY
+# bytes for the frame. The counters are written by slice assignment, as
+# pack_into clears the bytes it packs into first and would briefly show
+# readers a counter of zero.
+SHM_MAGIC = 'FSHM'
+SHM_VERSION = 1
+SHM_HEADER = struct.Struct('<4sHHI')
+COUNTER = struct.Struct('<Q')
+COUNTER_OFFSET = 16
+HEADER_SIZE = 64
+SLOT_COUNTER = struct.Struct('<I')
+SLOT_HEADER = struct.Struct('<IdI')
+SLOT_HEADER_SIZE = 32
+
+# Frames are published alternately to SHM_SLOTS slots of SHM_CAPACITY
+# bytes. Frames larger than a slot are not published.
+SHM_SLOTS = 2
+SHM_CAPACITY = 4096
+
+# A reader gives up after SHM_READ_RETRIES attempts to copy a frame, so
+# that a writer that died while publishing cannot hold it forever.
+SHM_READ_RETRIES = 1000
+
+
+# region Class Description
+"""
+Class: StateframeWriter
+    Description:
+        Publishes the latest stateframe to a file in shared memory, i.e.
+        under /dev/shm, that any number of local readers map. Each frame
+        is written to the slot not holding the latest frame, between two
+        increments of the slot's counter, which is odd while the slot is
+        being written. The count of frames published is then incremented,
+        which makes the slot the latest. A reader therefore always has a
+        complete frame to read, and only has to read again if two frames
+        have been published while it was copying one. An existing region
+        of the same layout is reused so that readers mapping it carry on
+        across restarts of the daemon.
+    Arguments:
+        path: path of the shared file.
+        capacity: largest frame published, in bytes.
+"""
+# endregion
+class StateframeWriter(object):
+    def __init__(self, path, capacity=SHM_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.slot_size = SLOT_HEADER_SIZE + capacity
+        self.size = HEADER_SIZE + SHM_SLOTS * self.slot_size
+        self.region = None
+        self.published = 0
+        self.oversized = 0
+
+    # region Method Description
+    """
+    Method: open
+        Description:
+            Maps the shared file, creating it if it does not exist or does
+            not have this writer's layout. The counter of a slot left odd
+            in a reused region, by a writer that died while publishing to
+            it, is made even again so that the slot's parity is kept. The
+            slot is not the latest, so its torn frame is never read, and
+            it is the next to be written.
+    """
+    # endregion
+    def open(self):
+        if self.region is not None:
+            return
+        header = SHM_HEADER.pack(SHM_MAGIC, SHM_VERSION, SHM_SLOTS,
+                                 self.capacity)
+        try:
+            with open(self.path, 'rb') as shm_file:
+                reuse = shm_file.read(SHM_HEADER.size) == header and \
+                    os.fstat(shm_file.fileno()).st_size == self.size
+        except IOError:
+            reuse = False
+        if not reuse:
+            # Replace rather than resize the file, so that readers mapping
+            # an older layout are not left mapping past its end.
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'wb') as shm_file:
+                shm_file.write(header.ljust(HEADER_SIZE, '\x00'))
+                shm_file.truncate(self.size)
+            os.rename(temp_path, self.path)
+        with open(self.path, 'r+b') as shm_file:
+            region = mmap.mmap(shm_file.fileno(), self.size)
+        for slot in range(SHM_SLOTS):
+            start = HEADER_SIZE + slot * self.slot_size
+            seqlock = SLOT_COUNTER.unpack_from(region, start)[0]
+            if seqlock % 2:
+                region[start:start + SLOT_COUNTER.size] = \
+                    SLOT_COUNTER.pack((seqlock + 1) & 0xFFFFFFFF)
+        self.region = region
+
+    # region Method Description
+    """
+    Method: publish
+        Description:
+            Makes a frame the latest. Does nothing if the region is not
+            open.
+        Arguments:
+            frame_time: time the frame was started.
+            sequence: sequence number of the frame.
+            frame: the packed frame.
+    """
+    # endregion
+    def publish(self, frame_time, sequence, frame):
+        region = self.region
+        if region is None:
+            return
+        if len(frame) > self.capacity:
+            self.oversized += 1
+            return
+        count = COUNTER.unpack_from(region, COUNTER_OFFSET)[0]
+        slot = HEADER_SIZE + (count % SHM_SLOTS) * self.slot_size
+        seqlock = SLOT_COUNTER.unpack_from(region, slot)[0]
+        region[slot:slot + SLOT_COUNTER.size] = \
+            SLOT_COUNTER.pack((seqlock + 1) & 0xFFFFFFFF)
+        SLOT_HEADER.pack_into(region, slot + SLOT_COUNTER.size, len(frame),
+                              frame_time, sequence)
+        start = slot + SLOT_HEADER_SIZE
+        region[start:start + len(frame)] = frame
+        region[slot:slot + SLOT_COUNTER.size] = \
+            SLOT_COUNTER.pack((seqlock + 2) & 0xFFFFFFFF)
+        region[COUNTER_OFFSET:COUNTER_OFFSET + COUNTER.size] = \
+            COUNTER.pack(count + 1)
+        self.published += 1
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Unmaps the region. The shared file is left for readers.
+    """
+    # endregion
+    def close(self):
+        region = self.region
+        self.region = None
+        if region is not None:
+            region.close()
+
+
+# region Class Description
+"""
+Class: StateframeReader
+    Description:
+        Reads the latest stateframe published by a StateframeWriter. The
+        shared file is mapped once, after which reading a frame makes no
+        system calls and places no load on the daemon or the devices.
+    Arguments:
+        path: path of the shared file.
+"""
+# endregion
+class StateframeReader(object):
+    def __init__(self, path):
+        with open(path, 'rb') as shm_file:
+            magic, version, slots, capacity = SHM_HEADER.unpack(
+                shm_file.read(SHM_HEADER.size))
+            if magic != SHM_MAGIC or version != SHM_VERSION:
+                raise ValueError(path + ' is not a shared stateframe.')
+            self.slots = slots
+            self.slot_size = SLOT_HEADER_SIZE + capacity
+            self.region = mmap.mmap(shm_file.fileno(),
+                                    HEADER_SIZE + slots * self.slot_size,
+                                    access=mmap.ACCESS_READ)
+
+    # region Method Description
+    """
+    Method: count
+        Description:
+            Returns the number of frames published, which changes whenever
+            there is a new frame to read.
+    """
+    # endregion
+    def count(self):
+        return COUNTER.unpack_from(self.region, COUNTER_OFFSET)[0]
+
+    # region Method Description
+    """
+    Method: read
+        Description:
+            Copies the latest frame, reading again if the writer reused
+            its slot while it was being copied, or is still writing it.
+        Returns:
+            frame_time: time the frame was started.
+            sequence: sequence number of the frame.
+            frame: the packed frame.
+            None is returned if no frame has been published, or if no
+            whole frame could be copied in SHM_READ_RETRIES attempts.
+    """
+    # endregion
+    def read(self):
+        region = self.region
+        for attempt in range(SHM_READ_RETRIES):
+            count = COUNTER.unpack_from(region, COUNTER_OFFSET)[0]
+            if count == 0:
+                return None
+            slot = HEADER_SIZE + ((count - 1) % self.slots) * self.slot_size
+            seqlock = SLOT_COUNTER.unpack_from(region, slot)[0]
+            if seqlock % 2:
+                continue
+            length, frame_time, sequence = SLOT_HEADER.unpack_from(
+                region, slot + SLOT_COUNTER.size)
+            start = slot + SLOT_HEADER_SIZE
+            frame = region[start:start + length]
+            if SLOT_COUNTER.unpack_from(region, slot)[0] == seqlock:
+                return frame_time, sequence, frame
+        return None
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Unmaps the region.
+    """
+    # endregion
+    def close(self):
+        self.region.close()
@@ -0,0 +1,178 @@
+"""
+    STARBURST Shared Memory Stateframe Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+import sf_shm
+
+# Capacity of the regions written by each test.
+CAPACITY = 64
+
+
+# Builds the frame of a sequence number, different for every frame.
+def make_frame(sequence, length=CAPACITY):
+    return chr(sequence % 256) * length
+
+
+# Region that has the writer publish while the reader is copying its first
+# frame, as a writer on another process could.
+class InterruptedRegion(mmap.mmap):
+    def __getslice__(self, start, end):
+        frame = mmap.mmap.__getslice__(self, start, end)
+        interruption = self.interruption
+        self.interruption = None
+        if interruption is not None:
+            interruption()
+        return frame
+
+
+"""
+TestSharedStateframe Test Group Description:
+    This group of tests makes sure that sf_shm.py makes the latest frame
+    published available to readers, and that a reader never returns a
+    frame torn by the writer publishing while it was being copied.
+
+    Test Count: 6
+"""
+class TestSharedStateframe(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'fem_stateframe')
+        self.writer = sf_shm.StateframeWriter(self.path, CAPACITY)
+        self.writer.open()
+        self.reader = sf_shm.StateframeReader(self.path)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+        shutil.rmtree(self.directory)
+
+    def __publish(self, sequence, length=CAPACITY):
+        self.writer.publish(1000.0 + sequence, sequence,
+                            make_frame(sequence, length))
+
+    def __interrupt(self, sequences):
+        self.reader.region.close()
+        with open(self.path, 'rb') as shm_file:
+            self.reader.region = InterruptedRegion(
+                shm_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.reader.region.interruption = lambda: [
+            self.__publish(sequence) for sequence in sequences]
+
+    """
+    Test - test_latestFrameIsRead:
+        Given frames of several lengths published in turn, and a frame
+        larger than the capacity,
+        Then the reader reads nothing before the first and the latest
+        frame after each, and the oversized frame is not published.
+    """
+    def test_latestFrameIsRead(self):
+        self.assertEqual(self.reader.read(), None)
+        for sequence, length in enumerate([CAPACITY, 1, 17, CAPACITY]):
+            self.__publish(sequence, length)
+            self.assertEqual(self.reader.count(), sequence + 1)
+            self.assertEqual(self.reader.read(),
+                             (1000.0 + sequence, sequence,
+                              make_frame(sequence, length)))
+        self.writer.publish(2000.0, 9, make_frame(9, CAPACITY + 1))
+        self.assertEqual(self.writer.oversized, 1)
+        self.assertEqual(self.reader.read()[1], 3)
+
+    """
+    Test - test_slotReusedDuringCopyIsReadAgain:
+        Given the writer publishing two frames while the reader copies a
+        frame, so that the slot being copied is rewritten,
+        Then the torn copy is discarded and the newest frame is read.
+    """
+    def test_slotReusedDuringCopyIsReadAgain(self):
+        self.__publish(1)
+        self.__interrupt([2, 3])
+        self.assertEqual(self.reader.read(), (1003.0, 3, make_frame(3)))
+
+    """
+    Test - test_otherSlotWrittenDuringCopyIsKept:
+        Given the writer publishing one frame while the reader copies a
+        frame, which leaves the slot being copied untouched,
+        Then the copied frame is returned whole.
+    """
+    def test_otherSlotWrittenDuringCopyIsKept(self):
+        self.__publish(1)
+        self.__interrupt([2])
+        self.assertEqual(self.reader.read(), (1001.0, 1, make_frame(1)))
+        self.assertEqual(self.reader.read(), (1002.0, 2, make_frame(2)))
+
+    """
+    Test - test_slotBeingWrittenIsRejected:
+        Given the latest slot left odd, as by a writer that died while
+        publishing,
+        Then the reader gives up after SHM_READ_RETRIES attempts, and
+        reads the frame once the slot is even again.
+    """
+    def test_slotBeingWrittenIsRejected(self):
+        self.__publish(1)
+        region = self.writer.region
+        start = sf_shm.HEADER_SIZE
+        end = start + sf_shm.SLOT_COUNTER.size
+        seqlock = sf_shm.SLOT_COUNTER.unpack_from(region, start)[0]
+        region[start:end] = sf_shm.SLOT_COUNTER.pack(seqlock + 1)
+        self.assertEqual(self.reader.read(), None)
+        region[start:end] = sf_shm.SLOT_COUNTER.pack(seqlock + 2)
+        self.assertEqual(self.reader.read(), (1001.0, 1, make_frame(1)))
+
+    """
+    Test - test_regionIsReusedAcrossRestarts:
+        Given a writer closed and another opened on the same path,
+        Then the region is reused, so a reader mapping it carries on
+        reading the new writer's frames, while a writer of another
+        capacity replaces it.
+    """
+    def test_regionIsReusedAcrossRestarts(self):
+        self.__publish(1)
+        self.writer.close()
+        self.writer = sf_shm.StateframeWriter(self.path, CAPACITY)
+        self.writer.open()
+        self.assertEqual(self.reader.read(), (1001.0, 1, make_frame(1)))
+        self.__publish(2)
+        self.assertEqual(self.reader.count(), 2)
+        self.assertEqual(self.reader.read(), (1002.0, 2, make_frame(2)))
+
+        self.writer.close()
+        self.writer = sf_shm.StateframeWriter(self.path, CAPACITY * 2)
+        self.writer.open()
+        reader = sf_shm.StateframeReader(self.path)
+        self.assertEqual(reader.read(), None)
+        reader.close()
+
+    """
+    Test - test_slotLeftOddIsEvenedOnReopen:
+        Given a writer that died while publishing, leaving the slot it was
+        writing odd and its frame torn, and another writer opened on the
+        same path,
+        Then the reader reads the last frame published in full, and reads
+        each frame the new writer publishes to that slot afterwards.
+    """
+    def test_slotLeftOddIsEvenedOnReopen(self):
+        self.__publish(1)
+        region = self.writer.region
+        start = sf_shm.HEADER_SIZE + self.writer.slot_size
+        end = start + sf_shm.SLOT_COUNTER.size
+        seqlock = sf_shm.SLOT_COUNTER.unpack_from(region, start)[0]
+        region[start:end] = sf_shm.SLOT_COUNTER.pack(seqlock + 1)
+        frame_start = start + sf_shm.SLOT_HEADER_SIZE
+        region[frame_start:frame_start + 8] = make_frame(2, 8)
+        self.writer.close()
+
+        self.writer = sf_shm.StateframeWriter(self.path, CAPACITY)
+        self.writer.open()
+        self.assertEqual(self.reader.read(), (1001.0, 1, make_frame(1)))
+        self.__publish(3)
+        self.assertEqual(self.reader.read(), (1003.0, 3, make_frame(3)))
+        self.__publish(4)
+        self.__publish(5)
+        self.assertEqual(self.reader.read(), (1005.0, 5, make_frame(5)))
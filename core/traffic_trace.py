@@ -0,0 +1,242 @@
+"""
+    STARBURST ACC/FEANTA Device Traffic Trace
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import socket
+import struct
+import threading
+import time
+
+# Trace file layout. A trace starts with TRACE_MAGIC and TRACE_VERSION as an
+# unsigned short, followed by one record per exchange: a RECORD_HEADER of
+# the start time, the duration in seconds, the device, the outcome and the
+# lengths of the request and reply, then the request and reply bytes. The
+# reply of a failed exchange is the error message.
+TRACE_MAGIC = 'FTRC'
+TRACE_VERSION = 1
+RECORD_HEADER = struct.Struct('<dfBBII')
+
+# Devices traced, stored by their index in this list.
+DEVICES = ['pdu', 'bb', 'brick', 'cryo']
+
+# Outcomes of an exchange.
+OUTCOME_OK = 0
+OUTCOME_TIMEOUT = 1
+OUTCOME_ERROR = 2
+
+
+# region Class Description
+"""
+Class: ReplayError
+    Description:
+        Raised in place of a recorded failure, or when a replayed request
+        has no recorded reply. A subclass of socket.error so that workers
+        handle it as they would a failed exchange with the device.
+"""
+# endregion
+class ReplayError(socket.error):
+    pass
+
+
+# region Class Description
+"""
+Class: TraceRecord
+    Description:
+        A single exchange with a device.
+    Arguments:
+        start: time the exchange started.
+        duration: time in seconds the exchange took.
+        device: name of the device, one of DEVICES.
+        outcome: OUTCOME_OK, OUTCOME_TIMEOUT or OUTCOME_ERROR.
+        request: bytes sent to the device.
+        reply: bytes received, or the error message if the exchange
+            failed.
+"""
+# endregion
+class TraceRecord(object):
+    def __init__(self, start, duration, device, outcome, request, reply):
+        self.start = start
+        self.duration = duration
+        self.device = device
+        self.outcome = outcome
+        self.request = request
+        self.reply = reply
+
+
+# region Class Description
+"""
+Class: TraceRecorder
+    Description:
+        Tracer writing every exchange to a trace file. Each exchange is
+        performed as it would be without a tracer and written as soon as
+        it completes, so that a trace survives the daemon being killed.
+    Arguments:
+        path: file the trace is written to. Any existing file is replaced.
+"""
+# endregion
+class TraceRecorder(object):
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self.lock = threading.Lock()
+        self.trace_file = open(path, 'wb')
+        self.trace_file.write(TRACE_MAGIC + struct.pack('<H', TRACE_VERSION))
+        self.trace_file.flush()
+
+    # region Method Description
+    """
+    Method: exchange
+        Description:
+            Performs an exchange with a device and records it. Failures are
+            recorded and then raised again.
+        Arguments:
+            device: name of the device, one of DEVICES.
+            request: bytes sent to the device.
+            perform: method taking no arguments that carries out the
+                exchange and returns the reply.
+        Returns:
+            reply: the reply returned by perform.
+    """
+    # endregion
+    def exchange(self, device, request, perform):
+        start = time.time()
+        try:
+            reply = perform()
+        except socket.timeout, e:
+            self.__write(start, device, OUTCOME_TIMEOUT, request, str(e))
+            raise
+        except Exception, e:
+            self.__write(start, device, OUTCOME_ERROR, request, str(e))
+            raise
+        self.__write(start, device, OUTCOME_OK, request, reply or '')
+        return reply
+
+    def __write(self, start, device, outcome, request, reply):
+        header = RECORD_HEADER.pack(start, time.time() - start,
+                                    DEVICES.index(device), outcome,
+                                    len(request), len(reply))
+        with self.lock:
+            if self.trace_file is None:
+                return
+            self.trace_file.write(header + request + reply)
+            self.trace_file.flush()
+            self.records += 1
+
+    # region Method Description
+    """
+    Method: close
+        Description:
+            Closes the trace file. Exchanges completing afterwards are not
+            recorded.
+    """
+    # endregion
+    def close(self):
+        with self.lock:
+            if self.trace_file is not None:
+                self.trace_file.close()
+                self.trace_file = None
+
+
+# region Method Description
+"""
+Method: read_trace
+    Description:
+        Reads a trace file.
+    Arguments:
+        path: trace file written by TraceRecorder.
+    Returns:
+        records: list of TraceRecord in the order they completed. A record
+            cut short by the recorder being killed is dropped.
+"""
+# endregion
+def read_trace(path):
+    records = []
+    with open(path, 'rb') as trace_file:
+        header = trace_file.read(len(TRACE_MAGIC) + 2)
+        if header[:len(TRACE_MAGIC)] != TRACE_MAGIC:
+            raise ValueError(path + ' is not a device traffic trace.')
+        version = struct.unpack('<H', header[len(TRACE_MAGIC):])[0]
+        if version != TRACE_VERSION:
+            raise ValueError('Unsupported trace version ' + str(version) +
+                             '.')
+        while True:
+            header = trace_file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            start, duration, device, outcome, request_length, \
+                reply_length = RECORD_HEADER.unpack(header)
+            request = trace_file.read(request_length)
+            reply = trace_file.read(reply_length)
+            if len(reply) < reply_length:
+                break
+            records.append(TraceRecord(start, duration, DEVICES[device],
+                                       outcome, request, reply))
+    return records
+
+
+# region Class Description
+"""
+Class: TraceReplayer
+    Description:
+        Tracer answering exchanges from a trace instead of the devices.
+        Recorded replies are matched to requests by device and request
+        bytes and handed out in the order they were recorded, so that the
+        workers see the same replies, latencies and failures as they did
+        in the recorded session even though polls and commands may
+        interleave differently. Once every reply to a request has been
+        used they are used again from the first.
+    Arguments:
+        records: list of TraceRecord, i.e. from read_trace.
+        speed: factor by which recorded latencies are shortened, i.e. 1
+            for the recorded speed and 10 for ten times faster. 0 replies
+            straight away.
+"""
+# endregion
+class TraceReplayer(object):
+    def __init__(self, records, speed=1.0):
+        self.speed = speed
+        self.replies = {}
+        self.positions = {}
+        self.replayed = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        for record in records:
+            key = (record.device, record.request)
+            self.replies.setdefault(key, []).append(record)
+            self.positions[key] = 0
+
+    # region Method Description
+    """
+    Method: exchange
+        Description:
+            Answers an exchange with the next recorded reply to the same
+            request, after the recorded latency scaled by the speed. The
+            device is not contacted.
+        Arguments:
+            device: name of the device, one of DEVICES.
+            request: bytes that would be sent to the device.
+            perform: method that would carry out the exchange. Unused.
+        Returns:
+            reply: the recorded reply.
+    """
+    # endregion
+    def exchange(self, device, request, perform):
+        key = (device, request)
+        with self.lock:
+            replies = self.replies.get(key, None)
+            if replies is None:
+                self.misses += 1
+                raise ReplayError('No recorded reply from ' + device +
+                                  ' to ' + repr(request) + '.')
+            record = replies[self.positions[key]]
+            self.positions[key] = (self.positions[key] + 1) % len(replies)
+            self.replayed += 1
+        if self.speed > 0:
+            time.sleep(record.duration / self.speed)
+        if record.outcome == OUTCOME_TIMEOUT:
+            raise socket.timeout(record.reply)
+        if record.outcome == OUTCOME_ERROR:
+            raise ReplayError(record.reply)
+        return record.reply
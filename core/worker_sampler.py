@@ -0,0 +1,149 @@
+"""
+    STARBURST ACC/FEANTA Worker Sampler
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import metrics
+import threading
+import time
+import traceback
+
+# A sample is considered stale once it is older than this many poll
+# intervals, and never before SAMPLE_MIN_STALE_TIME seconds.
+SAMPLE_STALE_FACTOR = 3
+SAMPLE_MIN_STALE_TIME = 1.0
+
+
+# region Class Description
+"""
+Class: WorkerSampler
+    Description:
+        Polls a single worker's stateframe_query on its own thread, at the
+        interval returned by the worker's get_poll_interval, through the
+        worker's circuit breaker. The wait between polls can be cut short
+        with trigger. The latest successful sample is kept in a last-value
+        cache together with the time it was acquired, so the stateframe
+        can be assembled without waiting on any device. The duration and
+        outcome of every poll are recorded in the worker's metrics.
+    Arguments:
+        worker: the IWorker to be sampled.
+        breaker: the CircuitBreaker guarding the worker.
+        worker_metrics: the WorkerMetrics of the worker.
+"""
+# endregion
+class WorkerSampler(object):
+    def __init__(self, worker, breaker, worker_metrics):
+        self.worker = worker
+        self.breaker = breaker
+        self.metrics = worker_metrics
+        self.data = None
+        self.sample_time = None
+        self.thread = None
+        self.wake = threading.Event()
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Starts the sampling thread if it is not already running.
+    """
+    # endregion
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.__run)
+            self.thread.daemon = True
+            self.thread.start()
+
+    # region Method Description
+    """
+    Method: trigger
+        Description:
+            Ends the current wait so that the worker is polled straight
+            away.
+    """
+    # endregion
+    def trigger(self):
+        self.wake.set()
+
+    # region Method Description
+    """
+    Method: latest
+        Description:
+            Returns the last-value cache.
+        Returns:
+            [0]: data returned by the last successful stateframe_query, or
+                None if there has not been one.
+            [1]: time in seconds since the epoch at which that data was
+                acquired, or None.
+    """
+    # endregion
+    def latest(self):
+        with self.lock:
+            return self.data, self.sample_time
+
+    # region Method Description
+    """
+    Method: fresh
+        Description:
+            Returns the cached data if it is recent enough to be reported,
+            i.e. younger than SAMPLE_STALE_FACTOR poll intervals.
+        Arguments:
+            default: value returned if there is no fresh data.
+        Returns:
+            [0]: the cached data, or default.
+            [1]: time at which the cached data was acquired, or None.
+    """
+    # endregion
+    def fresh(self, default):
+        data, sample_time = self.latest()
+        if data is None:
+            return default, None
+        stale_time = max(SAMPLE_STALE_FACTOR *
+                         self.worker.get_poll_interval(),
+                         SAMPLE_MIN_STALE_TIME)
+        if time.time() - sample_time > stale_time:
+            return default, sample_time
+        return data, sample_time
+
+    # region Method Description
+    """
+    Method: sample
+        Description:
+            Polls the worker once, unless its circuit is open, and updates
+            the cache on success. The data is timed by the worker's
+            get_sample_time if it gives one, and by the start of the poll
+            otherwise.
+    """
+    # endregion
+    def sample(self):
+        if not self.breaker.allow():
+            return
+        start = time.time()
+        try:
+            data = self.worker.stateframe_query()
+        except Exception, e:
+            self.metrics.query_times.observe((time.time() - start) * 1000)
+            self.metrics.query_errors.increment()
+            if metrics.is_timeout(e):
+                self.metrics.query_timeouts.increment()
+            self.breaker.failure(traceback.format_exc())
+            return
+        self.metrics.query_times.observe((time.time() - start) * 1000)
+        self.breaker.success()
+        sample_time = self.worker.get_sample_time()
+        if sample_time is None:
+            sample_time = start
+        with self.lock:
+            self.data = data
+            self.sample_time = sample_time
+
+    def __run(self):
+        while True:
+            start = time.time()
+            self.sample()
+            # Polls that overrun the interval are not caught up on.
+            self.wake.wait(max(0, start + self.worker.get_poll_interval() -
+                                  time.time()))
+            self.wake.clear()
@@ -5,21 +5,20 @@
     Email: lkkung@caltech.edu
 """
 
-import numpy as np
 import struct
 import shutil
 
 # NUMBER OF ELEMENTS IN CLUSTERS:
-NELEMENTS_ANTENNA = 6
+NELEMENTS_ANTENNA = 7
 
-NELEMENTS_ANTENNA_POWERSTRIP = 10
+NELEMENTS_ANTENNA_POWERSTRIP = 12
 
-NELEMENTS_ANTENNA_THERMAL = 9
+NELEMENTS_ANTENNA_THERMAL = 11
 
-NELEMENTS_ANTENNA_RECEIVER = 4
+NELEMENTS_ANTENNA_RECEIVER = 6
 NELEMENTS_ANTENNA_RECEIVER_LNA = 6
 
-NELEMENTS_ANTENNA_SERVO = 5
+NELEMENTS_ANTENNA_SERVO = 7
 NELEMENTS_ANTENNA_SERVO_AXIS = 7
 
 # POWERSTRIP DEFINITIONS
@@ -55,9 +54,13 @@ AXIS_DEF = {1: 'ZFocus',
             3: 'PositionAngle',
             4: 'RxSelect'}
 
+# VALIDITY DEFINITIONS
+# Sample age reported when a cluster has never been sampled.
+AGE_UNKNOWN = 0xFFFFFFFF
+
 # Version Number for FEM stateframe
-VERSION = 1.2              # Version Date: 10/6/15
-VERSION_DATE = '10.6.15'   # Most recent update (used to write backup file)
+VERSION = 1.4              # Version Date: 10/19/26
+VERSION_DATE = '10.19.26'  # Most recent update (used to write backup file)
 
 
 def gen_fem_sf(sf_dict, mk_xml=False):
@@ -96,6 +99,48 @@ def gen_fem_sf(sf_dict, mk_xml=False):
     return fmt, buf, xmlFile
 
 
+def __validity(dict, xml, mk_xml):
+    fmt = ""
+    buf = ""
+
+    # ----------------------------------------------------------------------
+    # Defaults - Validity:
+    # ----------------------------------------------------------------------
+    default_valid = 0
+    default_age = AGE_UNKNOWN
+
+    # ----------------------------------------------------------------------
+    # ELEMENT 1> Valid: 0 = no current data, 1 = current data (unsigned int)
+    # ----------------------------------------------------------------------
+
+    # Pack an unsigned integer for the flag.
+    item = dict.get('VALID', default_valid)
+    fmt += 'I'
+    buf += struct.pack('I', item)
+    if mk_xml:
+        xml.write('<U32>\n')
+        xml.write('<Name>Valid</Name>\n')
+        xml.write('<Val></Val>\n')
+        xml.write('</U32>\n')
+
+    # ----------------------------------------------------------------------
+    # ELEMENT 2> Sample Age: age of the cluster's data in milliseconds,
+    #            AGE_UNKNOWN if never sampled (unsigned int)
+    # ----------------------------------------------------------------------
+
+    # Pack an unsigned integer for the age, saturating at AGE_UNKNOWN.
+    item = min(int(dict.get('AGE', default_age)), AGE_UNKNOWN)
+    fmt += 'I'
+    buf += struct.pack('I', item)
+    if mk_xml:
+        xml.write('<U32>\n')
+        xml.write('<Name>SampleAge</Name>\n')
+        xml.write('<Val></Val>\n')
+        xml.write('</U32>\n')
+
+    return fmt, buf
+
+
 def __powerstrip(dict, xml, mk_xml):
     fmt = ""
     buf = ""
@@ -103,9 +148,9 @@ def __powerstrip(dict, xml, mk_xml):
     # ----------------------------------------------------------------------
     # Defaults - PowerStrip:
     # ----------------------------------------------------------------------
-    default_statuses = np.zeros(8)
-    default_volt = np.zeros(2)
-    default_current = np.zeros(2)
+    default_statuses = [0] * 8
+    default_volt = [0] * 2
+    default_current = [0] * 2
 
     # ----------------------------------------------------------------------
     # XML Cluster setup.
@@ -179,6 +224,13 @@ def __powerstrip(dict, xml, mk_xml):
         xml.write('<DBL>\n<Name></Name>\n<Val></Val>\n</DBL>\n')
         xml.write('</Array>\n')
 
+    # ----------------------------------------------------------------------
+    # ELEMENT 11-12> Validity and Sample Age of the cluster
+    # ----------------------------------------------------------------------
+    append_fmt, append_buf = __validity(dict, xml, mk_xml)
+    fmt += append_fmt
+    buf += append_buf
+
     # ----------------------------------------------------------------------
     # XML Cluster closure.
     # ----------------------------------------------------------------------
@@ -194,7 +246,7 @@ def __thermal(dict, xml, mk_xml):
     # ----------------------------------------------------------------------
     # Defaults - Thermal:
     # ----------------------------------------------------------------------
-    default_cryostat_temp = np.zeros(8)
+    default_cryostat_temp = [0] * 8
     default_focusbox_temp = 0
 
     # ----------------------------------------------------------------------
@@ -252,6 +304,13 @@ def __thermal(dict, xml, mk_xml):
         xml.write('<Val></Val>\n')
         xml.write('</DBL>\n')
 
+    # ----------------------------------------------------------------------
+    # ELEMENT 10-11> Validity and Sample Age of the cluster
+    # ----------------------------------------------------------------------
+    append_fmt, append_buf = __validity(dict, xml, mk_xml)
+    fmt += append_fmt
+    buf += append_buf
+
     # ----------------------------------------------------------------------
     # XML Cluster closure.
     # ----------------------------------------------------------------------
@@ -398,6 +457,13 @@ def __receiver(dict, xml, mk_xml):
         fmt += append_fmt
         buf += append_buf
 
+    # ----------------------------------------------------------------------
+    # ELEMENT 5-6> Validity and Sample Age of the cluster
+    # ----------------------------------------------------------------------
+    append_fmt, append_buf = __validity(dict, xml, mk_xml)
+    fmt += append_fmt
+    buf += append_buf
+
     # ----------------------------------------------------------------------
     # XML Cluster closure.
     # ----------------------------------------------------------------------
@@ -587,6 +653,13 @@ def __servo(dict, xml, mk_xml):
         fmt += append_fmt
         buf += append_buf
 
+    # ----------------------------------------------------------------------
+    # ELEMENT 6-7> Validity and Sample Age of the cluster
+    # ----------------------------------------------------------------------
+    append_fmt, append_buf = __validity(dict, xml, mk_xml)
+    fmt += append_fmt
+    buf += append_buf
+
     # ----------------------------------------------------------------------
     # XML Cluster closure.
     # ----------------------------------------------------------------------
@@ -603,6 +676,7 @@ def __antenna(sf_dict, xml, mk_xml):
     # Defaults - Antennas
     # ----------------------------------------------------------------------
     default_timestamp = 0
+    default_sequence = 0
 
     sf_dict = sf_dict.get('FEM', {})
     # ----------------------------------------------------------------------
@@ -662,4 +736,17 @@ def __antenna(sf_dict, xml, mk_xml):
         xml.write('<Val></Val>\n')
         xml.write('</DBL>\n')
 
+    # ----------------------------------------------------------------------
+    # Dump Sequence. Increases by one with every frame the server
+    # assembles, so gaps show frames that did not reach the ACC.
+    # ----------------------------------------------------------------------
+    item = sf_dict.get('SEQUENCE', default_sequence)
+    fmt += 'I'
+    buf += struct.pack('I', item & 0xFFFFFFFF)
+    if mk_xml:
+        xml.write('<U32>\n')
+        xml.write('<Name>Sequence</Name>\n')
+        xml.write('<Val></Val>\n')
+        xml.write('</U32>\n')
+
     return fmt, buf
@@ -56,6 +56,14 @@ SERVO_REGISTERS = {'AMPFAULT': 'AmplifierFault',
                    'POFF': 'PositionOffset',
                    'I': 'MotorCurrent'}
 
+# Validity registers appended to every cluster.
+CLUSTER_DEF = {'POWERSTRIP': 'PowerStrip',
+               'THERMAL': 'Thermal',
+               'RECEIVER': 'Receiver',
+               'SERVO': 'FRMServo'}
+VALIDITY_REGISTERS = {'VALID': 'Valid',
+                      'AGE': 'SampleAge'}
+
 
 """
 TestGenerateFrontEndBinary Test Group Description:
@@ -64,7 +72,7 @@ TestGenerateFrontEndBinary Test Group Description:
     also verify that the binary string returned can then be properly read
     back into the correct values.
 
-    Test Count: 3
+    Test Count: 4
 """
 class TestGenerateFrontEndBinary(unittest.TestCase):
     # Redefine methods already used in Starburst pipeline so that the
@@ -355,11 +363,15 @@ class TestGenerateFrontEndBinary(unittest.TestCase):
                                              [11011, 11012, 11013, 11014,
                                               11015, 11016, 11017, 11018],
                                              'VOLTS': [11021, 11022],
-                                             'CURRENT': [11031, 11032]},
+                                             'CURRENT': [11031, 11032],
+                                             'VALID': 1,
+                                             'AGE': 11041},
                               'THERMAL': {'CRYOSTAT':
                                           [12011, 12012, 12013, 12014,
                                            12015, 12016, 12017, 12018],
-                                          'FOCUSBOX': 12021},
+                                          'FOCUSBOX': 12021,
+                                          'VALID': 1,
+                                          'AGE': 12031},
                               'RECEIVER': {'LOFREQSTATUS': 13011,
                                            'HIFREQSTATUS': 13021,
                                            'NOISESTATUS': 13031,
@@ -386,7 +398,9 @@ class TestGenerateFrontEndBinary(unittest.TestCase):
                                                      'GATEAVOLTAGE': 13073,
                                                      'GATEACURRENT': 13074,
                                                      'GATEBVOLTAGE': 13075,
-                                                     'GATEBCURRENT': 13076}]},
+                                                     'GATEBCURRENT': 13076}],
+                                           'VALID': 0,
+                                           'AGE': 13081},
                               'SERVO': {'AXIS1': {'AMPFAULT': 140011,
                                                   'POSLIMIT': 140021,
                                                   'NEGLIMIT': 14031,
@@ -409,9 +423,12 @@ class TestGenerateFrontEndBinary(unittest.TestCase):
                                                   'POFF': 142061,
                                                   'I': 142071},
                                         'HOMED': 143011,
-                                        'RXSEL': 144011},
+                                        'RXSEL': 144011,
+                                        'VALID': 1,
+                                        'AGE': 145011},
                               'VERSION': 1,
-                              'TIMESTAMP': 500}}
+                              'TIMESTAMP': 500,
+                              'SEQUENCE': 600}}
 
         self.nameMap = {}
 
@@ -433,6 +450,20 @@ class TestGenerateFrontEndBinary(unittest.TestCase):
         fmt, buf, xmlFile = go.gen_fem_sf({})
         self.assertTrue(sys.getsizeof(buf) != 0)
 
+    """
+    Test - test_missingClustersAreReportedInvalid:
+        Given that gen_fem_sf is passed an empty dictionary,
+        Then every cluster decodes as invalid with an unknown sample age.
+    """
+    def test_missingClustersAreReportedInvalid(self):
+        fmt, buf, xmlFile = go.gen_fem_sf({}, True)
+        treeDict, version = self.xml_ptrs(xmlFile)
+        for cluster_name in CLUSTER_DEF.values():
+            pointer = treeDict[cluster_name]['Valid']
+            self.assertEqual(self.extract(buf, pointer), 0)
+            pointer = treeDict[cluster_name]['SampleAge']
+            self.assertEqual(self.extract(buf, pointer), go.AGE_UNKNOWN)
+
     """
     Test - test_stringBufferRevertsToActualValues:
         Given that self.data is defined and passed to gen_fem_sf,
@@ -539,7 +570,17 @@ class TestGenerateFrontEndBinary(unittest.TestCase):
         self.assertEqual(extracted, actual)
 
         # -----------------------------------------------------------------
-        # Test Timestamp, and Version
+        # Test Validity of each cluster
+        # -----------------------------------------------------------------
+        for cluster_key, cluster_name in CLUSTER_DEF.items():
+            for data_key, dict_key in VALIDITY_REGISTERS.items():
+                actual = self.data['FEM'][cluster_key][data_key]
+                pointer = treeDict[cluster_name][dict_key]
+                extracted = self.extract(buf, pointer)
+                self.assertEqual(extracted, actual)
+
+        # -----------------------------------------------------------------
+        # Test Timestamp, Version, and Sequence
         # -----------------------------------------------------------------
         # Timestamp:
         pointer = treeDict['Version']
@@ -551,6 +592,11 @@ class TestGenerateFrontEndBinary(unittest.TestCase):
         extracted = self.extract(buf, pointer)
         self.assertEqual(extracted, 500)
 
+        # Sequence:
+        pointer = treeDict['Sequence']
+        extracted = self.extract(buf, pointer)
+        self.assertEqual(extracted, 600)
+
 
 # Main Method
 if __name__ == '__main__':
@@ -0,0 +1,372 @@
+#!/usr/bin/python2.6
+
+"""
+    STARBURST ACC/FEANTA Stateframe Columnar Export
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+
+    Turns packed FEM stateframes into one time series per field. The
+    layout of a frame is read from the stateframe XML written by
+    gen_fem_sf for its version and laid over the frames as a NumPy
+    structured type, so every column is cut out of all frames at once.
+    Fields are named by the path of XML names below the FEM cluster,
+    i.e. 'Thermal.LowFreqLNATemp' or 'FRMServo.PositionAngle.Position',
+    and an array of clusters gives one column per field with a trailing
+    axis over the array, i.e. 'Receiver.LNAs.DrainVoltage'. Frames are
+    read from a stateframe archive, which needs core on PYTHONPATH, or
+    from a capture file of frames written back to back:
+
+        sf_export.py -x fem_stateframe_v1.4_10.19.26.xml -a /var/lib/feanta/archive
+            -f LowFreqLNATemp,PositionAngle -o fem.npz
+"""
+
+import getopt
+import os
+import sys
+import time
+import xml.etree.ElementTree as etree
+import numpy as np
+
+USAGE = 'sf_export.py -x <stateframe.xml> (-a <archive> | -c <capture>) ' \
+        '[-f <field>[,<field>...]] [-s <start>] [-e <end>] ' \
+        '-o <columns.npz | directory>'
+
+# NumPy types of the scalar elements of the stateframe XML. Frames are
+# packed little-endian by gen_fem_sf.
+XML_TYPES = {'U8': '<u1',
+             'B8': '<u1',
+             'U16': '<u2',
+             'U32': '<u4',
+             'I16': '<i2',
+             'I32': '<i4',
+             'SGL': '<f4',
+             'DBL': '<f8'}
+
+# Each dimension of an array is packed as an unsigned int ahead of its
+# elements.
+DIMSIZE_SIZE = 4
+
+# Field holding the time a frame was packed, in seconds since the LabVIEW
+# epoch, and the offset of that epoch from the Unix epoch. Used as the
+# time of captured frames, which carry no archive time.
+TIMESTAMP_FIELD = 'Timestamp'
+LABVIEW_EPOCH = 2082844800
+
+
+# region Method Description
+"""
+Method: __element_type
+    Description:
+        Builds the NumPy type of an element of the stateframe XML,
+        recursing into clusters and arrays.
+    Arguments:
+        element: the XML element.
+    Returns:
+        name: the element's name.
+        dtype: the element's type.
+        header: number of bytes packed ahead of the element, i.e. the
+            dimensions of an array.
+"""
+# endregion
+def __element_type(element):
+    children = list(element)
+    name = children[0].text or ''
+    if element.tag == 'Cluster':
+        count = int(children[1].text)
+        names = []
+        formats = []
+        offsets = []
+        offset = 0
+        for child in children[2:2 + count]:
+            child_name, child_type, header = __element_type(child)
+            offset += header
+            names.append(child_name)
+            formats.append(child_type)
+            offsets.append(offset)
+            offset += child_type.itemsize
+        return name, np.dtype({'names': names,
+                               'formats': formats,
+                               'offsets': offsets,
+                               'itemsize': offset}), 0
+    if element.tag == 'Array':
+        dims = [int(child.text) for child in children
+                if child.tag == 'Dimsize']
+        item_name, item_type, header = __element_type(
+            children[1 + len(dims)])
+        # Dimensions are listed outermost last, and unit dimensions are
+        # dropped as they are by the ACC.
+        shape = tuple(dim for dim in reversed(dims) if dim != 1)
+        return name, np.dtype((item_type, shape)), DIMSIZE_SIZE * len(dims)
+    if element.tag not in XML_TYPES:
+        raise ValueError('Unsupported stateframe element ' + element.tag +
+                         '.')
+    return name, np.dtype(XML_TYPES[element.tag]), 0
+
+
+# region Method Description
+"""
+Method: read_layout
+    Description:
+        Reads the layout of a frame from a stateframe XML file.
+    Arguments:
+        xml_path: stateframe XML written by gen_fem_sf.
+    Returns:
+        dtype: structured type of a frame, nested as the XML's clusters.
+"""
+# endregion
+def read_layout(xml_path):
+    root = etree.parse(xml_path).getroot()
+    name, dtype, header = __element_type(root)
+    return dtype
+
+
+# region Method Description
+"""
+Method: field_names
+    Description:
+        Lists the fields of a frame layout that hold values, as paths of
+        XML names joined with dots.
+    Arguments:
+        dtype: structured type returned by read_layout.
+        prefix: path of the cluster dtype describes, for recursion.
+    Returns:
+        names: list of field paths in the order they are packed.
+"""
+# endregion
+def field_names(dtype, prefix=''):
+    names = []
+    for name in dtype.names:
+        base = dtype.fields[name][0].base
+        if base.names is None:
+            names.append(prefix + name)
+        else:
+            names += field_names(base, prefix + name + '.')
+    return names
+
+
+# region Method Description
+"""
+Method: select_fields
+    Description:
+        Picks the fields named by a list of selectors. A selector matches
+        every field whose path contains it as whole names, so 'Thermal'
+        picks the thermal cluster, 'LowFreqLNATemp' a single temperature
+        and 'Position' the position of every axis.
+    Arguments:
+        dtype: structured type returned by read_layout.
+        selectors: list of selectors, None for every field.
+    Returns:
+        names: list of field paths in the order they are packed.
+"""
+# endregion
+def select_fields(dtype, selectors=None):
+    names = field_names(dtype)
+    if selectors is None:
+        return names
+    selected = set()
+    for selector in selectors:
+        matched = [name for name in names
+                   if '.' + selector + '.' in '.' + name + '.']
+        if not matched:
+            raise ValueError('No stateframe field matches ' + selector + '.')
+        selected.update(matched)
+    return [name for name in names if name in selected]
+
+
+# region Method Description
+"""
+Method: frame_view
+    Description:
+        Lays a frame layout over frames without copying them where it can.
+    Arguments:
+        frames: the frames, either a structured array of archived records
+            with fields 'time', 'sequence' and 'frame' as returned by
+            read_archive, an array of frame bytes of any shape, a string
+            of frames back to back or a list of frame strings.
+        dtype: structured type returned by read_layout.
+    Returns:
+        view: structured array of the frames.
+        times: Unix time of each frame, from the archive or otherwise from
+            the frame's timestamp, None if there is neither.
+        sequences: archived sequence numbers, None if not archived.
+"""
+# endregion
+def frame_view(frames, dtype):
+    if isinstance(frames, list):
+        frames = ''.join(frames)
+    if isinstance(frames, str):
+        frames = np.frombuffer(frames, np.uint8)
+    if frames.dtype.names is not None:
+        frame_type, offset = frames.dtype.fields['frame'][:2]
+        if frame_type.itemsize != dtype.itemsize:
+            raise ValueError('Archived frames are ' +
+                             str(frame_type.itemsize) + ' bytes but the ' +
+                             'layout is ' + str(dtype.itemsize) + '.')
+        records = frames.view(np.dtype({
+            'names': ['time', 'sequence', 'frame'],
+            'formats': ['<f8', '<u4', dtype],
+            'offsets': [0, 8, offset],
+            'itemsize': frames.dtype.itemsize}))
+        return records['frame'], records['time'], records['sequence']
+    frames = np.ascontiguousarray(frames, np.uint8).reshape(-1)
+    if frames.size % dtype.itemsize:
+        raise ValueError(str(frames.size) + ' bytes is not a whole ' +
+                         'number of ' + str(dtype.itemsize) + ' byte frames.')
+    view = frames.view(dtype)
+    times = None
+    if TIMESTAMP_FIELD in dtype.names:
+        times = view[TIMESTAMP_FIELD] - LABVIEW_EPOCH
+    return view, times, None
+
+
+# region Method Description
+"""
+Method: export_columns
+    Description:
+        Cuts the columns of the selected fields out of frames.
+    Arguments:
+        frames: the frames, in any form accepted by frame_view.
+        dtype: structured type returned by read_layout.
+        fields: list of field selectors, see select_fields. None for every
+            field.
+        start: earliest Unix time included, None for no limit.
+        end: latest Unix time excluded, None for no limit.
+    Returns:
+        columns: dictionary of arrays keyed by field path, one row per
+            frame, along with 'time' and 'sequence' where known.
+"""
+# endregion
+def export_columns(frames, dtype, fields=None, start=None, end=None):
+    names = select_fields(dtype, fields)
+    view, times, sequences = frame_view(frames, dtype)
+    if start is not None or end is not None:
+        if times is None:
+            raise ValueError('Frames have no times to select a range by.')
+        keep = np.ones(len(view), bool)
+        if start is not None:
+            keep &= times >= start
+        if end is not None:
+            keep &= times < end
+        view = view[keep]
+        times = times[keep]
+        if sequences is not None:
+            sequences = sequences[keep]
+
+    columns = {}
+    if times is not None:
+        columns['time'] = np.ascontiguousarray(times)
+    if sequences is not None:
+        columns['sequence'] = np.ascontiguousarray(sequences)
+    for name in names:
+        column = view
+        for part in name.split('.'):
+            column = column[part]
+        columns[name] = np.ascontiguousarray(column)
+    return columns
+
+
+# region Method Description
+"""
+Method: read_archive
+    Description:
+        Reads the frames of one size from a stateframe archive. Needs
+        sf_archive from core.
+    Arguments:
+        directory: directory of the archive.
+        frame_size: size of the frames read, i.e. the itemsize of the
+            layout. Frames of other versions are skipped.
+        start: earliest Unix time included, None for no limit.
+        end: latest Unix time excluded, None for no limit.
+    Returns:
+        records: structured array of archived records, see
+            sf_archive.record_dtype.
+"""
+# endregion
+def read_archive(directory, frame_size, start=None, end=None):
+    import sf_archive
+    archive = sf_archive.StateframeArchive(directory)
+    archive.load()
+    if start is None:
+        start = 0
+    if end is None:
+        end = float('inf')
+    views = [view for view in archive.query(start, end)
+             if view.dtype['frame'].shape[0] == frame_size]
+    if not views:
+        return np.empty(0, sf_archive.record_dtype(frame_size))
+    return np.concatenate(views)
+
+
+# region Method Description
+"""
+Method: write_columns
+    Description:
+        Writes columns either to a single .npz file or as one .npy file
+        per column in a directory.
+    Arguments:
+        columns: dictionary returned by export_columns.
+        output: path ending in .npz, or a directory, created if needed.
+"""
+# endregion
+def write_columns(columns, output):
+    if output.endswith('.npz'):
+        np.savez(output, **columns)
+        return
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    for name, column in columns.items():
+        np.save(os.path.join(output, name + '.npy'), column)
+
+
+def main(argv):
+    xml_path = None
+    archive = None
+    capture = None
+    fields = None
+    start = None
+    end = None
+    output = None
+    try:
+        opts, args = getopt.getopt(argv, 'hx:a:c:f:s:e:o:',
+                                   ['xml=', 'archive=', 'capture=',
+                                    'fields=', 'start=', 'end=', 'output='])
+        for opt, arg in opts:
+            if opt == '-h':
+                print USAGE
+                sys.exit()
+            elif opt in ['-x', '--xml']:
+                xml_path = arg
+            elif opt in ['-a', '--archive']:
+                archive = arg
+            elif opt in ['-c', '--capture']:
+                capture = arg
+            elif opt in ['-f', '--fields']:
+                fields = arg.split(',')
+            elif opt in ['-s', '--start']:
+                start = float(arg)
+            elif opt in ['-e', '--end']:
+                end = float(arg)
+            elif opt in ['-o', '--output']:
+                output = arg
+    except (getopt.GetoptError, ValueError):
+        print USAGE
+        sys.exit(2)
+    if xml_path is None or output is None or (archive is None) == \
+            (capture is None):
+        print USAGE
+        sys.exit(2)
+
+    dtype = read_layout(xml_path)
+    if archive is not None:
+        frames = read_archive(archive, dtype.itemsize, start, end)
+    else:
+        frames = np.memmap(capture, np.uint8, 'r')
+    export_start = time.time()
+    columns = export_columns(frames, dtype, fields, start, end)
+    write_columns(columns, output)
+    rows = len(columns.values()[0]) if columns else 0
+    print 'Exported', len(columns), 'columns of', rows, 'frames in', \
+        round(time.time() - export_start, 3), 's.'
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
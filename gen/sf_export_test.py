@@ -0,0 +1,122 @@
+"""
+    STARBURST Stateframe Columnar Export Test Suite
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import unittest
+import numpy as np
+import gen_fem_sf
+import sf_export
+
+# Number of frames exported by each test.
+FRAMES = 5
+
+# Axes of the servo cluster.
+AXES = {1: 'ZFocus',
+        3: 'PositionAngle',
+        4: 'RxSelect'}
+
+
+"""
+TestExportColumns Test Group Description:
+    This group of tests makes sure that sf_export.py reads the layout of
+    the frames packed by gen_fem_sf from the XML it writes, and cuts the
+    columns of the selected fields out of frames in every form accepted.
+
+    Test Count: 4
+"""
+class TestExportColumns(unittest.TestCase):
+    def setUp(self):
+        # Pack frames whose fields differ from frame to frame.
+        self.dicts = []
+        self.frames = []
+        xml_file = None
+        for i in range(FRAMES):
+            servo = {'VALID': 1, 'AGE': i}
+            for axis in AXES:
+                servo['AXIS' + str(axis)] = {'P': 1000 * axis + i}
+            sf_dict = {'FEM': {'THERMAL': {'CRYOSTAT': [20.0 + i] * 8},
+                               'RECEIVER': {'LNAS': [{'DRAINVOLTAGE':
+                                                      10 * lna + i}
+                                                     for lna in range(4)]},
+                               'POWERSTRIP': {'VOLTS': [i, -i]},
+                               'SERVO': servo,
+                               'SEQUENCE': 100 + i,
+                               'TIMESTAMP': 1000.5 + i +
+                               sf_export.LABVIEW_EPOCH}}
+            fmt, buf, xml_file = gen_fem_sf.gen_fem_sf(sf_dict, i == 0)
+            self.dicts.append(sf_dict)
+            self.frames.append(buf)
+        self.dtype = sf_export.read_layout(xml_file)
+
+    """
+    Test - test_columnsRevertToPackedValues:
+        Given frames packed by gen_fem_sf and the XML it wrote,
+        Then each exported column holds the packed values of every frame.
+    """
+    def test_columnsRevertToPackedValues(self):
+        self.assertEqual(self.dtype.itemsize, len(self.frames[0]))
+        columns = sf_export.export_columns(self.frames, self.dtype)
+        self.assertEqual(columns['Thermal.LowFreqLNATemp'].tolist(),
+                         [20.0 + i for i in range(FRAMES)])
+        self.assertEqual(columns['PowerStrip.Volts'].tolist(),
+                         [[i, -i] for i in range(FRAMES)])
+        self.assertEqual(columns['Receiver.LNAs.DrainVoltage'].tolist(),
+                         [[10 * lna + i for lna in range(4)]
+                          for i in range(FRAMES)])
+        for axis, name in AXES.items():
+            self.assertEqual(columns['FRMServo.' + name +
+                                     '.Position'].tolist(),
+                             [1000 * axis + i for i in range(FRAMES)])
+        self.assertEqual(columns['Sequence'].tolist(),
+                         [100 + i for i in range(FRAMES)])
+        self.assertEqual(columns['time'].tolist(),
+                         [1000.5 + i for i in range(FRAMES)])
+
+    """
+    Test - test_fieldsAreSelectedByName:
+        Given selectors naming a field, a cluster and a name shared by
+        several fields,
+        Then only the fields they match are exported.
+    """
+    def test_fieldsAreSelectedByName(self):
+        names = sf_export.select_fields(self.dtype, ['LowFreqLNATemp'])
+        self.assertEqual(names, ['Thermal.LowFreqLNATemp'])
+        names = sf_export.select_fields(self.dtype, ['Position'])
+        self.assertEqual(names, ['FRMServo.' + AXES[axis] + '.Position'
+                                 for axis in sorted(AXES)])
+        names = sf_export.select_fields(self.dtype, ['PositionAngle'])
+        self.assertEqual(len(names), gen_fem_sf.NELEMENTS_ANTENNA_SERVO_AXIS)
+        self.assertRaises(ValueError, sf_export.select_fields, self.dtype,
+                          ['AXIS3.P'])
+
+    """
+    Test - test_archivedRecordsAreSelectedByTime:
+        Given archived records holding the frames with their archive
+        times and sequence numbers,
+        Then the frames in a time range are exported with those times.
+    """
+    def test_archivedRecordsAreSelectedByTime(self):
+        records = np.zeros(FRAMES, [('time', '<f8'), ('sequence', '<u4'),
+                                    ('frame', 'u1', (self.dtype.itemsize,))])
+        records['time'] = np.arange(FRAMES) * 0.3
+        records['sequence'] = np.arange(FRAMES)
+        records['frame'] = np.frombuffer(''.join(self.frames), np.uint8) \
+            .reshape(FRAMES, -1)
+        columns = sf_export.export_columns(records, self.dtype,
+                                           ['LowFreqLNATemp'], 0.5, 1.0)
+        self.assertEqual(sorted(columns), ['Thermal.LowFreqLNATemp',
+                                           'sequence', 'time'])
+        self.assertEqual(columns['sequence'].tolist(), [2, 3])
+        self.assertEqual(columns['Thermal.LowFreqLNATemp'].tolist(),
+                         [22.0, 23.0])
+
+    """
+    Test - test_framesOfAnotherLayoutAreRejected:
+        Given frames whose size does not match the layout,
+        Then the export raises a ValueError.
+    """
+    def test_framesOfAnotherLayoutAreRejected(self):
+        self.assertRaises(ValueError, sf_export.export_columns,
+                          [frame[:-4] for frame in self.frames], self.dtype)
@@ -0,0 +1,128 @@
+"""
+    STARBURST ACC/FEANTA BeagleBone Simulator
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import sim_device
+import SocketServer
+import struct
+
+# Number of amplifiers and of readings per amplifier, in the order the
+# BeagleBone reports them: drain voltage, drain current, gate A voltage,
+# gate A current, gate B voltage, gate B current.
+NUM_AMPS = 4
+NUM_READINGS = 6
+READING_INDEX = {'drain': 0,
+                 'gatea': 2,
+                 'gateb': 4}
+
+# Readings reported for an amplifier that is powered on, before any
+# voltage is set.
+DEFAULT_READINGS = [0.8, -20.0, 0.1, -0.2, 0.1, -0.2]
+
+
+# region Class Description
+"""
+Class: BBSim
+    Description:
+        Simulated BeagleBone LNA bias controller. Each connection carries
+        one line. 'read' is answered with the 96 byte block of big-endian
+        float32 readings, reading by reading with the four amplifiers
+        interleaved. 'set amp N drain|gatea|gateb V' stages a voltage that
+        'latch' applies, and 'set power N 0|1' switches an amplifier, which
+        then reads zero while off.
+    Arguments:
+        latency: mean reply latency in seconds.
+        jitter: spread of the reply latency in seconds.
+"""
+# endregion
+class BBSim(sim_device.SimDevice):
+    def __init__(self, latency=0.0, jitter=0.0):
+        super(BBSim, self).__init__(latency, jitter)
+        self.readings = [list(DEFAULT_READINGS) for amp in range(NUM_AMPS)]
+        self.staged = {}
+        self.powered = [True] * NUM_AMPS
+
+    # region Method Description
+    """
+    Method: read_block
+        Description:
+            Packs the current readings as the BeagleBone does.
+        Returns:
+            block: 96 byte string.
+    """
+    # endregion
+    def read_block(self):
+        values = []
+        with self.lock:
+            for reading in range(NUM_READINGS):
+                for amp in range(NUM_AMPS):
+                    if self.powered[amp]:
+                        values.append(self.readings[amp][reading])
+                    else:
+                        values.append(0.0)
+        return struct.pack('>%df' % len(values), *values)
+
+    # region Method Description
+    """
+    Method: command
+        Description:
+            Applies a command line.
+        Arguments:
+            line: command without its line terminator.
+        Returns:
+            True if the command was understood, False otherwise.
+    """
+    # endregion
+    def command(self, line):
+        words = line.split()
+        try:
+            if words == ['latch']:
+                with self.lock:
+                    for (amp, reading), value in self.staged.items():
+                        self.readings[amp][reading] = value
+                    self.staged = {}
+                return True
+            if len(words) == 5 and words[:2] == ['set', 'amp']:
+                amp = int(words[2])
+                reading = READING_INDEX[words[3]]
+                with self.lock:
+                    self.staged[(amp, reading)] = float(words[4])
+                return 0 <= amp < NUM_AMPS
+            if len(words) == 4 and words[:2] == ['set', 'power']:
+                amp = int(words[2])
+                with self.lock:
+                    self.powered[amp] = words[3] == '1'
+                return True
+        except (ValueError, KeyError, IndexError):
+            pass
+        return False
+
+    # region Method Description
+    """
+    Method: serve
+        Description:
+            Creates the TCP server for this simulator.
+        Arguments:
+            host: address to bind.
+            port: port to bind, 0 for any free port.
+        Returns:
+            server: SimTCPServer, not yet started.
+    """
+    # endregion
+    def serve(self, host='127.0.0.1', port=0):
+        return sim_device.SimTCPServer((host, port), BBHandler, self)
+
+
+class BBHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        device = self.server.device
+        line = self.rfile.readline().strip()
+        if not device.respond_delay():
+            self.rfile.read()
+            return
+        if line == 'read':
+            self.wfile.write(device.read_block())
+        else:
+            device.command(line)
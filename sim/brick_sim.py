@@ -0,0 +1,273 @@
+"""
+    STARBURST ACC/FEANTA GeoBrick Simulator
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import sim_device
+import SocketServer
+import struct
+import time
+
+# Ethernet request codes understood by the simulator.
+RQ_SENDLINE = '\xb0'
+RQ_GETLINE = '\xb1'
+RQ_FLUSH = '\xb3'
+RQ_GETRESPONSE = '\xbf'
+RQ_READREADY = '\xc2'
+RQ_GETBUFFER = '\xc5'
+RQ_WRITEBUFFER = '\xc6'
+HEADER_LENGTH = 8
+
+# Control characters framing the Brick's replies.
+ACK = '\x06'
+BELL = '\x07'
+CR = '\r'
+
+# Command numbers written to P1000 and the axes they move.
+CMD_HOME = 1
+CMD_SELRX = 2
+CMD_SETANGLE = 3
+CMD_SETZOFFSET = 4
+CMD_SETXOFFSET = 5
+CMD_KILL = 6
+CMD_ENABLE = 7
+CMD_SETX = 8
+CMD_SETZ = 9
+AXES = [1, 3, 4]
+MOVE_AXIS = {CMD_SETANGLE: 3,
+             CMD_SETX: 4,
+             CMD_SETZ: 1}
+OFFSET_AXIS = {CMD_SETZOFFSET: 1,
+               CMD_SETXOFFSET: 4}
+
+# Axis speeds in physical units per second, and the motor current
+# reported while an axis moves and while it holds.
+AXIS_SPEED = {1: 5.0,
+              3: 10.0,
+              4: 5.0}
+MOVING_CURRENT = 0.5
+HOLDING_CURRENT = 0.01
+
+# Number of fractional mantissa bits used when encoding gathered values.
+GATHER_FRACTION_BITS = 20
+
+
+# region Method Description
+"""
+Method: encode_gather_word
+    Description:
+        Encodes a value as a 48 bit Turbo PMAC float as listed by LIST
+        GATHER: a 36 bit two's complement mantissa followed by a 12 bit
+        exponent offset by 2082.
+    Arguments:
+        value: value to be encoded.
+    Returns:
+        word: the word as a hexadecimal string.
+"""
+# endregion
+def encode_gather_word(value):
+    mantissa = int(round(value * 2 ** GATHER_FRACTION_BITS))
+    mantissa &= (1 << 36) - 1
+    exponent = 2082 - GATHER_FRACTION_BITS
+    return '%012X' % ((mantissa << 12) | exponent)
+
+
+# region Class Description
+"""
+Class: BrickSim
+    Description:
+        Simulated GeoBrick motion controller speaking the ethernet packet
+        protocol over a persistent TCP connection. getresponse packets
+        carrying 'LIST GATHER' are answered with the 24 gathered words
+        read by BrickWorker.stateframe_query; packets carrying
+        'P1000=n P1001=x' run the corresponding motion program, moving
+        the simulated axes towards their targets at AXIS_SPEED so that
+        position error and motor current show motion. Any other command
+        is rejected with <BELL>ERR003<CR>. sendline, getline, flush,
+        readready, getbuffer and writebuffer are answered as the Brick
+        does.
+    Arguments:
+        latency: mean reply latency in seconds.
+        jitter: spread of the reply latency in seconds.
+"""
+# endregion
+class BrickSim(sim_device.SimDevice):
+    def __init__(self, latency=0.0, jitter=0.0):
+        super(BrickSim, self).__init__(latency, jitter)
+        self.positions = dict((axis, 0.0) for axis in AXES)
+        self.targets = dict((axis, 0.0) for axis in AXES)
+        self.homing = False
+        self.homed = 0
+        self.rxsel = 1
+        self.pending = ''
+        self.update_time = time.time()
+
+    def __update(self):
+        now = time.time()
+        elapsed = now - self.update_time
+        self.update_time = now
+        for axis in AXES:
+            remaining = self.targets[axis] - self.positions[axis]
+            step = AXIS_SPEED[axis] * elapsed
+            if abs(remaining) <= step:
+                self.positions[axis] = self.targets[axis]
+            elif remaining > 0:
+                self.positions[axis] += step
+            else:
+                self.positions[axis] -= step
+        if self.homing and not self.__is_moving():
+            self.homing = False
+            self.homed = 1
+
+    def __is_moving(self):
+        for axis in AXES:
+            if self.positions[axis] != self.targets[axis]:
+                return True
+        return False
+
+    # region Method Description
+    """
+    Method: gather
+        Description:
+            Builds the response to LIST GATHER from the current state.
+        Returns:
+            response: gathered words separated by <CR>.
+    """
+    # endregion
+    def gather(self):
+        with self.lock:
+            self.__update()
+            values = [0, self.homed, self.rxsel]
+            for axis in AXES:
+                error = self.targets[axis] - self.positions[axis]
+                current = HOLDING_CURRENT
+                if error != 0:
+                    current = MOVING_CURRENT
+                values += [self.positions[axis], max(-1, min(1, error)), 0,
+                           current, 0, 0, 0]
+        return CR.join(encode_gather_word(value) for value in values) + CR
+
+    # region Method Description
+    """
+    Method: command
+        Description:
+            Runs a command line.
+        Arguments:
+            line: command line without its terminator.
+        Returns:
+            response: text response, or None if the command is rejected.
+    """
+    # endregion
+    def command(self, line):
+        line = line.strip()
+        if line == 'LIST GATHER':
+            return self.gather()
+        registers = {}
+        try:
+            for word in line.split():
+                name, value = word.split('=')
+                registers[name.upper()] = float(value)
+            program = int(registers['P1000'])
+        except (ValueError, KeyError):
+            return None
+        argument = registers.get('P1001', 0.0)
+
+        with self.lock:
+            self.__update()
+            if program == CMD_HOME:
+                self.homing = True
+                self.homed = 0
+                for axis in AXES:
+                    self.targets[axis] = 0.0
+            elif program == CMD_SELRX:
+                self.rxsel = int(argument)
+            elif program in MOVE_AXIS:
+                self.targets[MOVE_AXIS[program]] = argument
+            elif program in OFFSET_AXIS:
+                self.targets[OFFSET_AXIS[program]] += argument
+            elif program == CMD_KILL:
+                self.homing = False
+                for axis in AXES:
+                    self.targets[axis] = self.positions[axis]
+            elif program != CMD_ENABLE:
+                return None
+        return ''
+
+    # region Method Description
+    """
+    Method: request
+        Description:
+            Answers a single ethernet packet.
+        Arguments:
+            rq: request code.
+            data: data carried by the packet, null terminators included.
+        Returns:
+            reply: bytes to send back.
+    """
+    # endregion
+    def request(self, rq, data):
+        if rq == RQ_GETRESPONSE:
+            response = self.command(data.rstrip('\x00'))
+            if response is None:
+                return BELL + 'ERR003' + CR
+            return response + ACK
+        if rq == RQ_SENDLINE:
+            response = self.command(data.rstrip('\x00'))
+            if response is None:
+                response = BELL + 'ERR003' + CR
+            with self.lock:
+                self.pending += response
+            return ACK
+        if rq == RQ_GETLINE:
+            with self.lock:
+                line, sep, self.pending = self.pending.partition(CR)
+            return line + CR + ACK
+        if rq == RQ_FLUSH:
+            with self.lock:
+                self.pending = ''
+            return ACK
+        if rq == RQ_READREADY:
+            with self.lock:
+                return ('\x01' if self.pending else '\x00') + '\x00'
+        if rq == RQ_GETBUFFER:
+            with self.lock:
+                response, self.pending = self.pending, ''
+            return response + ACK
+        if rq == RQ_WRITEBUFFER:
+            for line in data.split('\x00'):
+                if line and self.command(line) is None:
+                    return '\x00\x00\x00\x80'
+            return '\x00\x00\x00\x00'
+        return BELL + 'ERR001' + CR
+
+    # region Method Description
+    """
+    Method: serve
+        Description:
+            Creates the TCP server for this simulator.
+        Arguments:
+            host: address to bind.
+            port: port to bind, 0 for any free port.
+        Returns:
+            server: ThreadingSimTCPServer, not yet started.
+    """
+    # endregion
+    def serve(self, host='127.0.0.1', port=0):
+        return sim_device.ThreadingSimTCPServer((host, port), BrickHandler,
+                                                self)
+
+
+class BrickHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        device = self.server.device
+        while True:
+            header = self.rfile.read(HEADER_LENGTH)
+            if len(header) < HEADER_LENGTH:
+                return
+            length = struct.unpack('>H', header[6:8])[0]
+            data = self.rfile.read(length)
+            if not device.respond_delay():
+                continue
+            self.wfile.write(device.request(header[1], data))
+            self.wfile.flush()
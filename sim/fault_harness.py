@@ -0,0 +1,210 @@
+#!/usr/bin/python2.6
+
+"""
+    STARBURST ACC/FEANTA Fault Injection Harness
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import getopt
+import json
+import socket
+import sys
+import threading
+import time
+import fault_proxy
+
+USAGE = 'fault_harness.py -c <config.json> [-o <report.json>]'
+
+# Longest wait in seconds for a probed command to complete.
+PROBE_TIMEOUT = 10.0
+
+"""
+Example configuration, placing a proxy in front of the GeoBrick and the
+ACC and probing the daemon's command port through a third:
+
+{"duration": 60,
+ "frame_interval": 0.3,
+ "links": {
+     "brick": {"listen": ["127.0.0.1", 11025],
+               "target": ["geobrickanta.solar.pvt", 1025],
+               "script": [{"duration": 20},
+                          {"duration": 10, "delay": ["lognormal", -4, 1]},
+                          {"duration": 5, "stall": 3},
+                          {"duration": 10, "partial": 7,
+                           "partial_gap": 0.01},
+                          {"duration": 15, "refuse": 0.5}]},
+     "acc": {"listen": ["127.0.0.1", 15675],
+             "target": ["acc.solar.pvt", 5675],
+             "script": [{"duration": 30},
+                        {"duration": 30, "drop": 0.1,
+                         "direction": "up"}]},
+     "command": {"listen": ["127.0.0.1", 15676],
+                 "target": ["127.0.0.1", 5676],
+                 "script": []}},
+ "probe": {"link": "command", "command": "FEM-STATS", "interval": 1.0}}
+
+The daemon's workers and ACC_HOSTNAME/ACC_PORT are pointed at the listen
+addresses. "frame_link" names the link carrying stateframes, "acc" by
+default, and "frame_interval" is used to report the jitter on that link.
+"""
+
+
+# region Class Description
+"""
+Class: CommandProbe
+    Description:
+        Issues a command to the daemon at a fixed interval, each on its own
+        connection as the ACC does, and records how long the complete
+        reply took.
+    Arguments:
+        address: (host, port) commands are sent to.
+        command: command line to send.
+        interval: seconds between commands.
+"""
+# endregion
+class CommandProbe(object):
+    def __init__(self, address, command, interval):
+        self.address = address
+        self.command = command
+        self.interval = interval
+        self.latencies = []
+        self.failures = 0
+        self.running = False
+
+    def __run(self):
+        while self.running:
+            start = time.time()
+            try:
+                probe = socket.create_connection(self.address, PROBE_TIMEOUT)
+                try:
+                    probe.sendall(self.command)
+                    while probe.recv(4096):
+                        pass
+                finally:
+                    probe.close()
+                self.latencies.append((time.time() - start) * 1000)
+            except socket.error:
+                self.failures += 1
+            time.sleep(max(0, start + self.interval - time.time()))
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Starts probing on a daemon thread.
+    """
+    # endregion
+    def start(self):
+        self.running = True
+        thread = threading.Thread(target=self.__run)
+        thread.daemon = True
+        thread.start()
+
+    # region Method Description
+    """
+    Method: stop
+        Description:
+            Stops probing after the command in progress.
+    """
+    # endregion
+    def stop(self):
+        self.running = False
+
+    # region Method Description
+    """
+    Method: report
+        Description:
+            Summarizes the command latencies in milliseconds.
+    """
+    # endregion
+    def report(self):
+        report = fault_proxy.summarize(list(self.latencies))
+        report['failures'] = self.failures
+        return report
+
+
+# region Method Description
+"""
+Method: run
+    Description:
+        Starts the proxies and probe described by a configuration, lets
+        them run for its duration and reports on every link.
+    Arguments:
+        config: configuration dictionary, see the example above.
+        started: optional method called with the dictionary of proxy
+            addresses once every proxy is listening, i.e. to start a
+            daemon against them.
+    Returns:
+        report: dictionary of link reports keyed by link name, with the
+            probe's report under 'probe'.
+"""
+# endregion
+def run(config, started=None):
+    proxies = {}
+    for name, link in config.get('links', {}).items():
+        script = fault_proxy.FaultScript(link.get('script', []),
+                                         link.get('loop', False))
+        proxies[name] = fault_proxy.FaultProxy(tuple(link['listen']),
+                                               tuple(link['target']), script)
+    addresses = {}
+    for name, proxy in proxies.items():
+        addresses[name] = proxy.start()
+    if started is not None:
+        started(addresses)
+
+    probe = None
+    if 'probe' in config:
+        probe_config = config['probe']
+        probe = CommandProbe(addresses[probe_config['link']],
+                             probe_config['command'],
+                             probe_config.get('interval', 1.0))
+        probe.start()
+
+    time.sleep(config.get('duration', 60))
+
+    report = {}
+    frame_link = config.get('frame_link', 'acc')
+    for name, proxy in proxies.items():
+        expected = None
+        if name == frame_link:
+            expected = config.get('frame_interval', None)
+        report[name] = proxy.stats.report(expected)
+        proxy.stop()
+    if probe is not None:
+        probe.stop()
+        report['probe'] = probe.report()
+    return report
+
+
+def main(argv):
+    config_file = None
+    output_file = None
+    try:
+        opts, args = getopt.getopt(argv, 'hc:o:', ['config=', 'output='])
+    except getopt.GetoptError:
+        print USAGE
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            print USAGE
+            sys.exit()
+        elif opt in ['-c', '--config']:
+            config_file = arg
+        elif opt in ['-o', '--output']:
+            output_file = arg
+    if config_file is None:
+        print USAGE
+        sys.exit(2)
+
+    with open(config_file) as config:
+        report = run(json.load(config))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output_file is None:
+        print text
+    else:
+        with open(output_file, 'w') as output:
+            output.write(text + '\n')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
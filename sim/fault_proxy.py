@@ -0,0 +1,390 @@
+"""
+    STARBURST ACC/FEANTA Fault Injection Proxy
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import random
+import socket
+import SocketServer
+import struct
+import threading
+import time
+
+# Size of the reads made by the proxy on either side.
+PROXY_CHUNK = 4096
+
+# Directions in which data is forwarded.
+UPSTREAM = 'up'
+DOWNSTREAM = 'down'
+
+
+# region Method Description
+"""
+Method: draw_delay
+    Description:
+        Draws a delay from a distribution given as a list, i.e. as read
+        from a JSON script:
+            ['constant', seconds]
+            ['uniform', low, high]
+            ['exponential', mean]
+            ['lognormal', mu, sigma]
+            ['pareto', scale, alpha]
+    Arguments:
+        spec: the distribution, or None for no delay.
+    Returns:
+        delay: delay in seconds.
+"""
+# endregion
+def draw_delay(spec):
+    if not spec:
+        return 0.0
+    kind = spec[0]
+    if kind == 'constant':
+        return float(spec[1])
+    if kind == 'uniform':
+        return random.uniform(spec[1], spec[2])
+    if kind == 'exponential':
+        return random.expovariate(1.0 / spec[1])
+    if kind == 'lognormal':
+        return random.lognormvariate(spec[1], spec[2])
+    if kind == 'pareto':
+        return spec[1] * random.paretovariate(spec[2])
+    raise ValueError('Unknown delay distribution: ' + str(kind))
+
+
+# region Class Description
+"""
+Class: FaultScript
+    Description:
+        Sequence of phases, each applying a set of faults for a duration.
+        The script starts when the proxy starts and repeats once the last
+        phase ends if loop is set, otherwise the last phase stays in
+        force. Each phase is a dictionary with a 'duration' in seconds and
+        any of the following faults:
+            'delay': distribution of the delay added before each chunk
+                forwarded, see draw_delay.
+            'direction': 'up', 'down' or 'both', the direction delays,
+                partial reads and drops apply to. Defaults to 'down',
+                i.e. replies from the endpoint.
+            'partial': largest number of bytes forwarded at once, so that
+                the reader sees a reply split over several recv calls.
+            'partial_gap': seconds between the pieces of a split chunk.
+            'stall': seconds for which forwarding stops at the start of
+                the phase, as a hung endpoint would.
+            'refuse': fraction of connections reset on accept.
+            'drop': fraction of chunks silently discarded.
+            'reset': fraction of chunks after which the connection is
+                reset instead.
+    Arguments:
+        phases: list of phase dictionaries.
+        loop: whether the script repeats.
+"""
+# endregion
+class FaultScript(object):
+    def __init__(self, phases, loop=False):
+        self.phases = phases or [{'duration': 0}]
+        self.loop = loop
+        self.length = sum(phase.get('duration', 0) for phase in self.phases)
+        self.start_time = time.time()
+
+    # region Method Description
+    """
+    Method: current
+        Description:
+            Finds the phase in force.
+        Returns:
+            [0]: the phase dictionary.
+            [1]: time in seconds since the phase started.
+    """
+    # endregion
+    def current(self):
+        elapsed = time.time() - self.start_time
+        if self.loop and self.length > 0:
+            elapsed %= self.length
+        for phase in self.phases:
+            duration = phase.get('duration', 0)
+            if elapsed < duration:
+                return phase, elapsed
+            elapsed -= duration
+        return self.phases[-1], elapsed + self.phases[-1].get('duration', 0)
+
+
+# region Class Description
+"""
+Class: LinkStats
+    Description:
+        Timing of the connections made through a proxy. Every connection
+        records when it was accepted, how long the endpoint took to send
+        its first byte after the client's first request bytes, and when
+        it closed. Used to report frame cadence on the ACC link and
+        command latency on command links.
+"""
+# endregion
+class LinkStats(object):
+    def __init__(self):
+        self.accepted = []
+        self.latencies = []
+        self.durations = []
+        self.refused = 0
+        self.dropped = 0
+        self.resets = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: record
+        Description:
+            Appends a value to one of the lists of the link.
+    """
+    # endregion
+    def record(self, attribute, value):
+        with self.lock:
+            getattr(self, attribute).append(value)
+
+    # region Method Description
+    """
+    Method: count
+        Description:
+            Increments one of the counts of the link.
+    """
+    # endregion
+    def count(self, attribute):
+        with self.lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    # region Method Description
+    """
+    Method: report
+        Description:
+            Summarizes the link.
+        Arguments:
+            expected_interval: expected time in seconds between
+                connections, i.e. FRAME_INTERVAL on the ACC link, used to
+                report jitter. None to skip jitter.
+        Returns:
+            report: dictionary of counts and of summaries in milliseconds
+                of connection intervals, jitter, latencies and durations.
+    """
+    # endregion
+    def report(self, expected_interval=None):
+        with self.lock:
+            accepted = sorted(self.accepted)
+            latencies = list(self.latencies)
+            durations = list(self.durations)
+            report = {'connections': len(accepted),
+                      'refused': self.refused,
+                      'dropped_chunks': self.dropped,
+                      'resets': self.resets,
+                      'upstream_failures': self.failed}
+        intervals = [(b - a) * 1000 for a, b in zip(accepted, accepted[1:])]
+        report['interval_ms'] = summarize(intervals)
+        if expected_interval is not None:
+            report['jitter_ms'] = summarize(
+                [abs(interval - expected_interval * 1000)
+                 for interval in intervals])
+        report['latency_ms'] = summarize([l * 1000 for l in latencies])
+        report['duration_ms'] = summarize([d * 1000 for d in durations])
+        return report
+
+
+# region Method Description
+"""
+Method: summarize
+    Description:
+        Summarizes a list of values.
+    Arguments:
+        values: list of numbers.
+    Returns:
+        summary: dictionary of the count, mean, p50, p90, p99 and max, or
+            only the count if the list is empty.
+"""
+# endregion
+def summarize(values):
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+
+    def percentile(fraction):
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    return {'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': percentile(0.5),
+            'p90': percentile(0.9),
+            'p99': percentile(0.99),
+            'max': values[-1]}
+
+
+# region Class Description
+"""
+Class: FaultProxy
+    Description:
+        TCP proxy forwarding connections made to it to a target endpoint,
+        injecting the faults of its script along the way. Place it
+        between ServerDaemon and a device by pointing the worker's
+        address and port at the proxy, or between ServerDaemon and the
+        ACC by pointing ACC_PORT at it.
+    Arguments:
+        listen: (host, port) to bind. Port 0 picks a free port.
+        target: (host, port) of the endpoint.
+        script: FaultScript applied to the link.
+"""
+# endregion
+class FaultProxy(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, listen, target, script):
+        SocketServer.TCPServer.__init__(self, listen, ProxyHandler)
+        self.target = target
+        self.script = script
+        self.stats = LinkStats()
+        self.thread = None
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Starts the script and serves on a daemon thread.
+        Returns:
+            address: (host, port) actually bound.
+    """
+    # endregion
+    def start(self):
+        if self.thread is None:
+            self.script.start_time = time.time()
+            self.thread = threading.Thread(target=self.serve_forever)
+            self.thread.daemon = True
+            self.thread.start()
+        return self.server_address
+
+    # region Method Description
+    """
+    Method: stop
+        Description:
+            Stops serving and closes the listening socket.
+    """
+    # endregion
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    # region Method Description
+    """
+    Method: wait_stall
+        Description:
+            Blocks while the phase in force stalls the link. Every
+            direction of every connection waits until the stall ends.
+    """
+    # endregion
+    def wait_stall(self):
+        phase, elapsed = self.script.current()
+        stall = phase.get('stall', 0)
+        if elapsed < stall:
+            time.sleep(stall - elapsed)
+
+    # region Method Description
+    """
+    Method: forward
+        Description:
+            Forwards one chunk, applying the faults of the phase in force.
+        Arguments:
+            data: chunk read from the source.
+            sink: socket the chunk is forwarded to.
+            direction: UPSTREAM or DOWNSTREAM.
+        Returns:
+            False if the connection was reset by a fault, True otherwise.
+    """
+    # endregion
+    def forward(self, data, sink, direction):
+        self.wait_stall()
+        phase, elapsed = self.script.current()
+        applies = phase.get('direction', DOWNSTREAM) in [direction, 'both']
+        if applies:
+            if random.random() < phase.get('reset', 0):
+                self.stats.count('resets')
+                return False
+            if random.random() < phase.get('drop', 0):
+                self.stats.count('dropped')
+                return True
+            delay = draw_delay(phase.get('delay', None))
+            if delay > 0:
+                time.sleep(delay)
+        piece = len(data)
+        if applies and phase.get('partial', 0) > 0:
+            piece = phase['partial']
+        for offset in range(0, len(data), piece):
+            if offset > 0:
+                time.sleep(phase.get('partial_gap', 0))
+            sink.sendall(data[offset:offset + piece])
+        return True
+
+
+def reset(sock):
+    # Closing with a zero linger time sends a RST instead of a FIN.
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                        struct.pack('ii', 1, 0))
+        sock.close()
+    except socket.error:
+        pass
+
+
+class ProxyHandler(SocketServer.BaseRequestHandler):
+    def handle(self):
+        proxy = self.server
+        client = self.request
+        accepted = time.time()
+        proxy.stats.record('accepted', accepted)
+        phase, elapsed = proxy.script.current()
+        if random.random() < phase.get('refuse', 0):
+            proxy.stats.count('refused')
+            reset(client)
+            return
+        try:
+            upstream = socket.create_connection(proxy.target)
+        except socket.error:
+            proxy.stats.count('failed')
+            reset(client)
+            return
+
+        # Time from the client's first bytes to the endpoint's first reply.
+        timing = {'request': None, 'reply': None}
+
+        def pump(source, sink, direction):
+            try:
+                while True:
+                    data = source.recv(PROXY_CHUNK)
+                    if not data:
+                        break
+                    now = time.time()
+                    if direction == UPSTREAM and timing['request'] is None:
+                        timing['request'] = now
+                    if direction == DOWNSTREAM and timing['reply'] is None:
+                        timing['reply'] = now
+                    if not proxy.forward(data, sink, direction):
+                        reset(client)
+                        reset(upstream)
+                        break
+                sink.shutdown(socket.SHUT_WR)
+            except socket.error:
+                pass
+
+        downstream = threading.Thread(target=pump,
+                                      args=(upstream, client, DOWNSTREAM))
+        downstream.daemon = True
+        downstream.start()
+        pump(client, upstream, UPSTREAM)
+        downstream.join()
+        for sock in [client, upstream]:
+            try:
+                sock.close()
+            except socket.error:
+                pass
+        proxy.stats.record('durations', time.time() - accepted)
+        if timing['request'] is not None and timing['reply'] is not None \
+                and timing['reply'] >= timing['request']:
+            proxy.stats.record('latencies',
+                               timing['reply'] - timing['request'])
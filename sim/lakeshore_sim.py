@@ -0,0 +1,122 @@
+"""
+    STARBURST ACC/FEANTA Lakeshore Simulator
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import os
+import random
+import sim_device
+import termios
+import threading
+import tty
+
+# Temperatures in Kelvin reported by the eight inputs, and the amplitude
+# of the noise added to each reading.
+DEFAULT_TEMPERATURES = [15.0, 16.2, 17.5, 60.1, 45.3, 18.1, 80.2, 61.4]
+TEMPERATURE_NOISE = 0.01
+
+
+# region Class Description
+"""
+Class: LakeshoreSim
+    Description:
+        Simulated Lakeshore temperature monitor on a pseudo-terminal, so
+        that CryoWorker can open it with pyserial as it would
+        /dev/ttyUSB0. 'krdg? 0' is answered with the eight readings in
+        Kelvin, comma separated; 'krdg? n' with the reading of input n.
+        Other queries are ignored, as the Lakeshore does. Linux
+        pseudo-terminals do not support 7 bit characters with parity, so
+        CryoWorker must be set to 8 data bits without parity, i.e.
+        CRYO_BYTESIZE = 8 and CRYO_PARITY = 'N', to use the simulator.
+    Arguments:
+        latency: mean reply latency in seconds.
+        jitter: spread of the reply latency in seconds.
+"""
+# endregion
+class LakeshoreSim(sim_device.SimDevice):
+    def __init__(self, latency=0.0, jitter=0.0):
+        super(LakeshoreSim, self).__init__(latency, jitter)
+        self.temperatures = list(DEFAULT_TEMPERATURES)
+        self.master = None
+        self.slave = None
+        self.thread = None
+
+    # region Method Description
+    """
+    Method: query
+        Description:
+            Answers a query line.
+        Arguments:
+            line: query without its line terminator.
+        Returns:
+            reply: reply line with its terminator, or None.
+    """
+    # endregion
+    def query(self, line):
+        words = line.strip().lower().split()
+        if len(words) != 2 or words[0] != 'krdg?':
+            return None
+        with self.lock:
+            readings = [temperature +
+                        random.uniform(-TEMPERATURE_NOISE, TEMPERATURE_NOISE)
+                        for temperature in self.temperatures]
+        try:
+            channel = int(words[1])
+        except ValueError:
+            return None
+        if channel == 0:
+            return ','.join('%+08.3f' % reading for reading in readings) + \
+                   '\r\n'
+        if 1 <= channel <= len(readings):
+            return '%+08.3f\r\n' % readings[channel - 1]
+        return None
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Opens the pseudo-terminal and answers queries on a daemon
+            thread.
+        Returns:
+            port: path of the terminal to open in place of /dev/ttyUSB0.
+    """
+    # endregion
+    def start(self):
+        if self.thread is None:
+            self.master, self.slave = os.openpty()
+            tty.setraw(self.master, termios.TCSANOW)
+            self.thread = threading.Thread(target=self.__serve)
+            self.thread.daemon = True
+            self.thread.start()
+        return os.ttyname(self.slave)
+
+    # region Method Description
+    """
+    Method: stop
+        Description:
+            Closes the pseudo-terminal.
+    """
+    # endregion
+    def stop(self):
+        for fd in [self.master, self.slave]:
+            try:
+                os.close(fd)
+            except (OSError, TypeError):
+                pass
+
+    def __serve(self):
+        buf = ''
+        while True:
+            try:
+                chunk = os.read(self.master, 256)
+            except OSError:
+                return
+            if not chunk:
+                return
+            buf += chunk
+            while '\n' in buf:
+                line, buf = buf.split('\n', 1)
+                reply = self.query(line)
+                if reply is not None and self.respond_delay():
+                    os.write(self.master, reply)
@@ -0,0 +1,218 @@
+"""
+    STARBURST ACC/FEANTA PDU Simulator
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import BaseHTTPServer
+import sim_device
+import SocketServer
+import threading
+import urlparse
+
+NUM_OUTLETS = 8
+SESSION_COOKIE = 'DLILPC'
+
+# Number of layout tables preceding the outlet table on the index page,
+# which the PDU worker reads as the sixth table.
+LAYOUT_TABLES = 5
+
+# Voltage and current reported for each of the two feeds.
+FEED_VOLTS = [120.0, 119.5]
+FEED_CURRENT = [1.2, 0.8]
+
+
+# region Class Description
+"""
+Class: PDUSim
+    Description:
+        Simulated web power switch. POST /login.tgi with the Username and
+        Password fields starts a session held in a cookie. /index.htm,
+        which redirects to /login.htm without a session, lists the outlet
+        states and feed readings in the sixth table of the page, as read
+        by PDUWorker. /outlet?N=ON|OFF switches an outlet and /logout ends
+        the session.
+    Arguments:
+        latency: mean reply latency in seconds.
+        jitter: spread of the reply latency in seconds.
+        username: accepted username.
+        password: accepted password.
+"""
+# endregion
+class PDUSim(sim_device.SimDevice):
+    def __init__(self, latency=0.0, jitter=0.0, username='admin',
+                 password='pwr4me'):
+        super(PDUSim, self).__init__(latency, jitter)
+        self.username = username
+        self.password = password
+        self.outlets = [True] * NUM_OUTLETS
+        self.sessions = set()
+        self.next_session = 1
+
+    # region Method Description
+    """
+    Method: login
+        Description:
+            Starts a session if the credentials are accepted.
+        Returns:
+            session: session id, or None if the login is refused.
+    """
+    # endregion
+    def login(self, username, password):
+        if username != self.username or password != self.password:
+            return None
+        with self.lock:
+            session = str(self.next_session)
+            self.next_session += 1
+            self.sessions.add(session)
+        return session
+
+    # region Method Description
+    """
+    Method: index_page
+        Description:
+            Renders the index page.
+        Returns:
+            html: the page.
+    """
+    # endregion
+    def index_page(self):
+        html = '<html><head><title>Outlet Control</title></head><body>\n'
+        for table in range(LAYOUT_TABLES):
+            html += '<table><tr><td>Layout ' + str(table) + \
+                    '</td></tr></table>\n'
+        html += '<table>\n'
+        with self.lock:
+            for outlet, state in enumerate(self.outlets):
+                html += '<tr><td>' + str(outlet + 1) + '</td><td>' + \
+                        '<font>' + ('ON' if state else 'OFF') + \
+                        '</font></td></tr>\n'
+        for volts, current in zip(FEED_VOLTS, FEED_CURRENT):
+            html += '<tr><th colspan="3">%.1fV %.2fA</th></tr>\n' % \
+                    (volts, current)
+        html += '</table>\n</body></html>\n'
+        return html
+
+    # region Method Description
+    """
+    Method: serve
+        Description:
+            Creates the HTTP server for this simulator.
+        Arguments:
+            host: address to bind.
+            port: port to bind, 0 for any free port.
+        Returns:
+            server: SimHTTPServer, not yet started.
+    """
+    # endregion
+    def serve(self, host='127.0.0.1', port=0):
+        return SimHTTPServer((host, port), PDUHandler, self)
+
+
+# region Class Description
+"""
+Class: SimHTTPServer
+    Description:
+        Threaded HTTP counterpart of sim_device.SimTCPServer.
+"""
+# endregion
+class SimHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, handler, device):
+        BaseHTTPServer.HTTPServer.__init__(self, address, handler)
+        self.device = device
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever)
+            self.thread.daemon = True
+            self.thread.start()
+        return self.server_address
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class PDUHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def __session(self):
+        cookies = self.headers.getheader('Cookie', '')
+        for cookie in cookies.split(';'):
+            name, sep, value = cookie.strip().partition('=')
+            if name == SESSION_COOKIE and \
+                    value in self.server.device.sessions:
+                return value
+        return None
+
+    def __reply(self, code, body='', headers=None):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __redirect(self, path, headers=None):
+        headers = dict(headers or {})
+        headers['Location'] = path
+        self.__reply(302, '', headers)
+
+    def do_POST(self):
+        device = self.server.device
+        length = int(self.headers.getheader('Content-Length', 0))
+        form = urlparse.parse_qs(self.rfile.read(length))
+        if not device.respond_delay():
+            self.rfile.read()
+            return
+        if self.path != '/login.tgi':
+            self.__reply(404)
+            return
+        session = device.login(form.get('Username', [''])[0],
+                               form.get('Password', [''])[0])
+        if session is None:
+            self.__redirect('/login.htm')
+            return
+        self.__redirect('/index.htm',
+                        {'Set-Cookie': SESSION_COOKIE + '=' + session})
+
+    def do_GET(self):
+        device = self.server.device
+        if not device.respond_delay():
+            self.rfile.read()
+            return
+        url = urlparse.urlparse(self.path)
+        if url.path == '/login.htm':
+            self.__reply(200, '<html><body><form method="post" '
+                              'action="/login.tgi"></form></body></html>')
+            return
+        session = self.__session()
+        if session is None:
+            self.__redirect('/login.htm')
+            return
+        if url.path == '/index.htm':
+            self.__reply(200, device.index_page())
+        elif url.path == '/outlet':
+            for outlet, state in urlparse.parse_qsl(url.query):
+                try:
+                    outlet = int(outlet)
+                    if 1 <= outlet <= NUM_OUTLETS and \
+                            state in ['ON', 'OFF']:
+                        with device.lock:
+                            device.outlets[outlet - 1] = state == 'ON'
+                except ValueError:
+                    pass
+            self.__redirect('/index.htm')
+        elif url.path == '/logout':
+            with device.lock:
+                device.sessions.discard(session)
+            self.__redirect('/login.htm')
+        else:
+            self.__reply(404)
+
+    # Requests are not logged.
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,94 @@
+#!/usr/bin/python2.6
+
+"""
+    STARBURST ACC/FEANTA Device Simulator Runner
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import getopt
+import sys
+import time
+import bb_sim
+import brick_sim
+import lakeshore_sim
+import pdu_sim
+
+USAGE = 'run_sims.py [-l <latency>] [-j <jitter>] [-H <host>] ' \
+        '[--pdu-port <port>] [--bb-port <port>] [--brick-port <port>]'
+
+
+# region Method Description
+"""
+Method: start_all
+    Description:
+        Starts a simulator for each of the four devices.
+    Arguments:
+        latency: mean reply latency in seconds of every simulator.
+        jitter: spread of the reply latency in seconds.
+        host: address the network simulators bind.
+        ports: dictionary of the ports to bind, keyed by 'pdu', 'bb' and
+            'brick'. Missing ports are picked freely.
+    Returns:
+        devices: dictionary of the simulators keyed by 'pdu', 'bb',
+            'brick' and 'lakeshore'.
+        servers: dictionary of the started servers keyed as devices.
+        addresses: dictionary of the (host, port) each network simulator
+            is bound to, and the terminal path of the Lakeshore.
+"""
+# endregion
+def start_all(latency=0.0, jitter=0.0, host='127.0.0.1', ports=None):
+    ports = ports or {}
+    devices = {'pdu': pdu_sim.PDUSim(latency, jitter),
+               'bb': bb_sim.BBSim(latency, jitter),
+               'brick': brick_sim.BrickSim(latency, jitter),
+               'lakeshore': lakeshore_sim.LakeshoreSim(latency, jitter)}
+    servers = {}
+    addresses = {}
+    for name in ['pdu', 'bb', 'brick']:
+        servers[name] = devices[name].serve(host, ports.get(name, 0))
+        addresses[name] = servers[name].start()
+    servers['lakeshore'] = devices['lakeshore']
+    addresses['lakeshore'] = devices['lakeshore'].start()
+    return devices, servers, addresses
+
+
+def main(argv):
+    latency = 0.0
+    jitter = 0.0
+    host = '127.0.0.1'
+    ports = {}
+    try:
+        opts, args = getopt.getopt(argv, 'hl:j:H:',
+                                   ['latency=', 'jitter=', 'host=',
+                                    'pdu-port=', 'bb-port=', 'brick-port='])
+        for opt, arg in opts:
+            if opt == '-h':
+                print USAGE
+                sys.exit()
+            elif opt in ['-l', '--latency']:
+                latency = float(arg)
+            elif opt in ['-j', '--jitter']:
+                jitter = float(arg)
+            elif opt in ['-H', '--host']:
+                host = arg
+            else:
+                ports[opt[2:].split('-')[0]] = int(arg)
+    except (getopt.GetoptError, ValueError):
+        print USAGE
+        sys.exit(2)
+
+    devices, servers, addresses = start_all(latency, jitter, host, ports)
+    print 'PDU:       http://%s:%d' % addresses['pdu']
+    print 'BeagleBone: %s:%d' % addresses['bb']
+    print 'GeoBrick:  %s:%d' % addresses['brick']
+    print 'Lakeshore: ' + addresses['lakeshore']
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.stop()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,112 @@
+"""
+    STARBURST ACC/FEANTA Device Simulator Base
+    Author: Lokbondo Kung
+    Email: lkkung@caltech.edu
+"""
+
+import random
+import SocketServer
+import threading
+import time
+
+
+# region Class Description
+"""
+Class: SimDevice
+    Description:
+        Behavior shared by every device simulator. Each reply is held back
+        by a latency drawn uniformly from latency +/- jitter, and a silent
+        device reads requests but never answers them, as a hung device
+        would. Both may be changed while the simulator runs.
+    Arguments:
+        latency: mean reply latency in seconds.
+        jitter: spread of the reply latency in seconds.
+"""
+# endregion
+class SimDevice(object):
+    def __init__(self, latency=0.0, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.silent = False
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    # region Method Description
+    """
+    Method: respond_delay
+        Description:
+            Counts a request and sleeps for the reply latency.
+        Returns:
+            False if the device is silent and should not reply, True
+            otherwise.
+    """
+    # endregion
+    def respond_delay(self):
+        with self.lock:
+            self.requests += 1
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        return not self.silent
+
+
+# region Class Description
+"""
+Class: SimTCPServer
+    Description:
+        TCP server used by the network simulators. Connections are handled
+        one at a time in the order they were made, as devices that take
+        one command per connection do. Handler classes reach their
+        simulator through self.server.device.
+    Arguments:
+        address: (host, port) to bind. Port 0 picks a free port.
+        handler: SocketServer request handler class.
+        device: the SimDevice served.
+"""
+# endregion
+class SimTCPServer(SocketServer.TCPServer):
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, device):
+        SocketServer.TCPServer.__init__(self, address, handler)
+        self.device = device
+        self.thread = None
+
+    # region Method Description
+    """
+    Method: start
+        Description:
+            Serves on a daemon thread.
+        Returns:
+            address: (host, port) actually bound.
+    """
+    # endregion
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.serve_forever)
+            self.thread.daemon = True
+            self.thread.start()
+        return self.server_address
+
+    # region Method Description
+    """
+    Method: stop
+        Description:
+            Stops serving and closes the listening socket.
+    """
+    # endregion
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# region Class Description
+"""
+Class: ThreadingSimTCPServer
+    Description:
+        SimTCPServer handling each connection on its own thread, for
+        devices that keep connections open.
+"""
+# endregion
+class ThreadingSimTCPServer(SocketServer.ThreadingMixIn, SimTCPServer):
+    daemon_threads = True